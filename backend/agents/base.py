@@ -1,12 +1,18 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, List
 from services.alpha_vantage import AlphaVantageService
-from services.llm import GeminiService, ChatGPTService
+from services.llm import GeminiService, ChatGPTService, query_llms
 from core.schemas import AgentResponse
 from core.logging import log_exception, get_agent_logger
 from config.settings import settings
+from core.context import get_request_context
+from services.data_context import get_data_context
 
 class BaseAgent(ABC):
+    # AlphaVantage functions the agent reads for the query symbol; the router loads them into the
+    # request's data context before the agent runs so agents share one fetch and one parse
+    required_data: List[str] = []
+
     def __init__(self, agent_name: str):
         self.agent_name = agent_name
         self.logger = get_agent_logger(agent_name)
@@ -14,7 +20,7 @@ class BaseAgent(ABC):
 
         self.llms = self._initialize_llms()
 
-        self.confidence = 0.9
+        self.initial_confidence = 0.9
 
     def _initialize_llms(self):
         llm_instances = []
@@ -26,22 +32,27 @@ class BaseAgent(ABC):
         return llm_instances
     
     async def _query_llm(self, query: str, **kwargs) -> str:
-        for llm in self.llms:
-            try:
-                self.logger.info(f"Querying LLM: {llm.__class__.__name__}")
-                response = await llm.analyze(query, **kwargs)
-                if response:
-                    return response
-            except Exception as e:
-                log_exception(self.logger, e) 
+        return await query_llms(self.llms, query, self.logger, **kwargs)
+
+    async def _get_entry(self, symbol: str, function: str):
+        return await get_data_context().get_entry(symbol, function)
+
+    async def _get_frame(self, symbol: str, function: str):
+        """Shared (entry, DataFrame) for a time series; the frame must not be modified in place"""
+        return await get_data_context().get_frame(symbol, function)
 
     @abstractmethod
     async def process(self, query: str, data: Dict[str,Any]) -> AgentResponse:
         pass
 
+    @property
+    def confidence(self) -> float:
+        """Confidence for the current request; agents are shared so it lives in the request context"""
+        return get_request_context().confidence.get(self.agent_name, self.initial_confidence)
+
     def adjust_confidence(self, success: bool):
         adjustment = 0.1 if success else -0.1
-        self.confidence = min(max(self.confidence + adjustment, 0), 1)
+        get_request_context().confidence[self.agent_name] = min(max(self.confidence + adjustment, 0), 1)
 
     def handle_error(self, e: Exception) -> AgentResponse:
         log_exception(self.logger, e)
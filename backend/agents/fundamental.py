@@ -6,6 +6,8 @@ from prompts.prompts import FUNDAMENTAL_USER_PROMPT, FUNDAMENTAL_SYSTEM_PROMPT
 
 #cache wala part not added because woh samaj mai nahi aaya ,can just copy paste from technical agent 
 class FundamentalAgent(BaseAgent):
+    required_data = ["OVERVIEW"]
+
     def __init__(self):
         super().__init__("FundamentalAgent")
 
@@ -15,7 +17,8 @@ class FundamentalAgent(BaseAgent):
             symbol = agent_data.get("symbol")
             if not symbol:
                 raise ValueError("Missing 'symbol' key in agent_data")
-            data = await self.alpha_vantage.fetch(symbol, "OVERVIEW")
+            entry = await self._get_entry(symbol, "OVERVIEW")
+            data = entry.value if entry else None
 
             if not data:
                 return AgentResponse(
@@ -37,7 +40,8 @@ class FundamentalAgent(BaseAgent):
             return AgentResponse(
                 agent_name=self.agent_name,
                 result={"analysis": analysis },
-                confidence=self.confidence
+                confidence=self.confidence,
+                data_age=entry.age
             )
         except Exception as e:
             return self.handle_error(e)
\ No newline at end of file
@@ -1,11 +1,14 @@
 from agents.base import BaseAgent
 from core.schemas import AgentResponse
 from core.logging import log_execution
+import asyncio
 import pandas as pd
 from prompts.prompts import PORTFOLIO_AGENT_PROMPT
 from typing import Any, Dict
 
 class PortfolioAgent(BaseAgent):
+    required_data = ["TIME_SERIES_DAILY"]
+
     def __init__(self):
         super().__init__("PortfolioAgent")
     
@@ -21,11 +24,13 @@ class PortfolioAgent(BaseAgent):
                 )
             
             portfolio_data = {}
-            for symbol in symbols:
-                data = await self.alpha_vantage.fetch(symbol, "TIME_SERIES_DAILY")
-                if data:
-                    df = pd.DataFrame(data["Time Series (Daily)"]).T
-                    portfolio_data[symbol] = df["close"].astype(float).pct_change().dropna()
+            data_ages = []
+            frames = await asyncio.gather(*[self._get_frame(symbol, "TIME_SERIES_DAILY") for symbol in symbols])
+            for symbol, (entry, bars) in zip(symbols, frames):
+                if entry and entry.age is not None:
+                    data_ages.append(entry.age)
+                if bars is not None:
+                    portfolio_data[symbol] = bars.set_index("timestamp")["close"].pct_change().dropna()
             
             corr_matrix = pd.DataFrame(portfolio_data).corr()
             
@@ -40,7 +45,8 @@ class PortfolioAgent(BaseAgent):
             return AgentResponse(
                 agent_name=self.agent_name,
                 result={"analysis": analysis, "correlations": corr_matrix.to_dict()},
-                confidence=self.confidence
+                confidence=self.confidence,
+                data_age=max(data_ages) if data_ages else None
             )
         except Exception as e:
             return self.handle_error(e)
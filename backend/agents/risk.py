@@ -2,11 +2,12 @@ from agents.base import BaseAgent
 from core.schemas import AgentResponse
 from core.logging import log_execution
 from prompts.prompts import RISK_AGENT_PROMPT
-import pandas as pd
 import numpy as np
 from typing import Any, Dict
 
 class RiskAgent(BaseAgent):
+    required_data = ["TIME_SERIES_INTRADAY"]
+
     def __init__(self):
         super().__init__("RiskAgent")
     
@@ -17,9 +18,9 @@ class RiskAgent(BaseAgent):
             if not symbol:
                 raise ValueError("Missing 'symbol' key in agent_data")
             
-            data = await self.alpha_vantage.fetch(symbol, "TIME_SERIES_INTRADAY")
+            entry, bars = await self._get_frame(symbol, "TIME_SERIES_INTRADAY")
             
-            if not data:
+            if bars is None:
                 return AgentResponse(
                     agent_name=self.agent_name,
                     result={"error": "Data fetch failed"},
@@ -27,8 +28,7 @@ class RiskAgent(BaseAgent):
                 )
             
 
-            df = pd.DataFrame(data["Time Series (5min)"]).T
-            returns = df["4. close"].astype(float).pct_change().dropna()
+            returns = bars["close"].pct_change().dropna()
             volatility = returns.std() * np.sqrt(252)
             
             analysis = await self._query_llm(
@@ -42,7 +42,8 @@ class RiskAgent(BaseAgent):
             return AgentResponse(
                 agent_name=self.agent_name,
                 result={"analysis": analysis, "volatility": volatility},
-                confidence=self.confidence
+                confidence=self.confidence,
+                data_age=entry.age
             )
         except Exception as e:
             return self.handle_error(e)
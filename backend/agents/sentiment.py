@@ -6,6 +6,8 @@ from prompts.prompts import NEWS_SENTIMENT_SYSTEM_PROMPT, NEWS_SENTIMENT_USER_PR
 import time
 
 class SentimentAgent(BaseAgent):
+    required_data = ["NEWS_SENTIMENT"]
+
     def __init__(self):
         super().__init__("SentimentAgent")
     
@@ -16,7 +18,8 @@ class SentimentAgent(BaseAgent):
             if not symbol:
                 raise ValueError("Missing 'symbol' key in agent_data")
             
-            data = await self.alpha_vantage.fetch(symbol, "NEWS_SENTIMENT")
+            entry = await self._get_entry(symbol, "NEWS_SENTIMENT")
+            data = entry.value if entry else None
             if not data or "feed" not in data:
                 return AgentResponse(
                     agent_name=self.agent_name,
@@ -39,7 +42,8 @@ class SentimentAgent(BaseAgent):
             return AgentResponse(
                 agent_name=self.agent_name,
                 result={"analysis": analysis, "news": news_items,"user_query":query},
-                confidence=self.confidence
+                confidence=self.confidence,
+                data_age=entry.age
             )
         except Exception as e:
             return self.handle_error(e)
@@ -1,12 +1,16 @@
+import time
 import pandas as pd
 from typing import Any, Dict
 from agents.base import BaseAgent
 from core.schemas import AgentResponse
 from services.cache import CacheService
+from services.indicators import indicator_engine
 from core.logging import log_execution
 from prompts.prompts import TECHNICAL_USER_PROMPT, TECHNICAL_SYSTEM_PROMPT
 
 class TechnicalAgent(BaseAgent):
+    required_data = ["TIME_SERIES_INTRADAY"]
+
     def __init__(self):
         super().__init__("TechnicalAgent")
         self.cache = CacheService()
@@ -24,78 +28,51 @@ class TechnicalAgent(BaseAgent):
             cached_analysis = await self.cache.get(cache_key)
             if cached_analysis:
                 self.logger.info(f"Cache hit for techinical analysis of {symbol}")
-                return AgentResponse(**cached_analysis)
+                # The age is of the market data behind the analysis, so it keeps growing while cached
+                data_as_of = cached_analysis.get("data_as_of")
+                fields = {key: value for key, value in cached_analysis.items() if key not in ("data_as_of", "data_age")}
+                return AgentResponse(
+                    **fields,
+                    data_age=max(time.time() - data_as_of, 0.0) if data_as_of is not None else None
+                )
             
             self.logger.info(f"No cache found for {symbol}")
 
-            data = await self.alpha_vantage.fetch(symbol, "TIME_SERIES_INTRADAY")
+            entry, bars = await self._get_frame(symbol, "TIME_SERIES_INTRADAY")
             
-            if not data:
+            if bars is None:
                 return AgentResponse(
                     agent_name=self.agent_name,
                     result={"error": "Data fetch failed"},
                     confidence=0.0
                 )
 
-            df = self._prepare_dataframe(data)
+            df = await self._prepare_dataframe(symbol, bars)
             analysis = await self._analyze_data(df, symbol,query)
             
             self.adjust_confidence(True)
             response =  AgentResponse(
                 agent_name=self.agent_name,
                 result={"analysis": analysis, "indicators": df.tail(1).to_dict()},
-                confidence=self.confidence
+                confidence=self.confidence,
+                data_age=entry.age
             )
-            await self.cache.set(cache_key, response.dict())
+            cached = response.dict(exclude={"data_age"})
+            cached["data_as_of"] = time.time() - entry.age if entry.age is not None else None
+            await self.cache.set(cache_key, cached)
             return response
         
         except Exception as e:
             return self.handle_error(e)
 
-    def _prepare_dataframe(self, data: dict) -> pd.DataFrame:
-        columns = {
-                'index' : 'timestamp',
-                '1. open' : 'open',
-                '2. high' : 'high',
-                '3. low' : 'low',
-                '4. close' : 'close',
-                '5. adjusted close' : 'adjusted_close',
-                '6. volume' : 'volume',
-                '5. volume' : 'volume',
-                '7. dividend amount' : 'dividend_amount',
-                '8. split coefficient' : 'split_coefficient'
-            }
-
-        time_series_keys = [key for key in data if key.startswith("Time Series")]
-
-        if not time_series_keys:
-            raise ValueError("Time Series data not found in the input dictionary")
-        time_series_key = time_series_keys[0]
-
-        df = pd.DataFrame(data[time_series_key]).T.reset_index()
-        df = df.rename(columns=columns)
-        
-        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
-        
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        df['20ma'] = df['close'].rolling(20).mean()
-        df['rsi'] = self._calculate_rsi(df['close'])
+    async def _prepare_dataframe(self, symbol: str, bars: pd.DataFrame) -> pd.DataFrame:
+        indicators = await indicator_engine.compute(symbol, "TIME_SERIES_INTRADAY", bars)
+        df = bars.copy()
+        df['20ma'] = indicators['MA20']
+        df['rsi'] = indicators['RSI']
         
         return df
 
-    def _calculate_rsi(self, series: pd.Series, period: int = 14) -> pd.Series:
-        delta = series.diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        
-        avg_gain = gain.rolling(period).mean()
-        avg_loss = loss.rolling(period).mean()
-        
-        rs = avg_gain / avg_loss
-        return 100 - (100 / (1 + rs))
-
     async def _analyze_data(self, df: pd.DataFrame, symbol: str, user_query: str) -> str:
         return await self._query_llm(
             TECHNICAL_USER_PROMPT,
@@ -12,43 +12,115 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
 
     LLM_PIORITY: List[str] = ["OPENAI","GEMINI"]
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", 30.0))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", 1))
+    LLM_HEDGE_DELAY: float = float(os.getenv("LLM_HEDGE_DELAY", 0))  # seconds, 0 disables hedging
+    LLM_BREAKER_FAILURE_RATE: float = float(os.getenv("LLM_BREAKER_FAILURE_RATE", 0.5))
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", 15.0))
+    LLM_BREAKER_SLOW_CALL_RATE: float = float(os.getenv("LLM_BREAKER_SLOW_CALL_RATE", 0.8))
+    LLM_BREAKER_WINDOW_SECONDS: float = float(os.getenv("LLM_BREAKER_WINDOW_SECONDS", 60.0))
+    LLM_BREAKER_MIN_CALLS: int = int(os.getenv("LLM_BREAKER_MIN_CALLS", 5))
+    LLM_BREAKER_OPEN_SECONDS: float = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", 30.0))
+    LLM_BREAKER_HALF_OPEN_CALLS: int = int(os.getenv("LLM_BREAKER_HALF_OPEN_CALLS", 1))
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", 3600))
+    LLM_CACHE_MAX_TEMPERATURE: float = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", 0.0))  # sampled answers are not cached unless raised
+    LLM_CACHE_MAX_ENTRY_CHARS: int = int(os.getenv("LLM_CACHE_MAX_ENTRY_CHARS", 20000))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1000))  # oldest entries are evicted beyond this
 
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", 6379))
     REDIS_DB: int = int(os.getenv("REDIS_DB", 0))
     REDIS_PASSWORD: str = os.getenv("REDIS_PASSWORD", "")
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+    REDIS_POOL_TIMEOUT: float = float(os.getenv("REDIS_POOL_TIMEOUT", 5.0))
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5.0))
+    REDIS_HEALTH_CHECK_INTERVAL: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
     
     # Cache settings
     CACHE_TTL: int = int(os.getenv("CACHE_TTL", 300)) 
     CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_MARKET_HOURS_TTL: bool = os.getenv("CACHE_MARKET_HOURS_TTL", "true").lower() == "true"
+    CACHE_INTRADAY_OPEN_TTL: int = int(os.getenv("CACHE_INTRADAY_OPEN_TTL", 300))
+    CACHE_DAILY_OPEN_TTL: int = int(os.getenv("CACHE_DAILY_OPEN_TTL", 900))
+    CACHE_CLOSED_MAX_TTL: int = int(os.getenv("CACHE_CLOSED_MAX_TTL", 4 * 86400))
+    MARKET_SETTLE_MINUTES: int = int(os.getenv("MARKET_SETTLE_MINUTES", 15))
+    CACHE_STALE_TTL: int = int(os.getenv("CACHE_STALE_TTL", 86400))
+    CACHE_L1_ENABLED: bool = os.getenv("CACHE_L1_ENABLED", "true").lower() == "true"
+    CACHE_L1_MAX_ENTRIES: int = int(os.getenv("CACHE_L1_MAX_ENTRIES", 512))
+    CACHE_L1_MAX_BYTES: int = int(os.getenv("CACHE_L1_MAX_BYTES", 64 * 1024 * 1024))
+    CACHE_INVALIDATION_CHANNEL: str = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+    CACHE_SERIALIZER: str = os.getenv("CACHE_SERIALIZER", "msgpack")
+    CACHE_COMPRESSION: str = os.getenv("CACHE_COMPRESSION", "zstd")
+    CACHE_COMPRESSION_THRESHOLD: int = int(os.getenv("CACHE_COMPRESSION_THRESHOLD", 1024))
+    CACHE_COMPRESSION_LEVEL: int = int(os.getenv("CACHE_COMPRESSION_LEVEL", 3))
+    INDICATOR_STATE_TTL: int = int(os.getenv("INDICATOR_STATE_TTL", 7 * 86400))
 
+    # Outbound HTTP settings
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30.0))
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5.0))
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", 30.0))
 
+    # AlphaVantage quota settings (0 disables a budget)
+    ALPHA_VANTAGE_CALLS_PER_MINUTE: int = int(os.getenv("ALPHA_VANTAGE_CALLS_PER_MINUTE", 75))
+    ALPHA_VANTAGE_CALLS_PER_DAY: int = int(os.getenv("ALPHA_VANTAGE_CALLS_PER_DAY", 0))
+    ALPHA_VANTAGE_MAX_QUEUE_WAIT: float = float(os.getenv("ALPHA_VANTAGE_MAX_QUEUE_WAIT", 10.0))
+
+
+
+    # Price prediction model registry
+    MODEL_DIRECTORY: str = os.getenv("MODEL_DIRECTORY", "models")
+    MODEL_MAX_AGE: int = int(os.getenv("MODEL_MAX_AGE", 3600))  # seconds a model trained on older data is reused
+    MODEL_KEEP_VERSIONS: int = int(os.getenv("MODEL_KEEP_VERSIONS", 3))
+    MODEL_CACHE_SIZE: int = int(os.getenv("MODEL_CACHE_SIZE", 32))  # loaded model versions kept in memory per process
+    PREDICTION_ENGINE: str = os.getenv("PREDICTION_ENGINE", "forest")  # forest retrains on all history, online updates from new bars
+    TRAINING_WORKERS: int = int(os.getenv("TRAINING_WORKERS", 2))
+    TRAINING_TREE_JOBS: int = int(os.getenv("TRAINING_TREE_JOBS", 0))  # cores per training job, 0 splits the host evenly
+    TRAINING_JOB_RETENTION: int = int(os.getenv("TRAINING_JOB_RETENTION", 3600))
+    PREDICTION_TRAINING_WAIT: float = float(os.getenv("PREDICTION_TRAINING_WAIT", 30.0))  # then /analyse_prediction returns the job
+    BATCH_PREDICTION_CONCURRENCY: int = int(os.getenv("BATCH_PREDICTION_CONCURRENCY", 8))  # symbols fetched and featurized at once
+    BATCH_PREDICTION_MAX_SYMBOLS: int = int(os.getenv("BATCH_PREDICTION_MAX_SYMBOLS", 500))
+
+    LOCAL_ROUTER_ENABLED: bool = os.getenv("LOCAL_ROUTER_ENABLED", "true").lower() == "true"
+    LOCAL_ROUTER_MIN_CONFIDENCE: float = float(os.getenv("LOCAL_ROUTER_MIN_CONFIDENCE", 0.8))
+
+    # End-to-end latency budget for /query; agents get their AGENT_CONFIGS timeout,
+    # capped so that QUERY_EXPLAIN_BUDGET seconds remain for the explanation
+    QUERY_DEADLINE: float = float(os.getenv("QUERY_DEADLINE", 30.0))
+    QUERY_EXPLAIN_BUDGET: float = float(os.getenv("QUERY_EXPLAIN_BUDGET", 8.0))
 
     AGENT_CONFIGS: Dict[str, Dict] = {
         "TechnicalAgent": {
             "class": "TechnicalAgent",
             "enabled": True,
-            "confidence_threshold": 0.5
+            "confidence_threshold": 0.5,
+            "timeout": float(os.getenv("TECHNICAL_AGENT_TIMEOUT", 8))
         },
         "SentimentAgent": {
             "class": "SentimentAgent",
             "enabled": True,
-            "confidence_threshold": 0.6
+            "confidence_threshold": 0.6,
+            "timeout": float(os.getenv("SENTIMENT_AGENT_TIMEOUT", 10))
         },
         "RiskAgent": {
             "class": "RiskAgent",
             "enabled": True,
-            "confidence_threshold": 0.7
+            "confidence_threshold": 0.7,
+            "timeout": float(os.getenv("RISK_AGENT_TIMEOUT", 8))
         },
         "PortfolioAgent": {
             "class": "PortfolioAgent",
             "enabled": True,
-            "confidence_threshold": 0.5
+            "confidence_threshold": 0.5,
+            "timeout": float(os.getenv("PORTFOLIO_AGENT_TIMEOUT", 8))
         },
         "FundamentalAgent": {
             "class": "FundamentalAgent",
             "enabled": True,
-            "confidence_threshold": 0.5
+            "confidence_threshold": 0.5,
+            "timeout": float(os.getenv("FUNDAMENTAL_AGENT_TIMEOUT", 12))
         },
     }
 
@@ -0,0 +1,37 @@
+import contextvars
+import time
+from typing import Any, Dict, Optional
+
+
+class RequestContext:
+    """Per-request state for long-lived agents; tasks spawned by the request share it"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.confidence: Dict[str, float] = {}
+        # services.data_context.DataContext, created by the router or on first use
+        self.data: Any = None
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the request deadline, None when the request has no deadline"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+
+_request_context: contextvars.ContextVar[Optional[RequestContext]] = contextvars.ContextVar(
+    "request_context", default=None
+)
+
+
+def start_request_context(timeout: Optional[float] = None) -> RequestContext:
+    context = RequestContext(timeout)
+    _request_context.set(context)
+    return context
+
+
+def get_request_context() -> RequestContext:
+    context = _request_context.get()
+    if context is None:
+        context = start_request_context()
+    return context
@@ -14,6 +14,8 @@ class AgentResponse(BaseModel):
     result: Dict
     confidence: float
     error: Optional[str] = None
+    data_age: Optional[float] = None
+    timed_out: bool = False
 
 class ProcessedResponse(BaseModel):
     results: List[AgentResponse]
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from core.logging import setup_logging
 from routers import analysis
@@ -5,12 +6,29 @@ from routers import healthcheck
 from routers import fetch_intraday, fetch_daily
 from routers import prediction
 from config.settings import settings
+from services.http_client import get_http_client, close_http_client
+from services.llm import close_llm_clients
+from services.cache import close_redis_pool, start_invalidation_listener, stop_invalidation_listener
+from services.registry import ServiceRegistry
+from services.training_jobs import training_queue
 from fastapi.middleware.cors import CORSMiddleware
 
 
 setup_logging()
 
-app = FastAPI(title="Financial Analysis Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_http_client()
+    start_invalidation_listener()
+    app.state.registry = ServiceRegistry()
+    yield
+    await stop_invalidation_listener()
+    await close_http_client()
+    await close_llm_clients()
+    await close_redis_pool()
+    training_queue.shutdown()
+
+app = FastAPI(title="Financial Analysis Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +36,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Data-Age", "X-Data-Stale"],
 )
 
 app.include_router(analysis.router, prefix="/api")
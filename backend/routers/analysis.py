@@ -1,35 +1,40 @@
-from fastapi import APIRouter, HTTPException
-from core.schemas import UserQuery, ProcessedResponse
-from services.agent_selector import AgentSelector
-from services.aggregator import ResultAggregator
-from services.explainer import ExplainabilityEngine
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from core.schemas import UserQuery, ProcessedResponse, AgentResponse
 from core.logging import log_execution, log_exception
 import logging
 import asyncio
-from typing import List, Dict, Any
-from services.llm import ChatGPTService, GeminiService
+import json
+from typing import List, Dict, Any, AsyncIterator, Optional
+from config.settings import settings
+from services.data_context import DataContext, get_data_context
+from services.registry import ServiceRegistry, get_registry
+from core.context import RequestContext, get_request_context, start_request_context
 router = APIRouter()
 logger = logging.getLogger("analysis_router")
 
+FINANCIAL_REJECTION_TEMPLATES = [
+    "I appreciate your question, but I'm not able to provide specific financial advice. {reason} Instead, I'd be happy to share general financial education or point you toward reliable resources where you can learn more.",
+    "Thank you for your query. {reason} While I can't provide personalized financial guidance, I can explain general financial concepts or direct you to professional resources that might help.",
+    "I understand you're looking for financial insights. {reason} For your financial wellbeing, this type of advice is best obtained from qualified financial professionals who understand your complete situation.",
+    "I notice you're asking about financial matters. {reason} Would you like me to provide some general information about this topic instead, or perhaps explain what factors you might want to consider?"
+]
+
+DEADLINE_EXPLANATION = "Explanation unavailable: the response deadline was reached before it could be generated."
+
 @router.post("/query", response_model=ProcessedResponse)
 @log_execution
-async def process_query(query: UserQuery):
+async def process_query(query: UserQuery, registry: ServiceRegistry = Depends(get_registry)):
     logger.info(f"Received request body: {query.dict()}")  
-    selector = AgentSelector()
-    aggregator = ResultAggregator()
-    explainer = ExplainabilityEngine()
-    llm = ChatGPTService()
+    context = start_request_context(settings.QUERY_DEADLINE)
+    context.data = DataContext(registry.alpha_vantage)
+    aggregator = registry.aggregator
+    explainer = registry.explainer
     try:
 
-        financial_check = await llm.is_financial_query(query.text)
+        financial_check, agents, response = await classify_and_select(query, registry)
 
         if not financial_check.get("is_appropriate", True):
-            FINANCIAL_REJECTION_TEMPLATES = [
-    "I appreciate your question, but I'm not able to provide specific financial advice. {reason} Instead, I'd be happy to share general financial education or point you toward reliable resources where you can learn more.",
-    "Thank you for your query. {reason} While I can't provide personalized financial guidance, I can explain general financial concepts or direct you to professional resources that might help.",
-    "I understand you're looking for financial insights. {reason} For your financial wellbeing, this type of advice is best obtained from qualified financial professionals who understand your complete situation.",
-    "I notice you're asking about financial matters. {reason} Would you like me to provide some general information about this topic instead, or perhaps explain what factors you might want to consider?"
-]
             rejection_message = generate_kind_rejection(
                 financial_check.get("reason", ""),
                 FINANCIAL_REJECTION_TEMPLATES
@@ -44,21 +49,27 @@ async def process_query(query: UserQuery):
                 session_id=query.session_id
             )
 
-        agents, response = await selector.select_agents(query.text)
         if not agents:
             raise HTTPException(status_code=400, detail="No suitable agents found for query")
         logger.info(f"Selected agents: {[agent.__class__.__name__ for agent in agents]}")
         # Process query with selected agents
         agent_tasks = [
-            asyncio.create_task(agent.process(response["paraphrased_queries"].get(agent.__class__.__name__), response))
+            asyncio.create_task(_run_agent(agent, _agent_query(agent, response, query.text), response, context))
             for agent in agents
         ]
         results = await asyncio.gather(*agent_tasks)
 
         processed_results = await aggregator.aggregate(results)
 
-        # Generate explanation
-        explanation = await explainer.explain(processed_results,user_query=query.text)
+        # Generate explanation with whatever time is left
+        try:
+            explanation = await asyncio.wait_for(
+                explainer.explain(processed_results, user_query=query.text),
+                timeout=context.remaining()
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Query deadline reached while generating the explanation")
+            explanation = DEADLINE_EXPLANATION
 
         return ProcessedResponse(
             results=results,
@@ -68,7 +79,189 @@ async def process_query(query: UserQuery):
     except Exception as e:
         log_exception(logger, e)
         raise HTTPException(status_code=500, detail=str(e))
-    
+    finally:
+        context.data.close()
+
+
+@router.post("/query/stream")
+async def process_query_stream(query: UserQuery, registry: ServiceRegistry = Depends(get_registry)):
+    """
+    Server-sent events variant of /query.
+    Emits `agents` once selection is done, one `agent_result` per agent as it finishes,
+    `explanation_token` chunks while the explainer streams, then a final `done` event.
+    """
+    logger.info(f"Received streaming request body: {query.dict()}")
+    return StreamingResponse(
+        _stream_query(query, registry),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _stream_query(query: UserQuery, registry: ServiceRegistry) -> AsyncIterator[str]:
+    context = start_request_context(settings.QUERY_DEADLINE)
+    context.data = DataContext(registry.alpha_vantage)
+    aggregator = registry.aggregator
+    explainer = registry.explainer
+    agent_tasks = []
+    try:
+        financial_check, agents, response = await classify_and_select(query, registry)
+        if not financial_check.get("is_appropriate", True):
+            logger.info(f"Financial query rejected: {financial_check.get('reason')}")
+            rejection_message = generate_kind_rejection(
+                financial_check.get("reason", ""),
+                FINANCIAL_REJECTION_TEMPLATES
+            )
+            yield _sse("done", {"results": [], "explanation": rejection_message, "session_id": query.session_id})
+            return
+
+        if not agents:
+            yield _sse("error", {"detail": "No suitable agents found for query"})
+            return
+        yield _sse("agents", {
+            "agents": [agent.__class__.__name__ for agent in agents],
+            "symbol": response.get("symbol")
+        })
+
+        agent_tasks = [
+            asyncio.create_task(_run_agent(agent, _agent_query(agent, response, query.text), response, context))
+            for agent in agents
+        ]
+        results = []
+        for next_result in asyncio.as_completed(agent_tasks):
+            result = await next_result
+            results.append(result)
+            yield _sse("agent_result", result.dict())
+
+        processed_results = await aggregator.aggregate(results)
+
+        chunks = []
+        stream = explainer.explain_stream(processed_results, user_query=query.text)
+        try:
+            while True:
+                chunk = await asyncio.wait_for(stream.__anext__(), timeout=context.remaining())
+                chunks.append(chunk)
+                yield _sse("explanation_token", {"token": chunk})
+        except StopAsyncIteration:
+            pass
+        except asyncio.TimeoutError:
+            logger.warning("Query deadline reached while streaming the explanation")
+            if not chunks:
+                chunks.append(DEADLINE_EXPLANATION)
+        finally:
+            await stream.aclose()
+
+        yield _sse("done", {
+            "explanation": explainer.format_explanation("".join(chunks)),
+            "session_id": query.session_id
+        })
+    except Exception as e:
+        log_exception(logger, e)
+        yield _sse("error", {"detail": str(e)})
+    finally:
+        for task in agent_tasks:
+            task.cancel()
+        context.data.close()
+
+
+async def classify_and_select(query: UserQuery, registry: ServiceRegistry):
+    """
+    Runs the appropriateness check and agent selection concurrently. Market data for the
+    selected agents is prefetched into the request's data context as soon as selection is done,
+    whether or not classification is still pending. Classification, selection and prefetches
+    are cancelled when the query is rejected or the request itself is cancelled.
+    The stage shares the agents' share of the request deadline: a classification that misses it
+    lets the query through, as a failed one does, and a late selection falls back to the
+    selector's default agent.
+    Returns (financial_check, agents, response); agents and response are None on rejection.
+    """
+    context = get_request_context()
+    prefetch_tasks: List[asyncio.Task] = []
+
+    async def select_and_prefetch():
+        agents, response = await registry.selector.select_agents(query.text)
+        prefetch_tasks.extend(_prefetch_agent_data(agents, response))
+        return agents, response
+
+    check_task = asyncio.create_task(registry.llm.is_financial_query(query.text))
+    select_task = asyncio.create_task(select_and_prefetch())
+    accepted = False
+    try:
+        try:
+            financial_check = await asyncio.wait_for(check_task, timeout=_stage_budget(context))
+        except asyncio.TimeoutError:
+            logger.warning("Query deadline reached during classification, allowing the query")
+            financial_check = {"is_appropriate": True, "reason": "Classification timed out"}
+        if not financial_check.get("is_appropriate", True):
+            return financial_check, None, None
+
+        try:
+            agents, response = await asyncio.wait_for(select_task, timeout=_stage_budget(context))
+        except asyncio.TimeoutError:
+            logger.warning("Query deadline reached during agent selection, using the default agent")
+            agents, response = registry.selector.default_selection(query.text)
+            prefetch_tasks.extend(_prefetch_agent_data(agents, response))
+        accepted = True
+        return financial_check, agents, response
+    finally:
+        if not accepted:
+            for task in [check_task, select_task, *prefetch_tasks]:
+                task.cancel()
+
+
+def _prefetch_agent_data(agents: List, response: Dict[str, Any]) -> List[asyncio.Task]:
+    symbol = response.get("symbol")
+    if not symbol:
+        return []
+    functions = {function for agent in agents for function in agent.required_data}
+    logger.info(f"Prefetching {sorted(functions)} for {symbol}")
+    return get_data_context().prefetch(symbol, functions)
+
+
+async def _run_agent(agent, query: str, response: Dict[str, Any], context: RequestContext) -> AgentResponse:
+    """
+    Runs an agent within its AGENT_CONFIGS timeout, leaving QUERY_EXPLAIN_BUDGET seconds of the
+    request deadline for the explainer. An agent that misses its budget is cancelled and
+    reported as timed out so the rest of the query can complete with partial results.
+    """
+    budget = _agent_budget(agent, context)
+    try:
+        return await asyncio.wait_for(agent.process(query, response), timeout=budget)
+    except asyncio.TimeoutError:
+        logger.warning(f"{agent.agent_name} timed out after {budget:.1f}s")
+        message = f"Timed out after {budget:.1f}s"
+        return AgentResponse(
+            agent_name=agent.agent_name,
+            result={"error": message},
+            confidence=0.0,
+            error=message,
+            timed_out=True
+        )
+
+
+def _agent_budget(agent, context: RequestContext) -> Optional[float]:
+    budget = settings.AGENT_CONFIGS.get(agent.__class__.__name__, {}).get("timeout")
+    remaining = _stage_budget(context)
+    if remaining is not None:
+        budget = remaining if budget is None else min(budget, remaining)
+    return budget
+
+
+def _stage_budget(context: RequestContext) -> Optional[float]:
+    """Time left before the request deadline, minus what is reserved for the explainer"""
+    remaining = context.remaining()
+    if remaining is None:
+        return None
+    return max(remaining - settings.QUERY_EXPLAIN_BUDGET, 0.0)
+
+
+def _agent_query(agent, response: Dict[str, Any], default: str) -> str:
+    return response.get("paraphrased_queries", {}).get(agent.__class__.__name__) or default
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 
 def generate_kind_rejection(reason: str, templates: List[str]) -> str:
     import random
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException, Query, Path,  WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Query, Path, Response,  WebSocket, WebSocketDisconnect
 from core.logging import log_execution, log_exception
 from services.alpha_vantage import AlphaVantageService
+from services.rate_limiter import Priority
+from services.cache import set_data_age_headers
 from typing import Optional
 import logging
 import json
@@ -22,6 +24,7 @@ class DataType(str, Enum):
 @router.get("/daily/{symbol}")
 @log_execution
 async def get_daily_data(
+    response: Response,
     symbol: str = Path(..., description="Stock symbol, e.g. IBM, AAPL"),
     outputsize: Optional[OutputSize] = Query(None, description="Data size (compact: latest 100 data points, full: 20+ years of data)"),
     datatype: DataType = Query(DataType.JSON, description="Response format (json or csv)"),
@@ -32,10 +35,12 @@ async def get_daily_data(
         if outputsize:
             extra_params["outputsize"] = outputsize
         
-        data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_DAILY", extra_params)
+        entry = await alpha_vantage_service.fetch_entry(symbol, "TIME_SERIES_DAILY", extra_params)
+        data = entry.value if entry else None
         
         if not data:
             raise HTTPException(status_code=404, detail=f"No daily data found for {symbol}")
+        set_data_age_headers(response, entry)
         return data
     except Exception as e:
         log_exception(logger, e)
@@ -67,7 +72,7 @@ async def websocket_daily_data(
             extra_params["outputsize"] = outputsize
             
         # Get initial data
-        data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_DAILY", extra_params)
+        data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_DAILY", extra_params, priority=Priority.WEBSOCKET)
         
         if not data:
             await websocket.send_json({"error": f"No daily data found for {symbol}"})
@@ -86,7 +91,7 @@ async def websocket_daily_data(
             
             # Handle client commands
             if request.get("action") == "refresh":
-                data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_DAILY", extra_params)
+                data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_DAILY", extra_params, priority=Priority.WEBSOCKET)
                 if datatype == DataType.JSON:
                     await websocket.send_json(data)
                 else:
@@ -108,7 +113,7 @@ async def websocket_daily_data(
                         await websocket.send_json({"error": f"Invalid datatype: {request['datatype']}"})
                         continue
 
-                data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_DAILY", extra_params)
+                data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_DAILY", extra_params, priority=Priority.WEBSOCKET)
                 if datatype == DataType.JSON:
                     await websocket.send_json(data)
                 else:
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException, Query, Path, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Query, Path, Response, WebSocket, WebSocketDisconnect
 from core.logging import log_execution, log_exception
 from services.alpha_vantage import AlphaVantageService
+from services.rate_limiter import Priority
+from services.cache import set_data_age_headers
 from typing import Optional
 import logging
 from enum import Enum
@@ -31,6 +33,7 @@ class DataType(str, Enum):
 @router.get("/intraday/{symbol}")
 @log_execution
 async def get_intraday_data(
+    response: Response,
     symbol: str = Path(..., description="Stock symbol, e.g. IBM, AAPL"),
     interval: TimeSeriesInterval = Query(TimeSeriesInterval.FIVE_MIN, description="Time interval between data points"),
     adjusted: bool = Query(True, description="Whether to return adjusted data"),
@@ -53,10 +56,12 @@ async def get_intraday_data(
         if outputsize:
             extra_params["outputsize"] = outputsize
         
-        data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_INTRADAY", extra_params)
+        entry = await alpha_vantage_service.fetch_entry(symbol, "TIME_SERIES_INTRADAY", extra_params)
+        data = entry.value if entry else None
         
         if not data:
             raise HTTPException(status_code=404, detail=f"No intraday data found for {symbol}")
+        set_data_age_headers(response, entry)
         return data
     except Exception as e:
         log_exception(logger, e)
@@ -120,7 +125,7 @@ async def websocket_intraday_data(
         if validated_params.get("outputsize"):
             extra_params["outputsize"] = validated_params.get("outputsize")
             
-        data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_INTRADAY", extra_params)
+        data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_INTRADAY", extra_params, priority=Priority.WEBSOCKET)
         
         if not data:
             await websocket.send_json({"error": f"No intraday data found for {symbol}"})
@@ -137,7 +142,7 @@ async def websocket_intraday_data(
             request = json.loads(message)
             
             if request.get("action") == "refresh":
-                data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_INTRADAY", extra_params)
+                data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_INTRADAY", extra_params, priority=Priority.WEBSOCKET)
                 if current_datatype == DataType.JSON:
                     await websocket.send_json(data)
                 else:
@@ -179,7 +184,7 @@ async def websocket_intraday_data(
                     if validated_params.get("outputsize"):
                         extra_params["outputsize"] = validated_params.get("outputsize")
                     
-                    data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_INTRADAY", extra_params)
+                    data = await alpha_vantage_service.fetch(symbol, "TIME_SERIES_INTRADAY", extra_params, priority=Priority.WEBSOCKET)
                     if current_datatype == DataType.JSON:
                         await websocket.send_json(data)
                     else:
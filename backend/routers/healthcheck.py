@@ -1,6 +1,32 @@
 from fastapi import APIRouter
+from services.rate_limiter import alpha_vantage_limiter
+from services.cache import CacheService, local_cache
+from services.llm import llm_response_cache
+from services.circuit_breaker import breaker_snapshots
+from services.training_jobs import training_queue
 
 router = APIRouter()
 @router.get("/healthcheck")
 async def healthcheck():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@router.get("/healthcheck/cache")
+async def cache_healthcheck():
+    cache = CacheService()
+    return {"enabled": cache.enabled, "reachable": await cache.ping(), "local": local_cache.stats()}
+
+@router.get("/healthcheck/rate_limit")
+async def rate_limit_stats():
+    return {"alphavantage": alpha_vantage_limiter.stats()}
+
+@router.get("/healthcheck/llm_cache")
+async def llm_cache_stats():
+    return llm_response_cache.stats()
+
+@router.get("/healthcheck/llm")
+async def llm_healthcheck():
+    return {"providers": breaker_snapshots()}
+
+@router.get("/healthcheck/training")
+async def training_stats():
+    return training_queue.stats()
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, HTTPException, Query, Path,  WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 from core.logging import log_execution, log_exception
 from services.alpha_vantage import AlphaVantageService
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 import logging
 import json
 from enum import Enum
+from config.settings import settings
+from services.batch_prediction import BatchPredictor
 from services.price_tool import PricePredictionTool
+from services.training_jobs import JobStatus, training_queue
 
 router = APIRouter(tags=["prediction"])
 alpha_vantage_service = AlphaVantageService()
@@ -21,7 +25,120 @@ async def get_daily_data(
         raise HTTPException(status_code=400, detail="Symbol is required")
     
     price_tool = PricePredictionTool()
-    prediction = await price_tool.run_analysis(symbol)
+    await price_tool.fetch_data(symbol)
+    await price_tool.add_indicators()
+
+    # Predict with a registered model; if one has to be trained first and that takes longer
+    # than PREDICTION_TRAINING_WAIT, hand back the job so the client can poll for it
+    job = await price_tool.prepare_model(wait=settings.PREDICTION_TRAINING_WAIT)
+    if job is not None:
+        return JSONResponse(status_code=202, content={"job": job.to_dict()})
+
+    prediction = await price_tool.predict()
     logger.info(f"Prediction for {symbol}: {prediction}")
 
     return {"prediction": prediction}
+
+
+@router.post("/prediction/batch")
+@log_execution
+async def batch_prediction(
+    data: dict
+):
+    """
+    Predicts many symbols at once and streams Server-Sent Events as each symbol finishes:
+    `prediction` for a ready model, `job` when its model is still training, `error` per failed
+    symbol and horizon, then a final `done` event with the counts. Horizons are numbers of bars
+    of the 5-minute intraday series; each prediction reports its `prediction_date`.
+    """
+    symbols = data.get("symbols")
+    if not symbols or not isinstance(symbols, list):
+        raise HTTPException(status_code=400, detail="Symbols are required")
+    if len(symbols) > settings.BATCH_PREDICTION_MAX_SYMBOLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_PREDICTION_MAX_SYMBOLS} symbols per batch"
+        )
+    if not all(isinstance(symbol, str) and symbol for symbol in symbols):
+        raise HTTPException(status_code=400, detail="Symbols must be non-empty strings")
+    horizons = data.get("horizons") or [5]
+    if not isinstance(horizons, list) or not all(
+        isinstance(horizon, int) and not isinstance(horizon, bool) and horizon > 0 for horizon in horizons
+    ):
+        raise HTTPException(status_code=400, detail="Horizons must be a list of positive numbers of bars")
+    train_wait = data.get("train_wait", 0)
+    if train_wait is not None and (
+        not isinstance(train_wait, (int, float)) or isinstance(train_wait, bool) or train_wait < 0
+    ):
+        raise HTTPException(status_code=400, detail="train_wait must be a non-negative number of seconds or null")
+
+    return StreamingResponse(
+        _stream_batch(symbols, horizons, train_wait),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _stream_batch(symbols: List[str], horizons: List[int], train_wait: Optional[float]) -> AsyncIterator[str]:
+    counts = {"ok": 0, "training": 0, "error": 0}
+    predictor = BatchPredictor(alpha_vantage_service)
+    try:
+        async for item in predictor.predict(symbols, horizons, train_wait=train_wait):
+            counts[item["status"]] += 1
+            event = {"ok": "prediction", "training": "job", "error": "error"}[item["status"]]
+            yield _sse(event, item)
+        yield _sse("done", counts)
+    except Exception as e:
+        log_exception(logger, e)
+        yield _sse("error", {"detail": str(e)})
+
+
+@router.post("/prediction/jobs", status_code=202)
+@log_execution
+async def submit_training_job(
+    data: dict
+):
+    symbol = data.get("symbol")
+    if not symbol:
+        raise HTTPException(status_code=400, detail="Symbol is required")
+
+    price_tool = PricePredictionTool()
+    await price_tool.fetch_data(symbol)
+    await price_tool.add_indicators()
+    job = price_tool.submit_training(
+        n_estimators=data.get("n_estimators", 100),
+        random_state=data.get("random_state", 42)
+    )
+    return {"job": job.to_dict()}
+
+
+@router.get("/prediction/jobs/{job_id}")
+async def get_training_job(job_id: str = Path(..., description="Training job id")):
+    return {"job": _get_job(job_id).to_dict()}
+
+
+@router.get("/prediction/jobs/{job_id}/result")
+async def get_training_job_result(job_id: str = Path(..., description="Training job id")):
+    job = _get_job(job_id)
+    if job.status != JobStatus.SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status.value}")
+    return {"job": job.to_dict(), "result": job.result}
+
+
+@router.delete("/prediction/jobs/{job_id}")
+async def cancel_training_job(job_id: str = Path(..., description="Training job id")):
+    job = training_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job": job.to_dict()}
+
+
+def _get_job(job_id: str):
+    job = training_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
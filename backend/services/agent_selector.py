@@ -3,7 +3,7 @@ from typing import List, Tuple, Dict, Type
 import json
 import logging
 from core.logging import log_exception
-from services.llm import GeminiService, ChatGPTService
+from services.llm import GeminiService, ChatGPTService, query_llms
 from agents.base import BaseAgent
 from agents.technical import TechnicalAgent
 from agents.sentiment import SentimentAgent
@@ -12,12 +12,18 @@ from agents.risk import RiskAgent
 from agents.portfolio import PortfolioAgent
 from config.settings import settings
 from prompts.prompts import AGENT_SELECTOR_PROMPT
+from services.local_router import LocalAgentRouter
+from services.symbol_resolver import get_symbol_resolver
 
 class AgentSelector:
     def __init__(self):
         self.logger = logging.getLogger("AgentSelector")
         self.llms = self._initialize_llms()
         self._initialize_agents()
+        self.local_router = (
+            LocalAgentRouter(self.available_agents.keys(), settings.LOCAL_ROUTER_MIN_CONFIDENCE)
+            if settings.LOCAL_ROUTER_ENABLED else None
+        )
 
     def _initialize_agents(self):
         """Initialize agent mapping based on configuration"""
@@ -36,6 +42,14 @@ class AgentSelector:
             if settings.AGENT_CONFIGS[name]["enabled"]
         }
 
+        # Agents are long-lived and shared by concurrent requests
+        self.agents: Dict[str, BaseAgent] = {}
+        for name, agent_class in self.available_agents.items():
+            try:
+                self.agents[name] = agent_class()
+            except Exception as e:
+                log_exception(self.logger, e, f"Failed to initialize {name}")
+
     def _initialize_llms(self):
         llm_instances = []
         for llm in settings.LLM_PIORITY:
@@ -46,17 +60,17 @@ class AgentSelector:
         return llm_instances
     
     async def _query_llm(self, query: str, **kwargs) -> str:
-        for llm in self.llms:
-            try:
-                self.logger.info(f"Querying LLM: {llm.__class__.__name__}")
-                response = await llm.analyze(query, **kwargs)
-                if response:
-                    return response
-            except Exception as e:
-                log_exception(self.logger, e) 
+        return await query_llms(self.llms, query, self.logger, **kwargs)
 
-    async def select_agents(self, query: str) -> Tuple[List[BaseAgent], str]:
+    async def select_agents(self, query: str) -> Tuple[List[BaseAgent], Dict]:
         try:
+            if self.local_router:
+                response = self.local_router.route(query)
+                if response:
+                    agents = self._initialize_selected_agents(response["selected"])
+                    self.logger.info(f"Locally selected agents: {response['selected']} for symbol: {response['symbol']}")
+                    return agents, response
+
             prompt = self._build_selection_prompt(query)
             response_text = await self._query_llm(prompt)
             # Parse the response
@@ -67,8 +81,9 @@ class AgentSelector:
             except json.JSONDecodeError as e:
                 log_exception(self.logger, e, "Failed to parse Gemini response")
                 # Fallback to default selection
-                selected_agents = ['technical','sentiment']
+                selected_agents = ['TechnicalAgent', 'SentimentAgent']
                 symbol = self._extract_symbol_fallback(query)
+                response = {"selected": selected_agents, "paraphrased_queries": {}}
                 
             # Validate symbol
             if not symbol:
@@ -83,37 +98,38 @@ class AgentSelector:
         except Exception as e:
             log_exception(self.logger, e, "Agent selection failed")
             # Fallback to technical analysis only
-            return [TechnicalAgent()], "AAPL"
+            return [self._fallback_agent()], {"selected": ["TechnicalAgent"], "symbol": "AAPL", "paraphrased_queries": {}}
+
+    def default_selection(self, query: str) -> Tuple[List[BaseAgent], Dict]:
+        """Technical analysis of the symbol found locally, for when selection cannot finish in time"""
+        symbol = self._extract_symbol_fallback(query)
+        return [self._fallback_agent()], {"selected": ["TechnicalAgent"], "symbol": symbol, "paraphrased_queries": {}}
 
     def _build_selection_prompt(self, query: str) -> str:
         available_agents = list(self.available_agents.keys()) if self.available_agents else []
         return AGENT_SELECTOR_PROMPT.format(available_agents=", ".join(available_agents), query=query)
 
     def _initialize_selected_agents(self, selected_agents: List[str]) -> List[BaseAgent]:
-        """Initialize the selected agents"""
-        initialized_agents = []
-        
-        for agent_name in selected_agents:
-            if agent_name in self.available_agents:
-                try:
-                    agent_class = self.available_agents[agent_name]
-                    initialized_agents.append(agent_class())
-                except Exception as e:
-                    log_exception(self.logger, e, f"Failed to initialize {agent_name}")
+        """Look up the shared instances of the selected agents"""
+        initialized_agents = [
+            self.agents[agent_name]
+            for agent_name in dict.fromkeys(selected_agents)
+            if agent_name in self.agents
+        ]
         
         # Ensure at least technical agent is included
         if not initialized_agents:
             self.logger.warning("No valid agents selected, falling back to TechnicalAgent")
-            initialized_agents.append(TechnicalAgent())
+            initialized_agents.append(self._fallback_agent())
             
         return initialized_agents
 
+    def _fallback_agent(self) -> BaseAgent:
+        if "TechnicalAgent" not in self.agents:
+            self.agents["TechnicalAgent"] = TechnicalAgent()
+        return self.agents["TechnicalAgent"]
+
     def _extract_symbol_fallback(self, query: str) -> str:
         """Fallback method to extract symbol from query"""
-        common_symbols = ["IBM", "AAPL", "GOOGL", "MSFT", "AMZN"]
-        
-        for symbol in common_symbols:
-            if symbol in query.upper():
-                return symbol
-                
-        return "IBM" 
+        symbol, _ = get_symbol_resolver().resolve(query)
+        return symbol or "IBM"
@@ -1,11 +1,19 @@
-import requests
+import asyncio
+import time
 from typing import Optional, Dict
+from enum import Enum
 import logging
 from core.logging import log_exception, log_execution
 from config.settings import settings
-from services.cache import CacheService
+from services.cache import CacheService, CacheEntry
+from services.http_client import get_http_client
+from services.rate_limiter import Priority, alpha_vantage_limiter
 
 class AlphaVantageService:
+    # Shared across instances so every agent/router in the process coalesces onto the same request
+    _inflight: Dict[str, asyncio.Task] = {}
+    _waiters: Dict[str, int] = {}
+
     def __init__(self):
         self.api_key = settings.ALPHA_VANTAGE_KEY
         self.base_url = "https://www.alphavantage.co/query"
@@ -13,7 +21,17 @@ class AlphaVantageService:
         self.cache = CacheService()
 
     @log_execution
-    async def fetch(self, symbol: str, function: str, extra_params: Optional[Dict] = None) -> Optional[Dict]:
+    async def fetch(self, symbol: str, function: str, extra_params: Optional[Dict] = None,
+                    priority: Priority = Priority.INTERACTIVE) -> Optional[Dict]:
+        entry = await self.fetch_entry(symbol, function, extra_params, priority)
+        return entry.value if entry else None
+
+    async def fetch_entry(self, symbol: str, function: str, extra_params: Optional[Dict] = None,
+                          priority: Priority = Priority.INTERACTIVE) -> Optional[CacheEntry]:
+        """
+        Same as fetch but returns a CacheEntry so callers can report how old the data is.
+        Entries past their soft TTL are returned immediately while one background refresh runs.
+        """
         try:
             self.logger.info(f"Fetching {function} data for {symbol}")
             cache_key_parts = ["alphavantage", symbol, function]
@@ -22,40 +40,102 @@ class AlphaVantageService:
                     cache_key_parts.append(f"{key}_{extra_params[key]}")
             cache_key = self.cache.build_key(*cache_key_parts)
 
-            cached_data = await self.cache.get(cache_key)
-            if cached_data:
-                self.logger.info(f"Cache hit for {symbol} {function}")
-                return cached_data
-            
-            params = {
-                "function": function,
-                "symbol": symbol,
-                "apikey": self.api_key
-            }
-            
-            if function in ["TIME_SERIES_INTRADAY", "TIME_SERIES_DAILY"]:
-                params.setdefault("interval", "5min")
-            if function == "NEWS_SENTIMENT":
-                params.setdefault("sort", "RELEVANCE")
+            cached = await self.cache.get_entry(cache_key)
+            if cached and cached.value:
+                if cached.is_stale:
+                    self.logger.info(f"Serving stale {symbol} {function} ({cached.age:.0f}s old), refreshing in background")
+                    task = self._start_upstream(symbol, function, extra_params, cache_key, Priority.BACKGROUND)
+                    task.add_done_callback(self._log_background_failure)
+                else:
+                    self.logger.info(f"Cache hit for {symbol} {function}")
+                return cached
 
-            if extra_params:
-                params.update(extra_params)
+            task = self._start_upstream(symbol, function, extra_params, cache_key, priority)
+            data = await self._wait_for_upstream(cache_key, task)
+            return CacheEntry(data, time.time())
+        except Exception as e:
+            log_exception(self.logger, e, "AlphaVantage fetch error:")
+            return None
 
-            self.logger.info(f"Fetching {function} data for {symbol}")
-            response = requests.get(self.base_url, params=params)
+    def _start_upstream(self, symbol: str, function: str, extra_params: Optional[Dict],
+                        cache_key: str, priority: Priority) -> asyncio.Task:
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_upstream(symbol, function, extra_params, cache_key, priority))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda done: self._release_inflight(cache_key, done))
+        else:
+            self.logger.info(f"Joining in-flight request for {symbol} {function}")
+            # The shared request was queued at the first caller's priority; a more urgent
+            # caller should not wait behind background work for the same data
+            alpha_vantage_limiter.escalate(cache_key, priority)
+        return task
+
+    async def _wait_for_upstream(self, cache_key: str, task: asyncio.Task) -> Dict:
+        # Shield so a cancelled caller does not cancel the request other callers are waiting on;
+        # the upstream request is only abandoned once its last waiter has gone away
+        self._waiters[cache_key] = self._waiters.get(cache_key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[cache_key] == 1 and not task.done():
+                self.logger.info(f"Cancelling upstream request for {cache_key}, no callers left")
+                task.cancel()
+            raise
+        finally:
+            self._waiters[cache_key] -= 1
+            if not self._waiters[cache_key]:
+                del self._waiters[cache_key]
+
+    def _release_inflight(self, cache_key: str, task: asyncio.Task):
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+        if not task.cancelled():
+            # Mark the exception as retrieved; callers that awaited the task already logged it
+            task.exception()
+
+    def _log_background_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.warning(f"Background refresh failed, keeping stale data: {task.exception()}")
+
+    async def _fetch_upstream(self, symbol: str, function: str, extra_params: Optional[Dict],
+                              cache_key: str, priority: Priority) -> Dict:
+        params = {
+            "function": function,
+            "symbol": symbol,
+            "apikey": self.api_key
+        }
+        
+        if function in ["TIME_SERIES_INTRADAY", "TIME_SERIES_DAILY"]:
+            params.setdefault("interval", "5min")
+        if function == "NEWS_SENTIMENT":
+            params.setdefault("sort", "RELEVANCE")
+
+        if extra_params:
+            params.update(extra_params)
+        params = {
+            key: value.value if isinstance(value, Enum) else value
+            for key, value in params.items()
+        }
+
+        await alpha_vantage_limiter.acquire(priority, key=cache_key)
+        self.logger.info(f"Fetching {function} data for {symbol}")
+        response = await get_http_client().get(self.base_url, params=params)
+        response.raise_for_status()
+        if params.get("datatype") == "csv" and not response.text.lstrip().startswith("{"):
+            data = response.text
+        else:
             data = response.json()
 
-            # self.logger.info(f"Received {data} data for {symbol}")
-            
-            if "Error Message" in data:
-                raise ValueError(data["Error Message"])
-            
-            if "Information" in data and "rate limit" in data["Information"].lower():
-                raise ValueError("API rate limit exceeded")
-            self.logger.info(f"Setting cache for {symbol} {function}")
-            await self.cache.set(cache_key, data)
-            
-            return data
-        except Exception as e:
-            log_exception(self.logger, e, "AlphaVantage fetch error:")
-            return None
\ No newline at end of file
+        # self.logger.info(f"Received {data} data for {symbol}")
+        
+        if isinstance(data, dict) and "Error Message" in data:
+            raise ValueError(data["Error Message"])
+        
+        if isinstance(data, dict) and "Information" in data and "rate limit" in data["Information"].lower():
+            alpha_vantage_limiter.penalize()
+            raise ValueError("API rate limit exceeded")
+        self.logger.info(f"Setting cache for {symbol} {function}")
+        await self.cache.set_entry(cache_key, data)
+        
+        return data
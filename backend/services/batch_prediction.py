@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+from config.settings import settings
+from core.context import start_request_context
+from core.logging import log_exception
+from services.alpha_vantage import AlphaVantageService
+from services.data_context import DataContext
+from services.price_tool import PricePredictionTool
+
+
+class BatchPredictor:
+    """
+    Predicts many symbols and horizons (in bars) in one call. Symbols are fetched and featurized with
+    bounded concurrency; each symbol's indicator frame is computed once and shared by all its
+    horizons, and each (symbol, horizon) model scores its latest row in a single call.
+    Results are yielded as soon as each symbol finishes.
+    """
+
+    def __init__(self, alpha_vantage: Optional[AlphaVantageService] = None,
+                 model_directory: str = settings.MODEL_DIRECTORY,
+                 concurrency: int = settings.BATCH_PREDICTION_CONCURRENCY):
+        self.alpha_vantage = alpha_vantage or AlphaVantageService()
+        self.model_directory = model_directory
+        self.concurrency = concurrency
+        self.logger = logging.getLogger("BatchPredictor")
+
+    async def predict(self, symbols: List[str], horizons: List[int],
+                      train_wait: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields one item per symbol and horizon with a `status` of "ok" (with `prediction`),
+        "training" (with the `job` to poll when no model was ready within train_wait seconds)
+        or "error" (with `error`).
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [
+            asyncio.create_task(self._predict_symbol(symbol, horizons, semaphore, train_wait))
+            for symbol in dict.fromkeys(symbol.upper() for symbol in symbols)
+        ]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                for item in await next_result:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _predict_symbol(self, symbol: str, horizons: List[int], semaphore: asyncio.Semaphore,
+                              train_wait: Optional[float]) -> List[Dict[str, Any]]:
+        # Each symbol runs in its own task, so this context and its parsed frames are released
+        # as soon as the symbol is done rather than held for the whole batch
+        context = start_request_context()
+        context.data = DataContext(self.alpha_vantage)
+        try:
+            async with semaphore:
+                tool = PricePredictionTool(self.model_directory)
+                await tool.fetch_data(symbol)
+                await tool.add_indicators()
+        except Exception as e:
+            log_exception(self.logger, e, f"Batch data preparation failed for {symbol}")
+            return [{"symbol": symbol, "horizon": horizon, "status": "error", "error": str(e)} for horizon in horizons]
+        finally:
+            context.data.close()
+
+        # Training runs in the job queue; models for every horizon train and load concurrently
+        return await asyncio.gather(*[
+            self._predict_horizon(tool.for_horizon(horizon), horizon, train_wait)
+            for horizon in horizons
+        ])
+
+    async def _predict_horizon(self, tool: PricePredictionTool, horizon: int,
+                               train_wait: Optional[float]) -> Dict[str, Any]:
+        item = {"symbol": tool.symbol, "horizon": horizon}
+        try:
+            job = await tool.prepare_model(wait=train_wait)
+            if job is not None:
+                return {**item, "status": "training", "job": job.to_dict()}
+            return {**item, "status": "ok", "prediction": await tool.predict()}
+        except Exception as e:
+            log_exception(self.logger, e, f"Batch prediction failed for {tool.symbol} ({horizon})")
+            return {**item, "status": "error", "error": str(e)}
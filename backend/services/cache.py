@@ -1,24 +1,154 @@
-import redis
-import json
+import redis.asyncio as redis
+import asyncio
 import logging
+import time
+import uuid
 from typing import Optional, Any
 from config.settings import settings
 from core.logging import log_exception
 from collections import OrderedDict
+from services.local_cache import LocalCache
+from services.codec import cache_codec
+from services.market_calendar import market_ttl_policy
+
+_pool: Optional[redis.BlockingConnectionPool] = None
+
+# Process-wide L1 tier shared by every CacheService instance
+local_cache = LocalCache(settings.CACHE_L1_MAX_ENTRIES, settings.CACHE_L1_MAX_BYTES)
+_instance_id = uuid.uuid4().hex
+_invalidation_task: Optional[asyncio.Task] = None
+
+ENTRY_MARKER = "__cache_entry__"
+
+
+class CacheEntry:
+    def __init__(self, value: Any, stored_at: Optional[float] = None, soft_ttl: Optional[int] = None):
+        self.value = value
+        self.stored_at = stored_at
+        self.soft_ttl = soft_ttl
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the value was stored, None for entries written without a timestamp"""
+        if self.stored_at is None:
+            return None
+        return max(time.time() - self.stored_at, 0.0)
+
+    @property
+    def is_stale(self) -> bool:
+        if self.stored_at is None or self.soft_ttl is None:
+            return False
+        return self.age > self.soft_ttl
+
+
+def set_data_age_headers(response, entry: Optional[CacheEntry]):
+    """Reports how old a served cache entry is on an HTTP response"""
+    if response is None or entry is None or entry.age is None:
+        return
+    response.headers["X-Data-Age"] = f"{entry.age:.0f}"
+    response.headers["X-Data-Stale"] = str(entry.is_stale).lower()
+
+
+def get_redis_pool() -> redis.BlockingConnectionPool:
+    """
+    Returns the process-wide Redis connection pool.
+    Callers wait up to REDIS_POOL_TIMEOUT for a free connection instead of opening new ones.
+    """
+    global _pool
+    if _pool is None:
+        _pool = redis.BlockingConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL
+        )
+    return _pool
+
+
+async def close_redis_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.disconnect()
+    _pool = None
+
+
+def _pubsub_client() -> redis.Redis:
+    """
+    Client with its own connection for the invalidation subscription. Pooled connections carry
+    REDIS_SOCKET_TIMEOUT, which an idle subscription would hit every few seconds.
+    """
+    pool = get_redis_pool()
+    return redis.Redis(connection_pool=redis.ConnectionPool(
+        connection_class=pool.connection_class,
+        max_connections=1,
+        **{**pool.connection_kwargs, "socket_timeout": None}
+    ))
+
+
+async def _listen_for_invalidations():
+    logger = logging.getLogger("CacheService")
+    client = _pubsub_client()
+    try:
+        while True:
+            try:
+                async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+                    while True:
+                        # Returns None when idle; the wait doubles as the connection health check
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True,
+                            timeout=settings.REDIS_HEALTH_CHECK_INTERVAL
+                        )
+                        if message is None:
+                            continue
+                        origin, _, key = message["data"].decode("utf-8").partition("|")
+                        if origin != _instance_id:
+                            local_cache.invalidate(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The connection dropped and invalidations may have been missed
+                log_exception(logger, e, "Cache invalidation listener disconnected, resubscribing")
+                local_cache.clear()
+                await asyncio.sleep(1)
+    finally:
+        await client.aclose()
+        await client.connection_pool.disconnect()
+
+
+def start_invalidation_listener():
+    """Subscribes this worker to L1 invalidations published by other workers"""
+    global _invalidation_task
+    if settings.CACHE_ENABLED and settings.CACHE_L1_ENABLED and _invalidation_task is None:
+        _invalidation_task = asyncio.create_task(_listen_for_invalidations())
+
+
+async def stop_invalidation_listener():
+    global _invalidation_task
+    if _invalidation_task is not None:
+        _invalidation_task.cancel()
+        try:
+            await _invalidation_task
+        except asyncio.CancelledError:
+            pass
+    _invalidation_task = None
+
 
 class CacheService:
     def __init__(self):
         self.logger = logging.getLogger("CacheService")
         self.enabled = settings.CACHE_ENABLED
+        self.local = local_cache if settings.CACHE_L1_ENABLED else None
         if self.enabled:
-            self.redis = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                password=settings.REDIS_PASSWORD,
-                decode_responses=True
-            )
+            self.redis = redis.Redis(connection_pool=get_redis_pool())
+        self.codec = cache_codec
         self.default_ttl = settings.CACHE_TTL
+        self.ttl_policy = market_ttl_policy if settings.CACHE_MARKET_HOURS_TTL else None
         self.ttl_mapping = OrderedDict([
             ("TIME_SERIES_INTRADAY", 3600),
             ("TIME_SERIES_DAILY", 86400),
@@ -31,31 +161,113 @@ class CacheService:
             return None
             
         try:
-            data = self.redis.get(key)
-            if data:
-                return json.loads(data)
+            data = await self._get_stored(key)
+            if isinstance(data, dict) and data.get(ENTRY_MARKER):
+                return data["value"]
+            return data
+        except Exception as e:
+            log_exception(self.logger, e, f"Cache get error for key {key}")
             return None
+
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Returns the cached value together with its age, including entries past their soft TTL"""
+        if not self.enabled:
+            return None
+
+        try:
+            data = await self._get_stored(key)
+            if data is None:
+                return None
+            if isinstance(data, dict) and data.get(ENTRY_MARKER):
+                return CacheEntry(data["value"], data["stored_at"], data["soft_ttl"])
+            return CacheEntry(data)
         except Exception as e:
             log_exception(self.logger, e, f"Cache get error for key {key}")
             return None
 
+    async def _get_stored(self, key: str) -> Optional[Any]:
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            data, remaining_ttl = await pipe.get(key).ttl(key).execute()
+        if data:
+            value = self.codec.decode(data)
+            if self.local is not None and remaining_ttl > 0:
+                self.local.set(key, value, remaining_ttl, self.codec.payload_size(data))
+            return value
+        return None
+
     async def set(self, key: str, value: Any, ttl: int = None) -> bool:
         if not self.enabled:
             return False
             
         try:
             if ttl is None:
-                for cache_type, cache_ttl in self.ttl_mapping.items():
-                    if cache_type in key:
-                        ttl = cache_ttl
-                        break
-                else:
-                    ttl = self.default_ttl
-            value_str = json.dumps(value,default=str)
-            return self.redis.setex(key, ttl, value_str)
+                ttl = self.resolve_ttl(key)
+            payload = self.codec.encode(value)
+            result = await self.redis.setex(key, ttl, payload)
+            await self._invalidate_local(key)
+            return result
         except Exception as e:
             log_exception(self.logger, e, f"Cache set error for key {key}")
             return False
 
+    async def set_entry(self, key: str, value: Any, soft_ttl: int = None, stale_ttl: int = None) -> bool:
+        """
+        Stores a value that is fresh for soft_ttl seconds and kept for another stale_ttl
+        seconds so it can still be served while a refresh is pending or the upstream fails.
+        """
+        if soft_ttl is None:
+            soft_ttl = self.resolve_ttl(key)
+        if stale_ttl is None:
+            stale_ttl = settings.CACHE_STALE_TTL
+        entry = {
+            ENTRY_MARKER: 1,
+            "value": value,
+            "stored_at": time.time(),
+            "soft_ttl": soft_ttl,
+        }
+        return await self.set(key, entry, ttl=soft_ttl + stale_ttl)
+
+    def resolve_ttl(self, key: str) -> int:
+        if self.ttl_policy is not None:
+            ttl = self.ttl_policy.ttl_for(key)
+            if ttl:
+                return ttl
+        for cache_type, cache_ttl in self.ttl_mapping.items():
+            if cache_type in key:
+                return cache_ttl
+        return self.default_ttl
+
+    async def delete(self, key: str) -> bool:
+        if not self.enabled:
+            return False
+
+        try:
+            result = await self.redis.delete(key)
+            await self._invalidate_local(key)
+            return bool(result)
+        except Exception as e:
+            log_exception(self.logger, e, f"Cache delete error for key {key}")
+            return False
+
+    async def _invalidate_local(self, key: str):
+        if self.local is None:
+            return
+        self.local.invalidate(key)
+        await self.redis.publish(settings.CACHE_INVALIDATION_CHANNEL, f"{_instance_id}|{key}")
+
+    async def ping(self) -> bool:
+        if not self.enabled:
+            return False
+        try:
+            return await self.redis.ping()
+        except Exception as e:
+            log_exception(self.logger, e, "Cache ping failed")
+            return False
+
     def build_key(self, *args) -> str:
         return ":".join(str(arg) for arg in args)
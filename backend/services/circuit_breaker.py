@@ -0,0 +1,148 @@
+import logging
+import time
+from collections import deque
+from enum import Enum
+from typing import Deque, Dict, Tuple
+from config.settings import settings
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Tracks a rolling window of call outcomes for one provider.
+    Opens when the error rate or slow-call rate crosses its threshold, rejects calls while open,
+    and lets a limited number of probe calls through once open_seconds have passed.
+    """
+
+    def __init__(self, name: str, failure_rate: float, slow_call_seconds: float, slow_call_rate: float,
+                 window_seconds: float, min_calls: int, open_seconds: float, half_open_calls: int):
+        self.name = name
+        self.logger = logging.getLogger(f"CircuitBreaker.{name}")
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self.state = CircuitState.CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        # (finished_at, succeeded, latency)
+        self._calls: Deque[Tuple[float, bool, float]] = deque()
+
+    def allow_request(self) -> bool:
+        """Returns True if a call may proceed; a granted half-open probe must be reported back"""
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self._transition(CircuitState.HALF_OPEN)
+        if self.state == CircuitState.HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_calls:
+                return False
+            self.probes_in_flight += 1
+        return True
+
+    def is_rejecting(self) -> bool:
+        """True if allow_request would refuse a call right now; does not admit a probe"""
+        if self.state == CircuitState.OPEN:
+            return time.monotonic() - self.opened_at < self.open_seconds
+        if self.state == CircuitState.HALF_OPEN:
+            return self.probes_in_flight >= self.half_open_calls
+        return False
+
+    def record_success(self, latency: float):
+        if self.state == CircuitState.HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+            if latency < self.slow_call_seconds:
+                self._calls.clear()
+                self._transition(CircuitState.CLOSED)
+            else:
+                self._trip()
+            return
+        self._record(True, latency)
+
+    def record_failure(self, latency: float):
+        if self.state == CircuitState.HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+            self._trip()
+            return
+        self._record(False, latency)
+
+    def release(self):
+        """Called when a granted call was cancelled before it produced an outcome"""
+        if self.state == CircuitState.HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+
+    def snapshot(self) -> Dict:
+        self._prune(time.monotonic())
+        total = len(self._calls)
+        failures = sum(1 for _, ok, _ in self._calls if not ok)
+        slow = sum(1 for _, _, latency in self._calls if latency >= self.slow_call_seconds)
+        latencies = sorted(latency for _, _, latency in self._calls)
+        return {
+            "state": self.state.value,
+            "calls": total,
+            "error_rate": failures / total if total else 0.0,
+            "slow_call_rate": slow / total if total else 0.0,
+            "p50_latency": latencies[len(latencies) // 2] if latencies else None,
+            "max_latency": latencies[-1] if latencies else None,
+            "open_for_seconds": max(self.open_seconds - (time.monotonic() - self.opened_at), 0.0)
+            if self.state == CircuitState.OPEN else 0.0,
+        }
+
+    def _record(self, succeeded: bool, latency: float):
+        now = time.monotonic()
+        self._calls.append((now, succeeded, latency))
+        self._prune(now)
+        if self.state != CircuitState.CLOSED or len(self._calls) < self.min_calls:
+            return
+        total = len(self._calls)
+        failures = sum(1 for _, ok, _ in self._calls if not ok)
+        slow = sum(1 for _, _, call_latency in self._calls if call_latency >= self.slow_call_seconds)
+        if failures / total >= self.failure_rate or slow / total >= self.slow_call_rate:
+            self._trip()
+
+    def _prune(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _trip(self):
+        self.opened_at = time.monotonic()
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState):
+        if state != self.state:
+            self.logger.warning(f"Circuit {self.name}: {self.state.value} -> {state.value}")
+        self.state = state
+        if state != CircuitState.HALF_OPEN:
+            self.probes_in_flight = 0
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Returns the process-wide breaker for a provider, creating it on first use"""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(
+            name,
+            failure_rate=settings.LLM_BREAKER_FAILURE_RATE,
+            slow_call_seconds=settings.LLM_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate=settings.LLM_BREAKER_SLOW_CALL_RATE,
+            window_seconds=settings.LLM_BREAKER_WINDOW_SECONDS,
+            min_calls=settings.LLM_BREAKER_MIN_CALLS,
+            open_seconds=settings.LLM_BREAKER_OPEN_SECONDS,
+            half_open_calls=settings.LLM_BREAKER_HALF_OPEN_CALLS,
+        )
+    return _breakers[name]
+
+
+def breaker_snapshots() -> Dict[str, Dict]:
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
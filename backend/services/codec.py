@@ -0,0 +1,126 @@
+import json
+import logging
+import struct
+import zlib
+from typing import Any
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+from config.settings import settings
+
+# magic, version, serializer id, compression id, uncompressed payload length
+HEADER = struct.Struct(">2sBBBI")
+MAGIC = b"\xc1\xca"  # 0xc1 is never emitted by msgpack and cannot start a JSON document
+VERSION = 1
+
+SERIALIZERS = {"json": 0, "msgpack": 1}
+COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+
+
+class CacheCodec:
+    """
+    Encodes cache values as a versioned binary envelope.
+    Payloads above the threshold are compressed; values written as plain JSON by
+    earlier releases are still decoded.
+    """
+
+    def __init__(self, serializer: str = "msgpack", compression: str = "zstd",
+                 threshold: int = 1024, level: int = 3):
+        self.logger = logging.getLogger("CacheCodec")
+        if serializer == "msgpack" and msgpack is None:
+            self.logger.warning("msgpack not installed, falling back to JSON cache serialization")
+            serializer = "json"
+        if compression == "zstd" and zstandard is None:
+            self.logger.warning("zstandard not installed, falling back to zlib cache compression")
+            compression = "zlib"
+        if compression == "lz4" and lz4_frame is None:
+            self.logger.warning("lz4 not installed, falling back to zlib cache compression")
+            compression = "zlib"
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unsupported cache serializer: {serializer}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unsupported cache compression: {compression}")
+
+        self.serializer = serializer
+        self.compression = compression
+        self.threshold = threshold
+        self.level = level
+        if compression == "zstd":
+            self._zstd_compressor = zstandard.ZstdCompressor(level=level)
+
+    def encode(self, value: Any) -> bytes:
+        if self.serializer == "msgpack":
+            payload = msgpack.packb(value, default=str, use_bin_type=True)
+        else:
+            payload = json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+
+        compression = self.compression if len(payload) >= self.threshold else "none"
+        header = HEADER.pack(MAGIC, VERSION, SERIALIZERS[self.serializer], COMPRESSIONS[compression], len(payload))
+        return header + self._compress(payload, compression)
+
+    def decode(self, data: bytes) -> Any:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if not data.startswith(MAGIC):
+            return json.loads(data)
+
+        _, version, serializer_id, compression_id, size = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f"Unsupported cache payload version: {version}")
+        payload = self._decompress(data[HEADER.size:], compression_id, size)
+
+        if serializer_id == SERIALIZERS["msgpack"]:
+            if msgpack is None:
+                raise ValueError("Cached payload requires msgpack which is not installed")
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        return json.loads(payload)
+
+    @staticmethod
+    def payload_size(data: bytes) -> int:
+        """Uncompressed size of an encoded value, used for memory accounting"""
+        if data.startswith(MAGIC):
+            return HEADER.unpack_from(data)[4]
+        return len(data)
+
+    def _compress(self, payload: bytes, compression: str) -> bytes:
+        if compression == "zstd":
+            return self._zstd_compressor.compress(payload)
+        if compression == "lz4":
+            return lz4_frame.compress(payload, compression_level=self.level)
+        if compression == "zlib":
+            return zlib.compress(payload, self.level)
+        return payload
+
+    def _decompress(self, payload: bytes, compression_id: int, size: int) -> bytes:
+        if compression_id == COMPRESSIONS["zstd"]:
+            if zstandard is None:
+                raise ValueError("Cached payload requires zstandard which is not installed")
+            return zstandard.ZstdDecompressor().decompress(payload, max_output_size=size)
+        if compression_id == COMPRESSIONS["lz4"]:
+            if lz4_frame is None:
+                raise ValueError("Cached payload requires lz4 which is not installed")
+            return lz4_frame.decompress(payload)
+        if compression_id == COMPRESSIONS["zlib"]:
+            return zlib.decompress(payload)
+        return payload
+
+
+cache_codec = CacheCodec(
+    serializer=settings.CACHE_SERIALIZER,
+    compression=settings.CACHE_COMPRESSION,
+    threshold=settings.CACHE_COMPRESSION_THRESHOLD,
+    level=settings.CACHE_COMPRESSION_LEVEL,
+)
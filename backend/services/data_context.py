@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+from core.context import get_request_context
+from services.alpha_vantage import AlphaVantageService
+from services.cache import CacheEntry
+from services.ohlcv import parse_ohlcv
+
+# AlphaVantage functions that return OHLCV bars and are parsed into a DataFrame
+TIME_SERIES_FUNCTIONS = {
+    "TIME_SERIES_INTRADAY",
+    "TIME_SERIES_DAILY",
+    "TIME_SERIES_DAILY_ADJUSTED",
+    "TIME_SERIES_WEEKLY",
+    "TIME_SERIES_MONTHLY",
+}
+
+
+class DataContext:
+    """
+    Per-request view over AlphaVantage data. Each (symbol, function) dataset is fetched once
+    and time series are parsed once into a DataFrame shared by every agent in the request.
+    Shared frames must be treated as read-only; copy before adding columns.
+    """
+
+    def __init__(self, alpha_vantage: Optional[AlphaVantageService] = None):
+        self.alpha_vantage = alpha_vantage or AlphaVantageService()
+        self.logger = logging.getLogger("DataContext")
+        self._entries: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+
+    def prefetch(self, symbol: str, functions: Iterable[str]) -> List[asyncio.Task]:
+        """Starts fetching datasets without waiting for them"""
+        return [self._start(symbol, function) for function in functions]
+
+    async def get_entry(self, symbol: str, function: str) -> Optional[CacheEntry]:
+        # Shield so an agent cancelled by its deadline does not cancel the fetch for the others
+        return await asyncio.shield(self._start(symbol, function))
+
+    async def get_frame(self, symbol: str, function: str) -> Tuple[Optional[CacheEntry], Optional[pd.DataFrame]]:
+        """Returns the entry and its parsed time series, or (entry, None) when there is no data"""
+        if function not in TIME_SERIES_FUNCTIONS:
+            raise ValueError(f"{function} is not a time series function")
+        entry = await self.get_entry(symbol, function)
+        if not entry or not entry.value:
+            return entry, None
+
+        key = (symbol, function)
+        if key not in self._frames:
+            self._frames[key] = parse_ohlcv(entry.value)
+        return entry, self._frames[key]
+
+    def close(self):
+        for task in self._entries.values():
+            task.cancel()
+
+    def _start(self, symbol: str, function: str) -> asyncio.Task:
+        key = (symbol, function)
+        task = self._entries.get(key)
+        if task is None:
+            self.logger.info(f"Loading {function} for {symbol}")
+            task = asyncio.ensure_future(self.alpha_vantage.fetch_entry(symbol, function))
+            self._entries[key] = task
+        return task
+
+
+def get_data_context() -> DataContext:
+    """Data context of the current request, created on first use"""
+    context = get_request_context()
+    if context.data is None:
+        context.data = DataContext()
+    return context.data
@@ -1,8 +1,8 @@
-from typing import List
+from typing import AsyncIterator, List
 import logging
 from core.schemas import AgentResponse
 from core.logging import log_exception
-from services.llm import GeminiService, ChatGPTService
+from services.llm import GeminiService, ChatGPTService, query_llms
 from prompts.prompts import EXPLAIN_USER_PROMPT, EXPLAIN_SYSTEM_PROMPT
 import re
             
@@ -13,18 +13,40 @@ class ExplainabilityEngine:
 
     async def explain(self, results: List[AgentResponse], user_query: str) -> str:
         try:
-            results_str = ""
-            for res in results:
-                results_str += f"{res.agent_name} ({res.confidence:.2f}): {str(res.result)[:200]}\n"
-        
-            explanation = await self.llm.analyze(EXPLAIN_USER_PROMPT,system_prompt=EXPLAIN_SYSTEM_PROMPT,results=results_str,user_query=user_query,symbol=None) 
-            explanation = re.sub(
+            results_str = self._format_results(results)
+            explanation = await query_llms([self.llm], EXPLAIN_USER_PROMPT, self.logger, system_prompt=EXPLAIN_SYSTEM_PROMPT, results=results_str, user_query=user_query, symbol=None)
+            return self.format_explanation(explanation)
+        except Exception as e:
+            log_exception(self.logger, e, "Explanation generation failed")
+            return "Explanation unavailable due to processing error"
+
+    async def explain_stream(self, results: List[AgentResponse], user_query: str) -> AsyncIterator[str]:
+        """
+        Yields raw explanation chunks as the LLM produces them.
+        Falls back to a single non-streamed explanation if the stream cannot be started.
+        """
+        results_str = self._format_results(results)
+        streamed = False
+        try:
+            async for chunk in self.llm.analyze_stream(EXPLAIN_USER_PROMPT, system_prompt=EXPLAIN_SYSTEM_PROMPT, results=results_str, user_query=user_query, symbol=None):
+                streamed = True
+                yield chunk
+        except Exception as e:
+            log_exception(self.logger, e, "Explanation stream failed")
+            if streamed:
+                return
+            yield await self.explain(results, user_query)
+
+    def format_explanation(self, explanation: str) -> str:
+        return re.sub(
             r'<card>(.*?)</card>', 
             r'<div class="card">\1</div>', 
             explanation, 
             flags=re.DOTALL
-            )
-            return explanation
-        except Exception as e:
-            log_exception(self.logger, e, "Explanation generation failed")
-            return "Explanation unavailable due to processing error"
+        )
+
+    def _format_results(self, results: List[AgentResponse]) -> str:
+        results_str = ""
+        for res in results:
+            results_str += f"{res.agent_name} ({res.confidence:.2f}): {str(res.result)[:200]}\n"
+        return results_str
@@ -0,0 +1,40 @@
+import httpx
+import logging
+from typing import Optional
+from config.settings import settings
+
+logger = logging.getLogger("HttpClient")
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide async HTTP client.
+    All outbound calls share one connection pool so keep-alive connections are reused.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            settings.HTTP_READ_TIMEOUT,
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+        )
+        _client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        logger.info(
+            f"Created shared HTTP client (max_connections={settings.HTTP_MAX_CONNECTIONS}, "
+            f"max_keepalive={settings.HTTP_MAX_KEEPALIVE_CONNECTIONS})"
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Closed shared HTTP client")
+    _client = None
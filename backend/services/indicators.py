@@ -0,0 +1,429 @@
+import logging
+import math
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from config.settings import settings
+from core.logging import log_exception
+from services.cache import CacheService
+
+INDICATOR_COLUMNS = [
+    'MA5', 'MA20', 'MA50',
+    'EMA12', 'EMA26', 'MACD', 'MACD_Signal', 'MACD_Hist',
+    'RSI',
+    'BB_Middle', 'BB_Std', 'BB_Upper', 'BB_Lower',
+    'L14', 'H14',
+    'Momentum',
+]
+
+STATE_VERSION = 3
+NAN = float('nan')
+
+
+class RollingMean:
+    """
+    Fixed-window mean updated in O(1) per value. Mirrors pandas' rolling mean kernel
+    (compensated add/remove, removal before addition, repeated-value and sign handling)
+    so the streamed values equal Series.rolling(window).mean().
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = NAN
+
+    def update(self, value: float) -> float:
+        self.values.append(value)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(value)
+        if self.nobs < self.window or self.nobs == 0:
+            return NAN
+        result = self.sum_x / self.nobs
+        if self.num_consecutive_same_value >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+    def _add(self, value: float):
+        if value != value:
+            return
+        self.nobs += 1
+        y = value - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct += 1
+        if value == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = value
+
+    def _remove(self, value: float):
+        if value != value:
+            return
+        self.nobs -= 1
+        y = -value - self.compensation_remove
+        t = self.sum_x + y
+        self.compensation_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct -= 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "values": list(self.values), "nobs": self.nobs, "neg_ct": self.neg_ct, "sum_x": self.sum_x,
+            "compensation_add": self.compensation_add, "compensation_remove": self.compensation_remove,
+            "num_consecutive_same_value": self.num_consecutive_same_value, "prev_value": self.prev_value,
+        }
+
+    def load(self, state: Dict[str, Any]):
+        for name, value in state.items():
+            setattr(self, name, deque(value) if name == "values" else value)
+
+
+class RollingStd:
+    """Fixed-window sample standard deviation; the compensated Welford updates of pandas' rolling var"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = NAN
+
+    def update(self, value: float) -> float:
+        self.values.append(value)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(value)
+        if self.nobs < self.window or self.nobs < 2:
+            return NAN
+        if self.num_consecutive_same_value >= self.nobs:
+            return 0.0
+        variance = self.ssqdm_x / (self.nobs - 1)
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+    def _add(self, value: float):
+        if value != value:
+            return
+        self.nobs += 1
+        if value == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = value
+        prev_mean = self.mean_x - self.compensation_add
+        y = value - self.compensation_add
+        t = y - self.mean_x
+        self.compensation_add = t + self.mean_x - y
+        self.mean_x += t / self.nobs
+        self.ssqdm_x += (value - prev_mean) * (value - self.mean_x)
+
+    def _remove(self, value: float):
+        if value != value:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.compensation_remove
+            y = value - self.compensation_remove
+            t = y - self.mean_x
+            self.compensation_remove = t + self.mean_x - y
+            self.mean_x -= t / self.nobs
+            self.ssqdm_x -= (value - prev_mean) * (value - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "values": list(self.values), "nobs": self.nobs, "mean_x": self.mean_x, "ssqdm_x": self.ssqdm_x,
+            "compensation_add": self.compensation_add, "compensation_remove": self.compensation_remove,
+            "num_consecutive_same_value": self.num_consecutive_same_value, "prev_value": self.prev_value,
+        }
+
+    def load(self, state: Dict[str, Any]):
+        for name, value in state.items():
+            setattr(self, name, deque(value) if name == "values" else value)
+
+
+class RollingExtreme:
+    """Rolling min or max (min_periods=1) over a monotonic deque of (position, value)"""
+
+    def __init__(self, window: int, mode: str):
+        self.window = window
+        self.mode = mode
+        self.position = 0
+        self.candidates = deque()
+
+    def update(self, value: float) -> float:
+        while self.candidates and self.candidates[0][0] <= self.position - self.window:
+            self.candidates.popleft()
+        if value == value:
+            if self.mode == "min":
+                while self.candidates and self.candidates[-1][1] >= value:
+                    self.candidates.pop()
+            else:
+                while self.candidates and self.candidates[-1][1] <= value:
+                    self.candidates.pop()
+            self.candidates.append((self.position, value))
+        self.position += 1
+        return self.candidates[0][1] if self.candidates else NAN
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"position": self.position, "candidates": [list(item) for item in self.candidates]}
+
+    def load(self, state: Dict[str, Any]):
+        self.position = state["position"]
+        self.candidates = deque(tuple(item) for item in state["candidates"])
+
+
+class EMA:
+    """Exponential moving average matching Series.ewm(span=span, adjust=False).mean()"""
+
+    def __init__(self, span: int):
+        alpha = 2.0 / (span + 1.0)
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = alpha
+        self.weighted = NAN
+
+    def update(self, value: float) -> float:
+        if self.weighted == self.weighted:
+            old_wt = self.old_wt_factor
+            if value == value and self.weighted != value:
+                self.weighted = (old_wt * self.weighted + self.new_wt * value) / (old_wt + self.new_wt)
+        elif value == value:
+            self.weighted = value
+        return self.weighted
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"weighted": self.weighted}
+
+    def load(self, state: Dict[str, Any]):
+        self.weighted = state["weighted"]
+
+
+class IndicatorState:
+    """
+    Rolling state for every indicator in INDICATOR_COLUMNS. update() consumes one bar and
+    returns that bar's indicator values in O(1); the state round-trips through to_dict/from_dict.
+    """
+
+    def __init__(self):
+        self.ma5 = RollingMean(5)
+        self.ma20 = RollingMean(20)
+        self.ma50 = RollingMean(50)
+        self.ema12 = EMA(12)
+        self.ema26 = EMA(26)
+        self.macd_signal = EMA(9)
+        self.avg_gain = RollingMean(14)
+        self.avg_loss = RollingMean(14)
+        self.bb_std = RollingStd(20)
+        self.low14 = RollingExtreme(14, "min")
+        self.high14 = RollingExtreme(14, "max")
+        # Last 10 closes, for the RSI delta and 10-bar momentum
+        self.closes = deque(maxlen=10)
+
+    def update(self, close: float, high: float, low: float) -> List[float]:
+        previous = self.closes[-1] if self.closes else NAN
+        momentum_base = self.closes[0] if len(self.closes) == 10 else NAN
+        self.closes.append(close)
+
+        ma5 = self.ma5.update(close)
+        ma20 = self.ma20.update(close)
+        ma50 = self.ma50.update(close)
+
+        ema12 = self.ema12.update(close)
+        ema26 = self.ema26.update(close)
+        macd = ema12 - ema26
+        macd_signal = self.macd_signal.update(macd)
+
+        # Same as the batch delta.where(delta > 0, 0): the first delta is NaN and counts as 0
+        delta = close - previous
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else -0.0
+        rsi = _rsi(self.avg_gain.update(gain), self.avg_loss.update(loss))
+
+        bb_std = self.bb_std.update(close)
+
+        momentum = _divide(close, momentum_base) - 1
+
+        return [
+            ma5, ma20, ma50,
+            ema12, ema26, macd, macd_signal, macd - macd_signal,
+            rsi,
+            ma20, bb_std, ma20 + (bb_std * 2), ma20 - (bb_std * 2),
+            self.low14.update(low), self.high14.update(high),
+            momentum,
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ma5": self.ma5.to_dict(), "ma20": self.ma20.to_dict(), "ma50": self.ma50.to_dict(),
+            "ema12": self.ema12.to_dict(), "ema26": self.ema26.to_dict(),
+            "macd_signal": self.macd_signal.to_dict(),
+            "avg_gain": self.avg_gain.to_dict(), "avg_loss": self.avg_loss.to_dict(),
+            "bb_std": self.bb_std.to_dict(),
+            "low14": self.low14.to_dict(), "high14": self.high14.to_dict(),
+            "closes": list(self.closes),
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "IndicatorState":
+        instance = cls()
+        for name in ("ma5", "ma20", "ma50", "ema12", "ema26", "macd_signal",
+                     "avg_gain", "avg_loss", "bb_std", "low14", "high14"):
+            getattr(instance, name).load(state[name])
+        instance.closes.extend(state["closes"])
+        return instance
+
+
+def _divide(numerator: float, denominator: float) -> float:
+    # NumPy semantics, as in the pandas batch computation: x/0 is +-inf and 0/0 is NaN
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return float(np.float64(numerator) / np.float64(denominator))
+
+
+def _rsi(avg_gain: float, avg_loss: float) -> float:
+    rs = _divide(avg_gain, avg_loss)
+    return 100 - (100 / (1 + rs))
+
+
+def batch_indicators(bars: pd.DataFrame) -> pd.DataFrame:
+    """
+    INDICATOR_COLUMNS for a whole bar series with pandas' vectorized windows. Equal to
+    replaying the series through a fresh IndicatorState, at a fraction of the cost.
+    """
+    close, high, low = bars['close'], bars['high'], bars['low']
+    ema12 = close.ewm(span=12, adjust=False).mean()
+    ema26 = close.ewm(span=26, adjust=False).mean()
+    macd = ema12 - ema26
+    macd_signal = macd.ewm(span=9, adjust=False).mean()
+
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    rs = gain.rolling(window=14).mean() / loss.rolling(window=14).mean()
+
+    ma20 = close.rolling(window=20).mean()
+    bb_std = close.rolling(window=20).std()
+    return pd.DataFrame({
+        'MA5': close.rolling(window=5).mean(),
+        'MA20': ma20,
+        'MA50': close.rolling(window=50).mean(),
+        'EMA12': ema12,
+        'EMA26': ema26,
+        'MACD': macd,
+        'MACD_Signal': macd_signal,
+        'MACD_Hist': macd - macd_signal,
+        'RSI': 100 - (100 / (1 + rs)),
+        'BB_Middle': ma20,
+        'BB_Std': bb_std,
+        'BB_Upper': ma20 + (bb_std * 2),
+        'BB_Lower': ma20 - (bb_std * 2),
+        'L14': low.rolling(window=14, min_periods=1).min(),
+        'H14': high.rolling(window=14, min_periods=1).max(),
+        'Momentum': close / close.shift(10) - 1,
+    }, index=bars.index)
+
+
+class IndicatorEngine:
+    """
+    Computes INDICATOR_COLUMNS for a bar series, keeping per-series rolling and EMA state in the
+    cache together with the indicator rows of the last frame. AlphaVantage series are rolling
+    windows, so a refresh drops old bars and appends new ones: when every bar up to the last one
+    seen before matches the stored frame, those rows are reused as stored and only the bars after
+    it go through the stored state. Otherwise the series is replayed from its first bar and the
+    state reset. The values are those of batch_indicators over every bar seen since that replay,
+    so EMAs carry history from before the frame's first bar.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("IndicatorEngine")
+        self.cache = CacheService()
+
+    async def compute(self, symbol: str, function: str, bars: pd.DataFrame,
+                      interval: str = "5min", outputsize: str = "compact") -> pd.DataFrame:
+        """
+        Returns a frame of indicator columns aligned with bars, which must be time sorted.
+        interval and outputsize identify the series the bars came from; each has its own state.
+        """
+        key = self.cache.build_key("indicators", symbol, function, interval, outputsize)
+        timestamps = bars['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+        close = bars['close'].to_numpy(dtype=np.float64)
+        high = bars['high'].to_numpy(dtype=np.float64)
+        low = bars['low'].to_numpy(dtype=np.float64)
+        if not len(bars):
+            return pd.DataFrame(np.empty((0, len(INDICATOR_COLUMNS))), columns=INDICATOR_COLUMNS, index=bars.index)
+
+        stored = await self.cache.get(key)
+        resumed = self._resume(stored, timestamps, close, high, low)
+        if resumed is not None:
+            start, previous = resumed
+            state = IndicatorState.from_dict(stored["state"])
+            self.logger.info(f"Resuming {symbol} {function} indicators with {len(bars) - start} new bars")
+        else:
+            start, previous = 0, np.empty((0, len(INDICATOR_COLUMNS)))
+            state = IndicatorState()
+
+        rows = [state.update(close[i], high[i], low[i]) for i in range(start, len(bars))]
+        values = np.vstack([previous, np.array(rows, dtype=np.float64).reshape(len(rows), len(INDICATOR_COLUMNS))])
+        # Never replace the state with one built from an older copy of the series
+        if start < len(bars) and (not stored or timestamps[-1] >= stored.get("timestamps", [timestamps[-1]])[-1]):
+            await self._store(key, state, timestamps, values, close, high, low)
+
+        return pd.DataFrame(values, columns=INDICATOR_COLUMNS, index=bars.index)
+
+    def _resume(self, stored: Optional[Dict[str, Any]], timestamps: np.ndarray, close: np.ndarray,
+                high: np.ndarray, low: np.ndarray) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Index of the first bar after the last stored one and the stored rows for the bars before
+        it, or None to replay the whole series
+        """
+        if not stored or stored.get("version") != STATE_VERSION:
+            return None
+        stored_timestamps = np.asarray(stored["timestamps"], dtype=np.int64)
+        last = int(np.searchsorted(timestamps, stored_timestamps[-1]))
+        if last >= len(timestamps) or timestamps[last] != stored_timestamps[-1]:
+            return None
+        # The most recent bar can be revised upstream; replay from scratch if it changed
+        if [close[last], high[last], low[last]] != stored["last_bar"]:
+            return None
+        # Every bar up to the last stored one must be a row of the stored frame
+        first = int(np.searchsorted(stored_timestamps, timestamps[0]))
+        if not np.array_equal(stored_timestamps[first:], timestamps[:last + 1]):
+            return None
+        return last + 1, np.asarray(stored["values"], dtype=np.float64).reshape(-1, len(INDICATOR_COLUMNS))[first:]
+
+    async def _store(self, key: str, state: IndicatorState, timestamps: np.ndarray, values: np.ndarray,
+                     close: np.ndarray, high: np.ndarray, low: np.ndarray):
+        last = len(timestamps) - 1
+        try:
+            await self.cache.set(key, {
+                "version": STATE_VERSION,
+                "timestamps": timestamps.tolist(),
+                "values": values.tolist(),
+                "last_bar": [float(close[last]), float(high[last]), float(low[last])],
+                "state": state.to_dict(),
+            }, ttl=settings.INDICATOR_STATE_TTL)
+        except Exception as e:
+            log_exception(self.logger, e, f"Failed to store indicator state for {key}")
+
+
+indicator_engine = IndicatorEngine()
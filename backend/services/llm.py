@@ -1,58 +1,349 @@
 from config.settings import settings
 from collections import defaultdict
+from services.cache import CacheService
+from core.logging import log_exception
+from typing import Any, AsyncIterator, Awaitable, Callable, List
+from services.circuit_breaker import get_circuit_breaker
+import asyncio
+import hashlib
+import json
+import logging
+import time
 
-class GeminiService:
-    def __init__(self):
+# Clients are shared by every service instance so connections are reused across requests
+_openai_client = None
+_gemini_model = None
+
+
+def _get_openai_client():
+    global _openai_client
+    if _openai_client is None:
+        try:
+            import openai
+        except ImportError:
+            raise Exception("Failed to import OpenAI library. Run: pip install openai")
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("Missing OPENAI_API_KEY in settings")
+        _openai_client = openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            timeout=settings.LLM_TIMEOUT,
+            max_retries=settings.LLM_MAX_RETRIES
+        )
+    return _openai_client
+
+
+def _get_gemini_model():
+    global _gemini_model
+    if _gemini_model is None:
         try:
             import google.generativeai as genai
-            if not settings.GEMINI_API_KEY:
-                raise ValueError("Missing GEMINI_API_KEY in settings")
-            genai.configure(api_key=settings.GEMINI_API_KEY)
         except ImportError:
             raise Exception("Failed to import Google GenerativeAI library. Run: pip install google-generativeai")
-        
-        self.model = genai.GenerativeModel(
+        if not settings.GEMINI_API_KEY:
+            raise ValueError("Missing GEMINI_API_KEY in settings")
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        _gemini_model = genai.GenerativeModel(
             "gemini-2.0-flash",
             generation_config={"response_mime_type": "application/json"}
         )
+    return _gemini_model
+
+
+async def close_llm_clients():
+    global _openai_client, _gemini_model
+    if _openai_client is not None:
+        await _openai_client.close()
+    _openai_client = None
+    _gemini_model = None
+
+
+class LLMError(Exception):
+    pass
+
+
+class CircuitOpenError(LLMError):
+    pass
+
+
+class ProviderError(LLMError):
+    """The provider failed to answer; the only errors that count against its circuit breaker"""
+    pass
+
+
+def is_provider_failure(e: BaseException) -> bool:
+    """Timeouts, connection errors, throttling and server errors; anything else says nothing about provider health"""
+    if isinstance(e, (ProviderError, asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    try:
+        import httpx
+        if isinstance(e, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+    try:
+        import openai
+        if isinstance(e, openai.APIConnectionError):
+            return True
+        if isinstance(e, openai.APIStatusError):
+            return e.status_code == 429 or e.status_code >= 500
+    except ImportError:
+        pass
+    try:
+        from google.api_core import exceptions as google_exceptions
+        if isinstance(e, google_exceptions.RetryError):
+            return True
+        if isinstance(e, google_exceptions.GoogleAPICallError):
+            return e.code is not None and (e.code == 429 or e.code >= 500)
+    except ImportError:
+        pass
+    return False
+
+
+class LLMResponseCache:
+    """
+    Opt-in Redis cache for rendered prompts.
+    Keyed by a hash of provider, model, prompts and generation params; sampled calls above
+    LLM_CACHE_MAX_TEMPERATURE are only cached when the caller opts in. At most
+    LLM_CACHE_MAX_ENTRIES answers of up to LLM_CACHE_MAX_ENTRY_CHARS are kept, oldest evicted first.
+    """
+
+    def __init__(self):
+        self.enabled = settings.LLM_CACHE_ENABLED
+        self.ttl = settings.LLM_CACHE_TTL
+        self.max_temperature = settings.LLM_CACHE_MAX_TEMPERATURE
+        self.max_entry_chars = settings.LLM_CACHE_MAX_ENTRY_CHARS
+        self.max_entries = settings.LLM_CACHE_MAX_ENTRIES
+        self.cache = CacheService()
+        self.index_key = self.cache.build_key("llm", "index")
+        self.logger = logging.getLogger("LLMResponseCache")
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evicted = 0
+
+    def build_key(self, provider: str, model: str, system_prompt: str, prompt: str, params: dict) -> str:
+        digest = hashlib.sha256(
+            json.dumps([provider, model, system_prompt, prompt, params], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        return self.cache.build_key("llm", provider, digest)
+
+    def should_use(self, temperature: float, cacheable: bool = False) -> bool:
+        """cacheable marks calls whose answer is reusable even though they are sampled"""
+        if not self.enabled:
+            return False
+        if not cacheable and temperature is not None and temperature > self.max_temperature:
+            self.bypassed += 1
+            return False
+        return True
+
+    async def get(self, key: str):
+        value = await self.cache.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value):
+        if isinstance(value, str) and len(value) > self.max_entry_chars:
+            return
+        if await self.cache.set(key, value, ttl=self.ttl):
+            await self._evict_over_limit(key)
+
+    async def _evict_over_limit(self, key: str):
+        # The index orders cached keys by write time and is shared by every worker
+        try:
+            now = time.time()
+            async with self.cache.redis.pipeline(transaction=False) as pipe:
+                pipe.zadd(self.index_key, {key: now})
+                pipe.zremrangebyscore(self.index_key, 0, now - self.ttl)
+                pipe.expire(self.index_key, self.ttl)
+                pipe.zcard(self.index_key)
+                *_, size = await pipe.execute()
+            if size <= self.max_entries:
+                return
+            oldest = await self.cache.redis.zpopmin(self.index_key, size - self.max_entries)
+            for evicted_key, _ in oldest:
+                await self.cache.delete(evicted_key.decode("utf-8") if isinstance(evicted_key, bytes) else evicted_key)
+            self.evicted += len(oldest)
+        except Exception as e:
+            log_exception(self.logger, e, "LLM cache eviction failed")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evicted": self.evicted,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+llm_response_cache = LLMResponseCache()
+
+
+async def call_with_breaker(breaker, call: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Runs call() if the breaker admits it and reports the outcome. Raises CircuitOpenError when
+    the circuit rejects the call. Only provider failures count against the circuit; other errors
+    propagate without a health signal. The admission and its release happen inside this coroutine,
+    so a task cancelled at any point, even before it started, never holds a half-open probe.
+    """
+    if breaker is None:
+        return await call()
+    if not breaker.allow_request():
+        raise CircuitOpenError(f"circuit {breaker.state.value}")
+    started = time.monotonic()
+    recorded = False
+    try:
+        result = await call()
+        recorded = True
+        breaker.record_success(time.monotonic() - started)
+        return result
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        if is_provider_failure(e):
+            recorded = True
+            breaker.record_failure(time.monotonic() - started)
+        raise
+    finally:
+        if not recorded:
+            # Cancelled, e.g. by losing a hedge race, or failed locally; says nothing about provider health
+            breaker.release()
+
+
+async def _call_with_breaker(llm, prompt: str, **kwargs) -> str:
+    return await call_with_breaker(getattr(llm, "breaker", None), lambda: llm.analyze(prompt, **kwargs))
+
+
+async def query_llms(llms: List, prompt: str, logger, hedge_delay: float = None, **kwargs) -> str:
+    """
+    Queries providers in priority order and returns the first successful answer.
+    A failure moves on to the next provider immediately. With a positive hedge_delay the next
+    provider is also started when the current ones have not answered in time; the first answer
+    wins and the others are cancelled. Providers whose circuit breaker is open are skipped.
+    """
+    if hedge_delay is None:
+        hedge_delay = settings.LLM_HEDGE_DELAY
+    if not llms:
+        raise LLMError("No LLM providers configured")
+
+    pending = set()
+    errors = []
+    next_index = 0
+
+    def launch_next():
+        nonlocal next_index
+        while next_index < len(llms):
+            llm = llms[next_index]
+            next_index += 1
+            name = llm.__class__.__name__
+            breaker = getattr(llm, "breaker", None)
+            # The call is admitted inside its task; skip providers that would be refused anyway
+            if breaker is not None and breaker.is_rejecting():
+                logger.info(f"Skipping LLM {name}: circuit {breaker.state.value}")
+                errors.append(f"{name}: circuit {breaker.state.value}")
+                continue
+            logger.info(f"Querying LLM: {name}")
+            pending.add(asyncio.create_task(_call_with_breaker(llm, prompt, **kwargs), name=name))
+            return
+
+    launch_next()
+    try:
+        while pending:
+            can_hedge = hedge_delay > 0 and next_index < len(llms)
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=hedge_delay if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                logger.info(f"No answer after {hedge_delay}s, hedging with {llms[next_index].__class__.__name__}")
+                launch_next()
+                continue
+
+            for task in done:
+                pending.discard(task)
+                if task.exception() is None:
+                    return task.result()
+                errors.append(f"{task.get_name()}: {task.exception()}")
+                logger.warning(f"LLM {task.get_name()} failed: {task.exception()}")
+
+            if not pending and next_index < len(llms):
+                launch_next()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise LLMError(f"All LLM providers failed: {'; '.join(errors)}")
+
+
+class GeminiService:
+    def __init__(self):
+        self.timeout = settings.LLM_TIMEOUT
+        self.breaker = get_circuit_breaker("GEMINI")
+
+    @property
+    def model(self):
+        # Resolved on first use so a missing key only fails the calls that need Gemini
+        return _get_gemini_model()
 
     async def analyze(self, prompt: str, system_prompt: str = None, **kwargs) -> str:
+        if kwargs:
+            kwargs = defaultdict(str, kwargs)
+            prompt = prompt.format_map(kwargs)
+
+        use_cache = llm_response_cache.should_use(kwargs.get("temperature", 0.7))
+        if use_cache:
+            cache_key = llm_response_cache.build_key("gemini", self.model.model_name, system_prompt, prompt, {})
+            cached = await llm_response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
-            if kwargs:
-                kwargs = defaultdict(str, kwargs)
-                prompt = prompt.format_map(kwargs)
-            
             # Create a conversation with system prompt if provided
             if system_prompt:
-                response = self.model.generate_content(
+                response = await self.model.generate_content_async(
                     [
                         {"role": "system", "parts": [system_prompt]},
                         {"role": "user", "parts": [prompt]}
-                    ]
+                    ],
+                    request_options={"timeout": self.timeout}
                 )
             else:
-                response = self.model.generate_content(prompt)
-                
-            if hasattr(response, 'text'):
-                return response.text
-            else:
-                return str(response)
-                
+                response = await self.model.generate_content_async(
+                    prompt,
+                    request_options={"timeout": self.timeout}
+                )
         except Exception as e:
-            import traceback
-            return f"Error analyzing prompt: {str(e)} \n{traceback.format_exc()}"
-        
+            if is_provider_failure(e):
+                raise ProviderError(f"GeminiService failed to analyze prompt: {e}") from e
+            raise
+
+        if hasattr(response, 'text'):
+            text = response.text
+        else:
+            text = str(response)
+        if not text:
+            raise ProviderError("GeminiService returned an empty response")
+
+        if use_cache:
+            await llm_response_cache.set(cache_key, text)
+        return text
+
 class ChatGPTService:
     def __init__(self):
-        try: 
-            import openai
-            if not settings.OPENAI_API_KEY:
-                raise ValueError("Missing OPENAI_API_KEY in settings")
-            self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-        except ImportError:
-            raise Exception("Failed to import OpenAI library. Run: pip install openai")
-        
         self.model = "gpt-3.5-turbo"
+        self.timeout = settings.LLM_TIMEOUT
+        self.breaker = get_circuit_breaker("OPENAI")
+
+    @property
+    def client(self):
+        # Resolved on first use so a missing key only fails the calls that need OpenAI
+        return _get_openai_client()
 
     async def is_financial_query(self, query: str) -> dict:
         """
@@ -80,17 +371,30 @@ class ChatGPTService:
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": f"Query: {query}\nClassify this query."}
             ]
+
+            # A near-deterministic yes/no classification is worth reusing despite the sampling
+            use_cache = llm_response_cache.should_use(0.1, cacheable=True)
+            if use_cache:
+                cache_key = llm_response_cache.build_key(
+                    "openai", self.model, system_prompt, messages[-1]["content"],
+                    {"temperature": 0.1, "max_tokens": 300, "response_format": "json_object"}
+                )
+                cached = await llm_response_cache.get(cache_key)
+                if cached is not None:
+                    return cached
             
-            response = self.client.chat.completions.create(
+            response = await call_with_breaker(self.breaker, lambda: self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=0.1,
                 max_tokens=300,
-                response_format={"type": "json_object"}
-            )
+                response_format={"type": "json_object"},
+                timeout=self.timeout
+            ))
             
-            import json
             result = json.loads(response.choices[0].message.content)
+            if use_cache:
+                await llm_response_cache.set(cache_key, result)
             return result
         except Exception as e:
             # Default to allowing the query if classification fails
@@ -98,24 +402,93 @@ class ChatGPTService:
 
 
     async def analyze(self, prompt: str, system_prompt: str = None, **kwargs) -> str:
-        try:
-            if kwargs:
-                kwargs = defaultdict(str, kwargs)
-                prompt = prompt.format_map(kwargs)
+        if kwargs:
+            kwargs = defaultdict(str, kwargs)
+            prompt = prompt.format_map(kwargs)
 
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            response = self.client.chat.completions.create(
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        temperature = kwargs.get("temperature", 0.7)
+        max_tokens = kwargs.get("max_tokens", 1000)
+        use_cache = llm_response_cache.should_use(temperature)
+        if use_cache:
+            cache_key = llm_response_cache.build_key(
+                "openai", self.model, system_prompt, prompt,
+                {"temperature": temperature, "max_tokens": max_tokens}
+            )
+            cached = await llm_response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                temperature=kwargs.get("temperature", 0.7),
-                max_tokens=kwargs.get("max_tokens", 1000)   
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=self.timeout
             )
+        except Exception as e:
+            if is_provider_failure(e):
+                raise ProviderError(f"ChatGPTService failed to analyze prompt: {e}") from e
+            raise
+
+        content = response.choices[0].message.content
+        if not content:
+            raise ProviderError("ChatGPTService returned an empty response")
+        if use_cache:
+            await llm_response_cache.set(cache_key, content)
+        return content
+
+
+    async def analyze_stream(self, prompt: str, system_prompt: str = None, **kwargs) -> AsyncIterator[str]:
+        """Streams the completion as text chunks; raises ProviderError if the provider cannot start the stream"""
+        if kwargs:
+            kwargs = defaultdict(str, kwargs)
+            prompt = prompt.format_map(kwargs)
+
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"circuit {self.breaker.state.value}")
+        started = time.monotonic()
+        latency = None
+        recorded = False
+        try:
+            try:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=kwargs.get("temperature", 0.7),
+                    max_tokens=kwargs.get("max_tokens", 1000),
+                    timeout=self.timeout,
+                    stream=True
+                )
+            except Exception as e:
+                if is_provider_failure(e):
+                    raise ProviderError(f"ChatGPTService failed to start stream: {e}") from e
+                raise
+            # Time to the start of the stream; its length depends on the answer, not the provider
+            latency = time.monotonic() - started
 
-            return response.choices[0].message.content
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            recorded = True
+            self.breaker.record_success(latency)
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
         except Exception as e:
-            import traceback
-            return f"Error analyzing prompt: {str(e)} \n{traceback.format_exc()}"
+            if is_provider_failure(e):
+                recorded = True
+                self.breaker.record_failure(latency if latency is not None else time.monotonic() - started)
+            raise
+        finally:
+            if not recorded:
+                self.breaker.release()
@@ -0,0 +1,55 @@
+import re
+from typing import Dict, Iterable, Optional
+from services.symbol_resolver import SymbolResolver, get_symbol_resolver
+
+INTENT_PATTERNS = {
+    "TechnicalAgent": r"\brsi\b|\bmacd\b|moving average|\b[se]ma\b|\d+\s*-?day ma\b|support|resistance|chart|technical|"
+                      r"bollinger|breakout|momentum|candlestick|indicator|price action|overbought|oversold|\btrend",
+    "SentimentAgent": r"\bnews\b|sentiment|headline|media|social|buzz|press release|analyst mood",
+    "RiskAgent": r"\brisk|volatil|drawdown|\bbeta\b|value at risk|\bvar\b|downside|\bhedg",
+    "PortfolioAgent": r"portfolio|diversif|allocation|correlat|rebalanc",
+    "FundamentalAgent": r"fundamental|earnings|revenue|valuation|p/e|\bpe ratio|\beps\b|balance sheet|dividend|"
+                        r"market cap|profit|margin|overview|financials|cash flow|\bdebt\b",
+}
+
+TIMEFRAME_PATTERNS = (
+    ("INTRADAY", r"intraday|today|right now|this morning|this afternoon"),
+    ("LONG_TERM", r"long[- ]term|years?\b|decade"),
+    ("MEDIUM_TERM", r"months?\b|quarter"),
+)
+
+
+class LocalAgentRouter:
+    """
+    Rules-based agent selection and symbol extraction for queries whose intent is obvious.
+    route() returns a response shaped like the LLM selector's, or None when it is not confident.
+    """
+
+    def __init__(self, available_agents: Iterable[str], min_confidence: float,
+                 resolver: Optional[SymbolResolver] = None):
+        self.resolver = resolver or get_symbol_resolver()
+        self.min_confidence = min_confidence
+        self.patterns = {
+            name: re.compile(pattern, re.IGNORECASE)
+            for name, pattern in INTENT_PATTERNS.items()
+            if name in set(available_agents)
+        }
+        self.timeframes = [(name, re.compile(pattern, re.IGNORECASE)) for name, pattern in TIMEFRAME_PATTERNS]
+
+    def route(self, query: str) -> Optional[Dict]:
+        selected = [name for name, pattern in self.patterns.items() if pattern.search(query)]
+        if not selected:
+            return None
+        symbol, confidence = self.resolver.resolve(query)
+        if not symbol or confidence < self.min_confidence:
+            return None
+
+        timeframe = next((name for name, pattern in self.timeframes if pattern.search(query)), "SHORT_TERM")
+        return {
+            "symbol": symbol,
+            "selected": selected,
+            "timeframe": timeframe,
+            "query_intent": "INFORMATIONAL",
+            "paraphrased_queries": {name: query for name in selected},
+            "router": "local",
+        }
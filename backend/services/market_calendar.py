@@ -0,0 +1,189 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional, Set
+from zoneinfo import ZoneInfo
+from config.settings import settings
+
+EXCHANGE_TZ = ZoneInfo("America/New_York")
+SESSION_OPEN = time(9, 30)
+SESSION_CLOSE = time(16, 0)
+EXTENDED_OPEN = time(4, 0)
+EXTENDED_CLOSE = time(20, 0)
+EARLY_CLOSE = time(13, 0)
+EARLY_EXTENDED_CLOSE = time(17, 0)
+
+INTERVAL_SECONDS = {
+    "1min": 60,
+    "5min": 300,
+    "15min": 900,
+    "30min": 1800,
+    "60min": 3600,
+}
+
+# Parameter names as they appear in AlphaVantageService cache keys ("<name>_<value>")
+KEY_PARAMS = ("extended_hours", "interval", "month", "outputsize", "datatype", "adjusted")
+
+
+def _easter(year: int) -> date:
+    """Anonymous Gregorian algorithm"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    first = date(year, month, 1)
+    offset = (weekday - first.weekday()) % 7
+    return first + timedelta(days=offset + 7 * (n - 1))
+
+
+def _last_weekday(year: int, month: int, weekday: int) -> date:
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=16)
+def nyse_holidays(year: int) -> Set[date]:
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),                # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),                # Washington's Birthday
+        _easter(year) - timedelta(days=2),          # Good Friday
+        _last_weekday(year, 5, 0),                  # Memorial Day
+        _observed(date(year, 7, 4)),                # Independence Day
+        _nth_weekday(year, 9, 0, 1),                # Labor Day
+        _nth_weekday(year, 11, 3, 4),               # Thanksgiving
+        _observed(date(year, 12, 25)),              # Christmas
+    }
+    # New Year's Day is not observed on the preceding Friday when it falls on a Saturday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in nyse_holidays(day.year)
+
+
+@lru_cache(maxsize=16)
+def nyse_early_closes(year: int) -> Set[date]:
+    """Trading days the regular session ends at 13:00"""
+    candidates = {
+        date(year, 7, 3),                                   # Day before Independence Day
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),   # Day after Thanksgiving
+        date(year, 12, 24),                                 # Christmas Eve
+    }
+    # A July 3rd or Christmas Eve that is a weekend or the observed holiday has no session to shorten
+    return {day for day in candidates if is_trading_day(day)}
+
+
+def session_close(day: date, extended: bool = False) -> time:
+    if day in nyse_early_closes(day.year):
+        return EARLY_EXTENDED_CLOSE if extended else EARLY_CLOSE
+    return EXTENDED_CLOSE if extended else SESSION_CLOSE
+
+
+class MarketCalendar:
+    """US equity session calendar used to decide how long market data stays fresh"""
+
+    def __init__(self, settle_minutes: int = 15):
+        # Bars keep being revised for a short while after the close
+        self.settle = timedelta(minutes=settle_minutes)
+
+    def now(self) -> datetime:
+        return datetime.now(EXCHANGE_TZ)
+
+    def is_open(self, at: Optional[datetime] = None, extended: bool = False) -> bool:
+        at = (at or self.now()).astimezone(EXCHANGE_TZ)
+        if not is_trading_day(at.date()):
+            return False
+        open_time = EXTENDED_OPEN if extended else SESSION_OPEN
+        opens_at = datetime.combine(at.date(), open_time, EXCHANGE_TZ)
+        closes_at = datetime.combine(at.date(), session_close(at.date(), extended), EXCHANGE_TZ) + self.settle
+        return opens_at <= at < closes_at
+
+    def next_open(self, at: Optional[datetime] = None, extended: bool = False) -> datetime:
+        at = (at or self.now()).astimezone(EXCHANGE_TZ)
+        open_time = EXTENDED_OPEN if extended else SESSION_OPEN
+        day = at.date()
+        while True:
+            opens_at = datetime.combine(day, open_time, EXCHANGE_TZ)
+            if is_trading_day(day) and opens_at > at:
+                return opens_at
+            day += timedelta(days=1)
+
+    def seconds_until_open(self, at: Optional[datetime] = None, extended: bool = False) -> int:
+        at = (at or self.now()).astimezone(EXCHANGE_TZ)
+        return max(int((self.next_open(at, extended) - at).total_seconds()), 1)
+
+
+class MarketHoursTTLPolicy:
+    """
+    Resolves TTLs for AlphaVantage time-series keys (alphavantage:<symbol>:<function>:<param>_<value>...).
+    While the market is open entries live for one bar; while it is closed they live until the next open.
+    Returns None for keys it does not handle so the caller can fall back to its static mapping.
+    """
+
+    def __init__(self, calendar: MarketCalendar, intraday_ttl: int, daily_ttl: int, max_ttl: int):
+        self.calendar = calendar
+        self.intraday_ttl = intraday_ttl
+        self.daily_ttl = daily_ttl
+        self.max_ttl = max_ttl
+
+    def ttl_for(self, key: str, at: Optional[datetime] = None) -> Optional[int]:
+        parts = key.split(":")
+        if len(parts) < 3 or parts[0] != "alphavantage":
+            return None
+        function = parts[2]
+        params = {}
+        for part in parts[3:]:
+            for name in KEY_PARAMS:
+                if part.startswith(f"{name}_"):
+                    params[name] = part[len(name) + 1:]
+                    break
+
+        if function == "TIME_SERIES_INTRADAY":
+            # AlphaVantage includes pre/post-market bars unless extended_hours=false
+            extended = params.get("extended_hours", "true") != "false"
+            if params.get("month"):
+                # Historical months never change once they are over
+                if params["month"] < (at or self.calendar.now()).strftime("%Y-%m"):
+                    return self.max_ttl
+            if self.calendar.is_open(at, extended=extended):
+                return min(self.intraday_ttl, INTERVAL_SECONDS.get(params.get("interval", "5min"), self.intraday_ttl))
+            return min(self.calendar.seconds_until_open(at, extended=extended), self.max_ttl)
+
+        if function.startswith("TIME_SERIES_DAILY"):
+            if self.calendar.is_open(at):
+                return self.daily_ttl
+            return min(self.calendar.seconds_until_open(at), self.max_ttl)
+
+        return None
+
+
+market_calendar = MarketCalendar(settle_minutes=settings.MARKET_SETTLE_MINUTES)
+market_ttl_policy = MarketHoursTTLPolicy(
+    market_calendar,
+    intraday_ttl=settings.CACHE_INTRADAY_OPEN_TTL,
+    daily_ttl=settings.CACHE_DAILY_OPEN_TTL,
+    max_ttl=settings.CACHE_CLOSED_MAX_TTL,
+)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import joblib
+from config.settings import settings
+from core.logging import log_exception
+
+MODELS_FILE = "models.joblib"
+METADATA_FILE = "metadata.json"
+
+
+def feature_set_id(feature_columns: List[str], config: Dict[str, Any]) -> str:
+    """Short stable id for a feature list plus the training config that shapes the artifact"""
+    payload = json.dumps({"features": feature_columns, "config": config}, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+class ModelArtifact:
+    """A trained model version: regressor, classifier, fitted scaler and their metadata"""
+
+    def __init__(self, regressor: Any, classifier: Any, scaler: Any, feature_columns: List[str],
+                 metadata: Dict[str, Any], path: Optional[str] = None):
+        self.regressor = regressor
+        self.classifier = classifier
+        self.scaler = scaler
+        self.feature_columns = feature_columns
+        self.metadata = metadata
+        self.path = path
+
+    @property
+    def version(self) -> int:
+        return self.metadata["version"]
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.metadata["trained_at"]
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts under <model_directory>/<symbol>/<interval>/<feature set>/v<N>/.
+    Each version holds the models, scaler and feature columns in one uncompressed joblib file
+    plus metadata.json (training data range and fingerprint, config, metrics).
+    Artifacts are loaded with mmap_mode="r": array payloads are mapped from the page cache that
+    every worker on the host shares instead of being read into private buffers. scikit-learn still
+    copies tree nodes into its own memory on load, so each process keeps loaded copies in a bounded
+    LRU of MODEL_CACHE_SIZE versions, and loading a version evicts older ones of the same series.
+    """
+
+    # Shared by every registry in the process; versions are immutable once written. Online
+    # updates run in worker threads, so every access holds the lock
+    _loaded: "OrderedDict[str, ModelArtifact]" = OrderedDict()
+    _loaded_lock = threading.Lock()
+
+    def __init__(self, model_directory: str, keep_versions: int = 3):
+        self.model_directory = model_directory
+        self.keep_versions = keep_versions
+        self.logger = logging.getLogger("ModelRegistry")
+
+    def find(self, symbol: str, interval: str, feature_set: str, data_fingerprint: str,
+             max_age: float) -> Optional[ModelArtifact]:
+        """
+        Latest version for the feature set if it was trained on the same data, or on older data
+        less than max_age seconds ago. Returns None when a retrain is due.
+        """
+        directory = self._series_directory(symbol, interval, feature_set)
+        for version in reversed(self._versions(directory)):
+            path = os.path.join(directory, f"v{version}")
+            metadata = self._read_metadata(path)
+            if metadata is None:
+                continue
+            same_data = metadata["data"]["fingerprint"] == data_fingerprint
+            if not same_data and time.time() - metadata["trained_at"] > max_age:
+                self.logger.info(f"Model {path} is stale, retraining")
+                return None
+            return self.load(path, metadata)
+        return None
+
+    def latest(self, symbol: str, interval: str, feature_set: str) -> Optional[ModelArtifact]:
+        """Latest readable version for the feature set, whatever its age or training data"""
+        directory = self._series_directory(symbol, interval, feature_set)
+        for version in reversed(self._versions(directory)):
+            path = os.path.join(directory, f"v{version}")
+            metadata = self._read_metadata(path)
+            if metadata is not None:
+                return self.load(path, metadata)
+        return None
+
+    def load(self, path: str, metadata: Optional[Dict[str, Any]] = None) -> Optional[ModelArtifact]:
+        with self._loaded_lock:
+            artifact = self._loaded.get(path)
+            if artifact is not None:
+                self._loaded.move_to_end(path)
+                return artifact
+        try:
+            metadata = metadata or self._read_metadata(path)
+            if metadata is None:
+                raise ValueError("metadata is missing")
+            payload = joblib.load(os.path.join(path, MODELS_FILE), mmap_mode="r")
+        except Exception as e:
+            log_exception(self.logger, e, f"Failed to load model from {path}")
+            return None
+        artifact = ModelArtifact(payload["regressor"], payload["classifier"], payload["scaler"],
+                                 payload["feature_columns"], metadata, path)
+        self._cache(path, artifact)
+        self.logger.info(f"Loaded model {path}")
+        return artifact
+
+    def _cache(self, path: str, artifact: ModelArtifact):
+        # Training workers publish new versions, so superseded ones are dropped here rather than in _prune
+        directory = os.path.dirname(path)
+        with self._loaded_lock:
+            for loaded_path, loaded in list(self._loaded.items()):
+                if os.path.dirname(loaded_path) == directory and loaded.version < artifact.version:
+                    del self._loaded[loaded_path]
+            self._loaded[path] = artifact
+            while len(self._loaded) > settings.MODEL_CACHE_SIZE:
+                self._loaded.popitem(last=False)
+
+    def save(self, symbol: str, interval: str, feature_set: str, regressor: Any, classifier: Any,
+             scaler: Any, feature_columns: List[str], metadata: Dict[str, Any]) -> ModelArtifact:
+        directory = self._series_directory(symbol, interval, feature_set)
+        os.makedirs(directory, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=directory)
+        try:
+            joblib.dump({
+                "regressor": regressor,
+                "classifier": classifier,
+                "scaler": scaler,
+                "feature_columns": feature_columns
+            }, os.path.join(staging, MODELS_FILE))
+
+            # Another worker may publish the same version first; take the next free one
+            while True:
+                version = (self._versions(directory) or [0])[-1] + 1
+                metadata = {
+                    **metadata,
+                    "version": version,
+                    "symbol": symbol,
+                    "interval": interval,
+                    "feature_set": feature_set,
+                    "feature_columns": feature_columns,
+                }
+                with open(os.path.join(staging, METADATA_FILE), "w") as f:
+                    json.dump(metadata, f, indent=2, default=str)
+                path = os.path.join(directory, f"v{version}")
+                try:
+                    os.rename(staging, path)
+                    break
+                except OSError:
+                    if not os.path.isdir(path):
+                        raise
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self.logger.info(f"Saved model {path}")
+        self._prune(directory)
+        return self.load(path, metadata)
+
+    def _prune(self, directory: str):
+        for version in self._versions(directory)[:-self.keep_versions]:
+            path = os.path.join(directory, f"v{version}")
+            with self._loaded_lock:
+                self._loaded.pop(path, None)
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _series_directory(self, symbol: str, interval: str, feature_set: str) -> str:
+        return os.path.join(self.model_directory, symbol.upper(), interval, feature_set)
+
+    def _versions(self, directory: str) -> List[int]:
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            int(name[1:]) for name in os.listdir(directory)
+            if name.startswith("v") and name[1:].isdigit()
+        )
+
+    def _read_metadata(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(path, METADATA_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,68 @@
+import io
+import json
+import re
+from typing import Union
+import numpy as np
+import pandas as pd
+
+# "1. open" -> "open", "5. adjusted close" -> "adjusted_close"
+_FIELD_PREFIX = re.compile(r"^\d+\.\s*")
+
+
+def parse_ohlcv(payload: Union[dict, str, bytes]) -> pd.DataFrame:
+    """
+    Parses an AlphaVantage time series payload, JSON (already decoded) or CSV text, into a frame
+    with a datetime64 `timestamp` column followed by float64 value columns, oldest bar first.
+    """
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    if isinstance(payload, str):
+        if payload.lstrip().startswith("{"):
+            # AlphaVantage answers errors with JSON even when CSV was requested
+            return parse_ohlcv(json.loads(payload))
+        return _parse_csv(payload)
+    return _parse_json(payload)
+
+
+def _parse_json(data: dict) -> pd.DataFrame:
+    time_series_keys = [key for key in data if key.startswith("Time Series")]
+    if not time_series_keys:
+        raise ValueError("Time Series data not found in the input dictionary")
+    series = data[time_series_keys[0]]
+    if not series:
+        raise ValueError("Time Series data is empty")
+
+    bars = list(series.values())
+    fields = list(bars[0])
+    # One pass over the bars; NumPy converts the numeric strings straight into a float64 block
+    values = np.array(
+        [[bar.get(field, "nan") for field in fields] for bar in bars],
+        dtype=np.float64
+    )
+    timestamps = pd.to_datetime(list(series))
+    columns = [_FIELD_PREFIX.sub("", field).replace(" ", "_") for field in fields]
+    return _build_frame(timestamps, values, columns)
+
+
+def _parse_csv(text: str) -> pd.DataFrame:
+    df = pd.read_csv(io.StringIO(text))
+    if "timestamp" not in df.columns:
+        raise ValueError("Time Series CSV has no timestamp column")
+    # An index, not a Series, so reordering in _build_frame cannot be undone by label alignment
+    timestamps = pd.DatetimeIndex(pd.to_datetime(df.pop("timestamp")))
+    columns = [column.strip().replace(" ", "_") for column in df.columns]
+    return _build_frame(timestamps, df.to_numpy(dtype=np.float64), columns)
+
+
+def _build_frame(timestamps: pd.DatetimeIndex, values: np.ndarray, columns: list) -> pd.DataFrame:
+    timestamps = pd.DatetimeIndex(timestamps)
+    # AlphaVantage returns newest first; reversing is enough unless the payload is unordered
+    if timestamps.is_monotonic_decreasing:
+        timestamps, values = timestamps[::-1], values[::-1]
+    elif not timestamps.is_monotonic_increasing:
+        order = np.argsort(timestamps.values, kind="stable")
+        timestamps, values = timestamps[order], values[order]
+
+    df = pd.DataFrame(np.ascontiguousarray(values), columns=columns)
+    df.insert(0, "timestamp", timestamps)
+    return df
@@ -1,40 +1,113 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.linear_model import SGDClassifier, SGDRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
-import joblib
+import asyncio
+import copy
+import hashlib
 import os
+import time
+import weakref
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Union, Optional
-from services.alpha_vantage import AlphaVantageService
+from typing import Any, Dict, List, Tuple, Union, Optional
+from config.settings import settings
+from services.data_context import get_data_context
+from services.indicators import INDICATOR_COLUMNS, indicator_engine
+from services.market_calendar import INTERVAL_SECONDS
+from services.model_registry import ModelArtifact, ModelRegistry, feature_set_id
+from services.training_jobs import TrainingCancelled, TrainingJob, cancel_requested, training_queue, tree_jobs
 import logging
 logger = logging.getLogger("fetch_daily_router")
 
+NON_FEATURE_COLUMNS = ['Date', 'Datetime', 'date', 'datetime', 'timestamp', 'index']
+
+# One online update per model series at a time, keyed like training jobs; concurrent requests
+# would otherwise learn the same new rows twice and each publish a version
+_online_locks: "weakref.WeakValueDictionary[Tuple[str, ...], asyncio.Lock]" = weakref.WeakValueDictionary()
+
+# forest: random forests refitted on the full history
+# online: linear models updated with partial_fit from the bars labeled since the last update
+PREDICTION_ENGINES = ('forest', 'online')
+
+
+def find_support_resistance(data: pd.DataFrame, window: int = 10,
+                            threshold: float = 0.02) -> Dict[str, List[float]]:
+    """
+    Support levels are lows that are the minimum of the centered 2 * window + 1 bar window,
+    resistance levels are highs that are its maximum. Levels closer than threshold (as a fraction
+    of the last close) are merged into their mean.
+    """
+    span = 2 * window + 1
+    lows = data['low']
+    highs = data['high']
+    # Bars without a full window on both sides yield NaN and are never pivots
+    supports = lows[lows.rolling(span, center=True).min() == lows].to_numpy()
+    resistances = highs[highs.rolling(span, center=True).max() == highs].to_numpy()
+
+    current_price = data['close'].iloc[-1]
+    return {
+        'support': _cluster_levels(supports, current_price, threshold),
+        'resistance': _cluster_levels(resistances, current_price, threshold)
+    }
+
+
+def find_support_resistance_many(frames: Dict[str, pd.DataFrame], window: int = 10,
+                                 threshold: float = 0.02) -> Dict[str, Dict[str, List[float]]]:
+    """Support and resistance levels for several symbols' bars in one call"""
+    return {
+        symbol: find_support_resistance(frame, window, threshold)
+        for symbol, frame in frames.items()
+    }
+
+
+def _cluster_levels(levels: np.ndarray, current_price: float, threshold_pct: float) -> List[float]:
+    if not len(levels):
+        return []
+
+    levels = np.sort(levels)
+    # A new cluster starts wherever the gap to the previous level is not within the threshold
+    breaks = ~(np.abs(np.diff(levels)) / current_price < threshold_pct)
+    cluster_ids = np.concatenate(([0], np.cumsum(breaks)))
+    sums = np.bincount(cluster_ids, weights=levels)
+    counts = np.bincount(cluster_ids)
+    return (sums / counts).tolist()
 
-alpha_vantage = AlphaVantageService()
 
 class PricePredictionTool:
-    """A tool for financial price prediction with ML capabilities."""
+    """
+    A tool for financial price prediction with ML capabilities.
+    Horizons (prediction_days, days_ahead) count bars of the tool's interval, not calendar days.
+    """
     
-    def __init__(self, model_directory: str = 'models'):
+    def __init__(self, model_directory: str = settings.MODEL_DIRECTORY, prediction_days: int = 5,
+                 engine: str = settings.PREDICTION_ENGINE):
         """Initialize the PricePredictionTool."""
+        if engine not in PREDICTION_ENGINES:
+            raise ValueError(f"Unsupported prediction engine: {engine}")
         self.model_directory = model_directory
+        self.prediction_days = prediction_days
+        self.engine = engine
         os.makedirs(model_directory, exist_ok=True)
+        self.registry = ModelRegistry(model_directory, settings.MODEL_KEEP_VERSIONS)
+        self.interval = "5min"
         self.data = None
         self.symbol = None
         self.classifier_model = None
         self.regressor_model = None
         self.scaler = StandardScaler()
         self.feature_columns = None
+        self.model_metadata = None
         
     async def fetch_data(self, symbol: str, period: str = '1y', interval: str = '1d', 
                   source: str = 'alphavantage') -> pd.DataFrame:
         """Fetch financial data from the specified source."""
         self.symbol = symbol
         if source.lower() == 'alphavantage':
-            data = await alpha_vantage.fetch(symbol, "TIME_SERIES_INTRADAY")
-            data = self._prepare_dataframe(data)
+            _, bars = await get_data_context().get_frame(symbol, "TIME_SERIES_INTRADAY")
+            # The parsed frame is shared with the rest of the request; indicators are added in place
+            data = bars.copy() if bars is not None else None
         else:
             raise ValueError(f"Unsupported data source: {source}")
         
@@ -44,144 +117,70 @@ class PricePredictionTool:
         self.data = data
         return data
     
-    def _prepare_dataframe(self, data: dict) -> pd.DataFrame:
-        columns = {
-                'index' : 'timestamp',
-                '1. open' : 'open',
-                '2. high' : 'high',
-                '3. low' : 'low',
-                '4. close' : 'close',
-                '5. adjusted close' : 'adjusted_close',
-                '6. volume' : 'volume',
-                '5. volume' : 'volume',
-                '7. dividend amount' : 'dividend_amount',
-                '8. split coefficient' : 'split_coefficient'
-            }
-
-        time_series_keys = [key for key in data if key.startswith("Time Series")]
-        logger.info(f"Time series keys: {time_series_keys}")
-        if not time_series_keys:
-            raise ValueError("Time Series data not found in the input dictionary")
-        time_series_key = time_series_keys[0]
-
-        df = pd.DataFrame(data[time_series_key]).T.reset_index()
-        df = df.rename(columns=columns)
-        
-        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
-        
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        return df
-
-
-    def add_indicators(self, data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    async def add_indicators(self, data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         if data is None:
             if self.data is None:
                 raise ValueError("No data available. Fetch data first.")
             data = self.data.copy()
         
-        # Moving Averages
-        data['MA5'] = data['close'].rolling(window=5).mean()
-        data['MA20'] = data['close'].rolling(window=20).mean()
-        data['MA50'] = data['close'].rolling(window=50).mean()
-        
-        # MACD
-        data['EMA12'] = data['close'].ewm(span=12, adjust=False).mean()
-        data['EMA26'] = data['close'].ewm(span=26, adjust=False).mean()
-        data['MACD'] = data['EMA12'] - data['EMA26']
-        data['MACD_Signal'] = data['MACD'].ewm(span=9, adjust=False).mean()
-        data['MACD_Hist'] = data['MACD'] - data['MACD_Signal']
-        
-        # RSI
-        delta = data['close'].diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        avg_gain = gain.rolling(window=14).mean()
-        avg_loss = loss.rolling(window=14).mean()
-        rs = avg_gain / avg_loss
-        data['RSI'] = 100 - (100 / (1 + rs))
-        
-        # Bollinger Bands
-        data['BB_Middle'] = data['close'].rolling(window=20).mean()
-        data['BB_Std'] = data['close'].rolling(window=20).std()
-        data['BB_Upper'] = data['BB_Middle'] + (data['BB_Std'] * 2)
-        data['BB_Lower'] = data['BB_Middle'] - (data['BB_Std'] * 2)
-        
-        # Stochastic Oscillator
-        n = 14
-        data['L14'] = data['low'].rolling(window=n, min_periods=1).min()
-        data['H14'] = data['high'].rolling(window=n, min_periods=1).max()
-        
-        # Handle division by zero and NaN values
-        denominator = data['H14'] - data['L14']
-        epsilon = 1e-8  # Small value to prevent division by zero
-        # data['%K'] = 100 * ((data['close'] - data['L14']) / (denominator + epsilon))
-        
-        # # Forward fill to handle initial NaN values
-        # data['%K'] = data['%K'].fillna(method='ffill')
-        # data['%D'] = data['%K'].rolling(window=3).mean().fillna(method='ffill')
-        
-        # Price momentum
-        data['Momentum'] = data['close'].pct_change(periods=10)
+        # Moving averages, MACD, RSI, Bollinger Bands, 14-bar low/high and momentum,
+        # updated incrementally from the state kept for this symbol
+        indicators = await indicator_engine.compute(self.symbol, "TIME_SERIES_INTRADAY", data, self.interval)
+        data[INDICATOR_COLUMNS] = indicators.to_numpy()
         
         # Drop rows with NaN values
         data.dropna(inplace=True)
         self.data = data
         return data
     
+    def for_horizon(self, prediction_days: int) -> "PricePredictionTool":
+        """A tool over the same prepared data whose models predict prediction_days bars ahead"""
+        tool = PricePredictionTool(self.model_directory, prediction_days, self.engine)
+        tool.symbol = self.symbol
+        tool.interval = self.interval
+        tool.data = self.data
+        return tool
+
     def identify_support_resistance(self, window: int = 10, 
                                     threshold: float = 0.02) -> Dict[str, List[float]]:
         if self.data is None:
             raise ValueError("No data available. Fetch data first.")
         
-        data = self.data.copy()
-        levels = {'support': [], 'resistance': []}
-        
-        # Find potential support levels (local lows)
-        for i in range(window, len(data) - window):
-            if all(data['low'].iloc[i] <= data['low'].iloc[i-j] for j in range(1, window+1)) and \
-               all(data['low'].iloc[i] <= data['low'].iloc[i+j] for j in range(1, window+1)):
-                levels['support'].append(data['low'].iloc[i])
-        
-        # Find potential resistance levels (local highs)
-        for i in range(window, len(data) - window):
-            if all(data['high'].iloc[i] >= data['high'].iloc[i-j] for j in range(1, window+1)) and \
-               all(data['high'].iloc[i] >= data['high'].iloc[i+j] for j in range(1, window+1)):
-                levels['resistance'].append(data['high'].iloc[i])
-        
-        def cluster_levels(levels_list, threshold_pct):
-            if not levels_list:
-                return []
-            
-            clustered = []
-            current_price = data['close'].iloc[-1]
+        return find_support_resistance(self.data, window, threshold)
 
-            levels_list = sorted(levels_list)
+    async def prepare_features(self, data: Optional[pd.DataFrame] = None, 
+                         target_column: str = 'close', 
+                         prediction_days: Optional[int] = None):
+        return self._prepare_features(data, target_column, prediction_days)
 
-            current_cluster = [levels_list[0]]
-            
-            for level in levels_list[1:]:
-                if abs(level - current_cluster[-1]) / current_price < threshold_pct:
-                    current_cluster.append(level)
-                else:
-                    clustered.append(sum(current_cluster) / len(current_cluster))
-                    current_cluster = [level]
-
-            if current_cluster:
-                clustered.append(sum(current_cluster) / len(current_cluster))
-            
-            return clustered
+    def _prepare_features(self, data: Optional[pd.DataFrame] = None, 
+                         target_column: str = 'close', 
+                         prediction_days: Optional[int] = None):
+        data, feature_cols = self._labeled_frame(data, target_column, prediction_days)
+        target_column = 'close'
+        
+        # Prepare data for training
+        X = data[feature_cols].values
+        y_reg = data[f'Future_{target_column}'].values
+        y_cls = data['Target_Direction'].values
         
-        # Cluster the levels
-        levels['support'] = cluster_levels(levels['support'], threshold)
-        levels['resistance'] = cluster_levels(levels['resistance'], threshold)
+        # Scale features; a fresh scaler so a loaded registry artifact is never refitted
+        self.scaler = StandardScaler()
+        X_scaled = self.scaler.fit_transform(X)
         
-        return levels
+        # Split data
+        X_train, X_test, y_reg_train, y_reg_test = train_test_split(
+            X_scaled, y_reg, test_size=0.2, shuffle=False)
+        _, _, y_cls_train, y_cls_test = train_test_split(
+            X_scaled, y_cls, test_size=0.2, shuffle=False)
+        
+        return X_train, X_test, y_reg_train, y_reg_test, y_cls_train, y_cls_test, feature_cols
 
-    async def prepare_features(self, data: Optional[pd.DataFrame] = None, 
-                         target_column: str = 'close', 
-                         prediction_days: int = 5):
+    def _labeled_frame(self, data: Optional[pd.DataFrame] = None, target_column: str = 'close',
+                       prediction_days: Optional[int] = None) -> Tuple[pd.DataFrame, List[str]]:
+        """Rows whose future price is known, with their targets, and the feature columns"""
+        if prediction_days is None:
+            prediction_days = self.prediction_days
         if data is None:
             if self.data is None:
                 raise ValueError("No data available. Fetch and process data first.")
@@ -197,81 +196,296 @@ class PricePredictionTool:
         data.dropna(inplace=True)
         
         # Select feature columns
-        exclude_cols = ['Date', 'Datetime', 'date', 'datetime', 'timestamp', 'index', 
-                         f'Future_{target_column}', 'Target_Direction']
+        exclude_cols = NON_FEATURE_COLUMNS + [f'Future_{target_column}', 'Target_Direction']
         feature_cols = [col for col in data.columns if col not in exclude_cols and 
                         not pd.isna(data[col]).any()]
-        
-        # Prepare data for training
-        X = data[feature_cols].values
-        y_reg = data[f'Future_{target_column}'].values
-        y_cls = data['Target_Direction'].values
-        
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
-        
-        # Split data
-        X_train, X_test, y_reg_train, y_reg_test = train_test_split(
-            X_scaled, y_reg, test_size=0.2, shuffle=False)
-        _, _, y_cls_train, y_cls_test = train_test_split(
-            X_scaled, y_cls, test_size=0.2, shuffle=False)
-        
-        return X_train, X_test, y_reg_train, y_reg_test, y_cls_train, y_cls_test, feature_cols
+        return data, feature_cols
     
     async def train_models(self, n_estimators: int = 100, random_state: int = 42) -> Dict[str, float]:
-        """Train machine learning models for price prediction."""
+        """Train machine learning models for price prediction in a training worker process."""
+        job = self.submit_training(n_estimators, random_state)
+        await self._wait_for_job(job)
+        return self.model_metadata['metrics']
+
+    def submit_training(self, n_estimators: int = 100, random_state: int = 42) -> TrainingJob:
+        """Queues training on the current data; joins the job already running for the same model."""
+        if self.data is None:
+            raise ValueError("No data available. Fetch and process data first.")
+        
+        feature_cols = self._candidate_features()
+        feature_set = feature_set_id(feature_cols, self._training_config(n_estimators, random_state))
+        # Requests with newer bars start their own job instead of joining one on older data
+        fingerprint = self._data_summary(feature_cols)['fingerprint']
+        return training_queue.submit(
+            (self.model_directory, self.symbol, self.interval, feature_set, fingerprint), self.symbol,
+            train_in_worker, self.model_directory, self.symbol, self.interval, self.data,
+            n_estimators, random_state, tree_jobs(), self.prediction_days, self.engine
+        )
+
+    def fit_models(self, n_estimators: int = 100, random_state: int = 42, n_jobs: int = 1,
+                   cancel_path: Optional[str] = None) -> ModelArtifact:
+        """Fits both models and publishes them to the registry. Blocking; runs in a training worker."""
         if self.data is None:
             raise ValueError("No data available. Fetch and process data first.")
+        if self.engine == 'online':
+            return self.update_online(random_state, reset=True, cancel_path=cancel_path)
+        self._check_cancelled(cancel_path)
         
         # Prepare features and targets
         X_train, X_test, y_reg_train, y_reg_test, y_cls_train, y_cls_test, feature_cols = \
-            await self.prepare_features()
+            self._prepare_features()
         
         # Train regressor model (predicts price)
-        regressor = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state)
+        regressor = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs)
         regressor.fit(X_train, y_reg_train)
         reg_preds = regressor.predict(X_test)
         reg_rmse = np.sqrt(np.mean((y_reg_test - reg_preds) ** 2))
+        self._check_cancelled(cancel_path)
         
         # Train classifier model (predicts direction)
-        classifier = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state)
+        classifier = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs)
         classifier.fit(X_train, y_cls_train)
         cls_preds = classifier.predict(X_test)
         cls_accuracy = np.mean(cls_preds == y_cls_test)
+        self._check_cancelled(cancel_path)
         
-        # Save models
-        self.regressor_model = regressor
-        self.classifier_model = classifier
-        self.feature_columns = feature_cols
+        metrics = {
+            'regression_rmse': float(reg_rmse),
+            'classification_accuracy': float(cls_accuracy)
+        }
+        config = self._training_config(n_estimators, random_state)
+        
+        # Save models to the registry
+        artifact = self.registry.save(
+            self.symbol, self.interval, feature_set_id(feature_cols, config),
+            regressor, classifier, self.scaler, feature_cols,
+            {
+                'trained_at': time.time(),
+                'config': config,
+                'data': self._data_summary(feature_cols),
+                'metrics': metrics
+            }
+        )
+        self._use_artifact(artifact)
         
-        # Save models to disk
-        # model_path = os.path.join(self.model_directory, f"{self.symbol}_models.joblib")
-        # scaler_path = os.path.join(self.model_directory, f"{self.symbol}_scaler.joblib")
+        return artifact
+
+    def update_online(self, random_state: int = 42, reset: bool = False,
+                      cancel_path: Optional[str] = None) -> ModelArtifact:
+        """
+        Updates the online models with the rows labeled since the last update and publishes them
+        as a new registry version, so the cost follows the number of new bars rather than the
+        history. New rows are scored before the models learn from them and the metrics accumulate
+        over those out-of-sample predictions. reset starts over from the full history.
+        The regressor learns the forward return rather than the price, which a single pass of
+        SGD cannot fit at price scale; predict() converts it back to a price.
+        """
+        if self.data is None:
+            raise ValueError("No data available. Fetch and process data first.")
+        self._check_cancelled(cancel_path)
+        
+        labeled, feature_cols = self._labeled_frame()
+        if labeled.empty:
+            raise ValueError(f"Not enough data to train a model for {self.symbol}")
+        config = self._training_config(0, random_state)
+        feature_set = feature_set_id(self._candidate_features(), config)
+        
+        artifact = None if reset else self.registry.latest(self.symbol, self.interval, feature_set)
+        if artifact is not None:
+            state = artifact.metadata['online']
+            new_rows = labeled[labeled['timestamp'] > pd.Timestamp(state['labeled_through'])]
+            if new_rows.empty:
+                self._use_artifact(artifact)
+                return artifact
+            # Registry artifacts are shared and memory-mapped read-only; update a private copy
+            regressor, classifier, scaler = copy.deepcopy(
+                (artifact.regressor, artifact.classifier, artifact.scaler))
+            feature_cols = artifact.feature_columns
+        else:
+            new_rows = labeled
+            regressor = SGDRegressor(random_state=random_state)
+            classifier = SGDClassifier(loss='log_loss', random_state=random_state)
+            scaler = StandardScaler()
+            state = {'samples': 0, 'evaluated': 0, 'squared_error': 0.0, 'correct': 0}
+        
+        X = new_rows[feature_cols].to_numpy(dtype=np.float64)
+        close = new_rows['close'].to_numpy(dtype=np.float64)
+        future_close = new_rows['Future_close'].to_numpy(dtype=np.float64)
+        y_reg = future_close / close - 1
+        y_cls = new_rows['Target_Direction'].to_numpy()
+        
+        # A fresh model learns the first 80% of the history (at least one row, so the scaler is
+        # fitted) before it is scored, like the holdout split of the forest engine
+        split = max(int(len(X) * 0.8), 1) if state['samples'] == 0 else 0
+        if split:
+            self._partial_fit(regressor, classifier, scaler, X[:split], y_reg[:split], y_cls[:split])
+        squared_error, correct = 0.0, 0
+        if split < len(X):
+            X_eval = scaler.transform(X[split:])
+            # Scored in price units, like the forest engine's rmse
+            predicted_close = close[split:] * (1 + regressor.predict(X_eval))
+            squared_error = float(np.sum((predicted_close - future_close[split:]) ** 2))
+            correct = int(np.sum(classifier.predict(X_eval) == y_cls[split:]))
+            self._partial_fit(regressor, classifier, scaler, X[split:], y_reg[split:], y_cls[split:])
+        state = {
+            'samples': state['samples'] + len(X),
+            'evaluated': state['evaluated'] + len(X) - split,
+            'squared_error': state['squared_error'] + squared_error,
+            'correct': state['correct'] + correct,
+            'labeled_through': str(new_rows['timestamp'].iloc[-1])
+        }
+        self._check_cancelled(cancel_path)
         
-        # joblib.dump({
-        #     'regressor': regressor,
-        #     'classifier': classifier,
-        #     'feature_columns': feature_cols
-        # }, model_path)
+        evaluated = state['evaluated']
+        metrics = {
+            'regression_rmse': float(np.sqrt(state['squared_error'] / evaluated)) if evaluated else None,
+            'classification_accuracy': float(state['correct'] / evaluated) if evaluated else None
+        }
+        artifact = self.registry.save(
+            self.symbol, self.interval, feature_set,
+            regressor, classifier, scaler, feature_cols,
+            {
+                'trained_at': time.time(),
+                'config': config,
+                'data': self._data_summary(feature_cols),
+                'metrics': metrics,
+                'online': state
+            }
+        )
+        logger.info(f"Updated online model for {self.symbol} with {len(X)} new rows")
+        self._use_artifact(artifact)
         
-        # joblib.dump(self.scaler, scaler_path)
+        return artifact
+
+    def _partial_fit(self, regressor: SGDRegressor, classifier: SGDClassifier, scaler: StandardScaler,
+                     X: np.ndarray, y_reg: np.ndarray, y_cls: np.ndarray):
+        scaler.partial_fit(X)
+        X_scaled = scaler.transform(X)
+        regressor.partial_fit(X_scaled, y_reg)
+        classifier.partial_fit(X_scaled, y_cls, classes=[0, 1])
+
+    def load_model(self, n_estimators: int = 100, random_state: int = 42) -> bool:
+        """
+        Uses the latest registry model for this symbol, interval and feature set if it was
+        trained on the current data or is younger than MODEL_MAX_AGE.
+        """
+        if self.data is None:
+            raise ValueError("No data available. Fetch and process data first.")
         
+        feature_cols = self._candidate_features()
+        config = self._training_config(n_estimators, random_state)
+        artifact = self.registry.find(
+            self.symbol, self.interval, feature_set_id(feature_cols, config),
+            self._data_summary(feature_cols)['fingerprint'], settings.MODEL_MAX_AGE
+        )
+        if artifact is None:
+            return False
+        
+        logger.info(f"Reusing model v{artifact.version} for {self.symbol} trained {artifact.age:.0f}s ago")
+        self._use_artifact(artifact)
+        return True
+
+    async def prepare_model(self, wait: Optional[float] = None, n_estimators: int = 100,
+                            random_state: int = 42) -> Optional[TrainingJob]:
+        """
+        Loads a registered model or trains a new one. Returns None once a model is in use, or the
+        pending training job if it does not finish within wait seconds (None waits indefinitely).
+        The online engine updates its models from the new bars in place of a training job.
+        """
+        if self.engine == 'online':
+            feature_set = feature_set_id(self._candidate_features(), self._training_config(0, random_state))
+            key = (self.model_directory, self.symbol, self.interval, feature_set)
+            lock = _online_locks.get(key)
+            if lock is None:
+                lock = _online_locks[key] = asyncio.Lock()
+            # Small, but a first update fits the whole history and writes the artifact. A request
+            # that waited finds the rows already learned and reuses the version just published
+            async with lock:
+                await asyncio.to_thread(self.update_online, random_state)
+            return None
+        if self.load_model(n_estimators, random_state):
+            return None
+        
+        job = self.submit_training(n_estimators, random_state)
+        try:
+            await asyncio.wait_for(self._wait_for_job(job), timeout=wait)
+        except asyncio.TimeoutError:
+            return job
+        return None
+
+    async def load_or_train(self, n_estimators: int = 100, random_state: int = 42) -> Dict[str, float]:
+        await self.prepare_model(None, n_estimators, random_state)
+        return self.model_metadata['metrics']
+
+    async def _wait_for_job(self, job: TrainingJob):
+        # Shield so a caller giving up does not cancel a job other requests may be waiting on
+        try:
+            result = await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            if job.future.cancelled():
+                raise ValueError(f"Training job {job.id} was cancelled")
+            raise
+        artifact = self.registry.load(result['path'])
+        if artifact is None:
+            raise ValueError(f"Trained model {result['path']} could not be loaded")
+        self._use_artifact(artifact)
+
+    def _check_cancelled(self, cancel_path: Optional[str]):
+        if cancel_requested(cancel_path):
+            raise TrainingCancelled(f"Training for {self.symbol} was cancelled")
+
+    def _candidate_features(self) -> List[str]:
+        return [col for col in self.data.columns if col not in NON_FEATURE_COLUMNS]
+
+    def _use_artifact(self, artifact: ModelArtifact):
+        self.regressor_model = artifact.regressor
+        self.classifier_model = artifact.classifier
+        self.scaler = artifact.scaler
+        self.feature_columns = artifact.feature_columns
+        self.model_metadata = artifact.metadata
+
+    def _training_config(self, n_estimators: int, random_state: int) -> Dict[str, Any]:
+        if self.engine == 'online':
+            return {
+                'model': 'SGD',
+                'target': 'return',
+                'random_state': random_state,
+                'prediction_days': self.prediction_days
+            }
+        return {
+            'model': 'RandomForest',
+            'n_estimators': n_estimators,
+            'random_state': random_state,
+            'prediction_days': self.prediction_days,
+            'test_size': 0.2
+        }
+
+    def _data_summary(self, feature_cols: List[str]) -> Dict[str, Any]:
+        digest = hashlib.sha1(self.data['timestamp'].to_numpy().tobytes())
+        digest.update(np.ascontiguousarray(self.data[feature_cols].to_numpy(dtype=np.float64)).tobytes())
         return {
-            'regression_rmse': reg_rmse,
-            'classification_accuracy': cls_accuracy
+            'start': str(self.data['timestamp'].iloc[0]),
+            'end': str(self.data['timestamp'].iloc[-1]),
+            'rows': len(self.data),
+            'fingerprint': digest.hexdigest()
         }
 
     async def predict(self, data: Optional[pd.DataFrame] = None, 
-                days_ahead: int = 5) -> Dict[str, Union[float, str, List[float]]]:
+                days_ahead: Optional[int] = None) -> Dict[str, Union[float, str, List[float]]]:
         if self.regressor_model is None or self.classifier_model is None:
             raise ValueError("Models not trained or loaded. Train or load models first.")
         
+        if days_ahead is None:
+            days_ahead = self.prediction_days
+        
         if data is None:
             if self.data is None:
                 raise ValueError("No data available. Fetch data first.")
             data = self.data.copy()
 
-        data = self.add_indicators(data)
+        # Data from fetch_data already carries the indicators the models were trained on
+        if not set(INDICATOR_COLUMNS).issubset(data.columns):
+            data = await self.add_indicators(data)
 
         latest_data = data.iloc[-1:][self.feature_columns].values
 
@@ -284,6 +498,10 @@ class PricePredictionTool:
         # Get current price
         current_price = data['close'].iloc[-1]
         
+        # Online models predict the forward return
+        if self.model_metadata['config'].get('target') == 'return':
+            price_prediction = current_price * (1 + price_prediction)
+        
         # Calculate percent change
         percent_change = ((price_prediction - current_price) / current_price) * 100
         
@@ -297,11 +515,17 @@ class PricePredictionTool:
         closest_support = max(current_supports) if current_supports else None
         closest_resistance = min(current_resistances) if current_resistances else None
         
+        # The horizon is in bars; project it from the last bar, ignoring closed sessions
+        last_bar = data['timestamp'].iloc[-1] if 'timestamp' in data.columns else datetime.now()
+        prediction_date = last_bar + timedelta(seconds=INTERVAL_SECONDS[self.interval] * days_ahead)
+        
         # Create prediction result
         result = {
             'symbol': self.symbol,
             'current_price': current_price,
-            'prediction_date': (datetime.now() + timedelta(days=days_ahead)).strftime('%Y-%m-%d'),
+            'prediction_date': prediction_date.strftime('%Y-%m-%d %H:%M'),
+            'horizon_bars': days_ahead,
+            'interval': self.interval,
             'predicted_price': price_prediction,
             'percent_change': percent_change,
             'direction': direction_prediction,
@@ -329,14 +553,30 @@ class PricePredictionTool:
         await self.fetch_data(symbol, period, interval)
         
         # Add indicators
-        self.add_indicators()
+        await self.add_indicators()
         
-        await self.train_models()
+        await self.load_or_train()
         
         prediction = await self.predict()
         
         return prediction
 
+
+def train_in_worker(model_directory: str, symbol: str, interval: str, data: pd.DataFrame,
+                    n_estimators: int, random_state: int, n_jobs: int, prediction_days: int,
+                    engine: str = 'forest', cancel_path: Optional[str] = None) -> Dict[str, Any]:
+    """Training job entry point, executed in a training worker process"""
+    tool = PricePredictionTool(model_directory, prediction_days, engine)
+    tool.symbol = symbol
+    tool.interval = interval
+    tool.data = data
+    artifact = tool.fit_models(n_estimators, random_state, n_jobs, cancel_path)
+    return {
+        'path': artifact.path,
+        'version': artifact.version,
+        'metrics': artifact.metadata['metrics']
+    }
+
 if __name__ == '__main__':
     price_tool = PricePredictionTool()
     prediction = price_tool.run_analysis('AAPL')
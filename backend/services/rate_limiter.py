@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+from config.settings import settings
+
+
+class Priority(IntEnum):
+    """Scheduling classes for upstream calls, lower value is served first"""
+    INTERACTIVE = 0
+    WEBSOCKET = 1
+    BACKGROUND = 2
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def drain(self):
+        self.tokens = 0.0
+
+
+class QuotaScheduler:
+    """
+    Token-bucket limiter with a priority queue in front of it.
+    Callers queue for up to max_wait seconds; higher priority waiters are always granted first.
+    A waiter queued under a key can be moved up with escalate() when a more urgent caller comes
+    to depend on the same request.
+    """
+
+    def __init__(self, per_minute: int, per_day: int = 0, max_wait: float = 10.0):
+        self.logger = logging.getLogger("QuotaScheduler")
+        self.buckets: List[TokenBucket] = []
+        if per_minute > 0:
+            self.buckets.append(TokenBucket(per_minute, 60.0))
+        if per_day > 0:
+            self.buckets.append(TokenBucket(per_day, 86400.0))
+        self.max_wait = max_wait
+
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._keyed: Dict[str, Tuple[int, asyncio.Future]] = {}
+        self._counter = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.granted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE, key: Optional[str] = None):
+        enqueued_at = time.monotonic()
+        if not self._queue and self._try_take(enqueued_at):
+            self._record_grant(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (int(priority), next(self._counter), future))
+        if key is not None:
+            self._keyed[key] = (int(priority), future)
+        self._ensure_dispatcher()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            # The dispatcher may have granted the token in the same loop iteration the timeout
+            # fired; the token is already spent, so hand it to the caller instead of rejecting
+            if not (future.done() and not future.cancelled()):
+                future.cancel()
+                self.rejected += 1
+                raise RateLimitExceeded(
+                    f"AlphaVantage quota exhausted, waited {self.max_wait:.1f}s at priority {Priority(priority).name}"
+                )
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        finally:
+            if key is not None and self._keyed.get(key, (None, None))[1] is future:
+                del self._keyed[key]
+        self._record_grant(time.monotonic() - enqueued_at)
+
+    def escalate(self, key: str, priority: Priority):
+        """Raise a queued keyed waiter to priority; no-op if it is not queued or already as urgent"""
+        entry = self._keyed.get(key)
+        if entry is None or entry[1].done() or entry[0] <= int(priority):
+            return
+        # The old heap entry shares the future, so whichever entry is popped first grants it
+        # and the other is discarded as done
+        future = entry[1]
+        heapq.heappush(self._queue, (int(priority), next(self._counter), future))
+        self._keyed[key] = (int(priority), future)
+        self._ensure_dispatcher()
+
+    def penalize(self):
+        """Empty the buckets after the upstream reports a rate limit so callers queue instead of retrying"""
+        for bucket in self.buckets:
+            bucket.drain()
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        for bucket in self.buckets:
+            bucket.refill(now)
+        # An escalated waiter has two heap entries; count it once, at its best priority
+        pending: Dict[int, int] = {}
+        for entry_priority, _, future in sorted(self._queue):
+            if not future.done():
+                pending.setdefault(id(future), entry_priority)
+        depth_by_priority = {p.name: 0 for p in Priority}
+        for entry_priority in pending.values():
+            depth_by_priority[Priority(entry_priority).name] += 1
+        return {
+            "queue_depth": len(pending),
+            "queue_depth_by_priority": depth_by_priority,
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self.total_wait / self.granted if self.granted else 0.0,
+            "max_wait_seconds": self.max_observed_wait,
+            "tokens_available": [int(bucket.tokens) for bucket in self.buckets],
+        }
+
+    def _try_take(self, now: float) -> bool:
+        for bucket in self.buckets:
+            bucket.refill(now)
+        if all(bucket.tokens >= 1 for bucket in self.buckets):
+            for bucket in self.buckets:
+                bucket.tokens -= 1
+            return True
+        return False
+
+    def _record_grant(self, waited: float):
+        self.granted += 1
+        self.total_wait += waited
+        self.max_observed_wait = max(self.max_observed_wait, waited)
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while self._queue:
+            if self._queue[0][2].done():
+                heapq.heappop(self._queue)
+                continue
+            if self._try_take(time.monotonic()):
+                _, _, future = heapq.heappop(self._queue)
+                future.set_result(None)
+                continue
+            await asyncio.sleep(max(bucket.wait_time() for bucket in self.buckets))
+
+
+alpha_vantage_limiter = QuotaScheduler(
+    per_minute=settings.ALPHA_VANTAGE_CALLS_PER_MINUTE,
+    per_day=settings.ALPHA_VANTAGE_CALLS_PER_DAY,
+    max_wait=settings.ALPHA_VANTAGE_MAX_QUEUE_WAIT,
+)
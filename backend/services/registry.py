@@ -0,0 +1,37 @@
+import logging
+from typing import Dict, Optional
+from fastapi import Request
+from agents.base import BaseAgent
+from services.agent_selector import AgentSelector
+from services.aggregator import ResultAggregator
+from services.alpha_vantage import AlphaVantageService
+from services.explainer import ExplainabilityEngine
+from services.llm import ChatGPTService
+
+
+class ServiceRegistry:
+    """
+    Application-scoped agents and services, built once in the FastAPI lifespan.
+    Everything handed out here is shared across concurrent requests; per-request state lives
+    in core.context.RequestContext.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("ServiceRegistry")
+        self.alpha_vantage = AlphaVantageService()
+        self.llm = ChatGPTService()
+        self.selector = AgentSelector()
+        self.aggregator = ResultAggregator()
+        self.explainer = ExplainabilityEngine()
+        self.logger.info(f"Initialized agents: {list(self.agents)}")
+
+    @property
+    def agents(self) -> Dict[str, BaseAgent]:
+        return self.selector.agents
+
+    def get_agent(self, name: str) -> Optional[BaseAgent]:
+        return self.agents.get(name)
+
+
+def get_registry(request: Request) -> ServiceRegistry:
+    return request.app.state.registry
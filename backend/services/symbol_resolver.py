@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+COMPANY_SEARCH_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "company_search.json")
+
+# Tickers the app has always recognised that are not listed in the NASDAQ search index
+EXTRA_SYMBOLS = {"IBM", "AAPL", "GOOGL", "MSFT", "AMZN"}
+
+ALIASES = {
+    "google": "GOOGL",
+    "alphabet": "GOOGL",
+    "facebook": "META",
+    "ibm": "IBM",
+}
+
+# Upper-case tokens that look like tickers but are finance/English vocabulary in queries
+TICKER_STOPWORDS = {
+    "A", "I", "AI", "IT", "US", "USA", "USD", "EU", "UK", "CEO", "CFO", "IPO", "ETF", "EPS", "PE", "PB",
+    "RSI", "MACD", "EMA", "SMA", "ATR", "ADX", "OBV", "VWAP", "GDP", "CPI", "FED", "YTD", "QOQ", "YOY",
+    "Q1", "Q2", "Q3", "Q4", "ON", "OR", "AND", "FOR", "THE", "NOW", "ALL", "ARE", "BUY", "SELL", "HOLD",
+    "NEWS", "RISK", "WHAT", "HOW", "WHY", "IS", "OF", "TO", "IN", "VS",
+}
+
+# Lower-case words that must never resolve to a company through the keyword index
+KEYWORD_STOPWORDS = {
+    "price", "prices", "trade", "trading", "news", "stock", "stocks", "market", "markets", "first",
+    "global", "data", "growth", "value", "capital", "income", "energy", "health", "bank", "financial",
+    "technology", "technologies", "group", "holdings", "international", "american", "united", "trust",
+    "fund", "future", "power", "target", "general", "digital", "life", "smart", "open", "live", "best",
+    "gold", "silver", "oil", "gas", "copper", "bitcoin", "crypto", "outlook", "performance", "insight",
+    "option", "beta", "next",
+}
+
+EQUITY_CLASSES = ("common stock", "common shares", "ordinary shares", "american depositary")
+
+# Whole words, keeping inner dots and hyphens ("BRK.B", "Cal-Maine"); ticker length is checked after matching
+TOKEN_PATTERN = re.compile(r"\$?\b[A-Za-z](?:[A-Za-z.\-]*[A-Za-z])?\b")
+MAX_TICKER_LENGTH = 5
+MIN_KEYWORD_LENGTH = 4
+
+
+class SymbolResolver:
+    """
+    In-memory ticker and company-name index built from static/company_search.json.
+    resolve() returns the best symbol for a free-text query together with a confidence score.
+    """
+
+    def __init__(self, path: str = COMPANY_SEARCH_PATH):
+        self.logger = logging.getLogger("SymbolResolver")
+        self.symbols: Set[str] = set(EXTRA_SYMBOLS)
+        self.keywords: Dict[str, str] = {}
+        self._load(path)
+
+    def _load(self, path: str):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Company index unavailable, using built-in symbols only: {e}")
+            return
+
+        candidates: Dict[str, List[str]] = {}
+        # How many listings use each word anywhere in their name
+        occurrences: Dict[str, int] = {}
+        for company in data.get("companies", []):
+            symbol = company["Symbol"].upper()
+            self.symbols.add(symbol)
+            keywords = company.get("keywords") or []
+            for keyword in set(keywords):
+                occurrences[keyword] = occurrences.get(keyword, 0) + 1
+            if not company.get("Misc", "").lower().startswith(EQUITY_CLASSES) and "common stock" not in company.get("Misc", "").lower():
+                continue
+            if keywords:
+                # Only the leading name word identifies a company well enough ("apple", "nvidia")
+                candidates.setdefault(keywords[0], []).append(symbol)
+
+        # Short name fragments ("cal" of Cal-Maine) and words shared by several names ("gold")
+        # would turn ordinary query words into symbols
+        for keyword, symbols in candidates.items():
+            if (len(symbols) == 1 and occurrences[keyword] == 1 and keyword not in KEYWORD_STOPWORDS
+                    and len(keyword) >= MIN_KEYWORD_LENGTH):
+                self.keywords[keyword] = symbols[0]
+        self.keywords.update(ALIASES)
+        self.logger.info(f"Loaded {len(self.symbols)} symbols and {len(self.keywords)} company keywords")
+
+    def resolve(self, query: str) -> Tuple[Optional[str], float]:
+        explicit, uppercase, lowercase, named = [], [], [], []
+        for token in TOKEN_PATTERN.findall(query):
+            if token.startswith("$"):
+                if len(token) - 1 <= MAX_TICKER_LENGTH and token[1:].upper() in self.symbols:
+                    explicit.append(token[1:].upper())
+                continue
+            ticker_sized = len(token) <= MAX_TICKER_LENGTH
+            if ticker_sized and token.isupper() and token in self.symbols and token not in TICKER_STOPWORDS:
+                uppercase.append(token)
+                continue
+            word = token.lower()
+            if word in self.keywords:
+                named.append(self.keywords[word])
+            elif ticker_sized and len(word) >= 3 and word.upper() in self.symbols and word.upper() not in TICKER_STOPWORDS:
+                lowercase.append(word.upper())
+
+        for matches, confidence in ((explicit, 0.99), (uppercase, 0.95), (named, 0.85), (lowercase, 0.5)):
+            unique = list(dict.fromkeys(matches))
+            if len(unique) == 1:
+                return unique[0], confidence
+            if unique:
+                # Several candidates: keep the first mention but let the caller decide
+                return unique[0], confidence / 2
+        return None, 0.0
+
+
+@lru_cache(maxsize=1)
+def get_symbol_resolver() -> SymbolResolver:
+    return SymbolResolver()
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple
+from config.settings import settings
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+ACTIVE_STATUSES = {JobStatus.QUEUED, JobStatus.RUNNING}
+
+
+class TrainingCancelled(Exception):
+    """Raised inside a worker when its job was cancelled while running"""
+
+
+def cancel_requested(cancel_path: Optional[str]) -> bool:
+    return bool(cancel_path) and os.path.exists(cancel_path)
+
+
+class TrainingJob:
+    def __init__(self, job_id: str, key: Tuple[str, ...], symbol: str, cancel_path: str):
+        self.id = job_id
+        self.key = key
+        self.symbol = symbol
+        self.cancel_path = cancel_path
+        self.status = JobStatus.QUEUED
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.process_future: Optional[Future] = None
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.future: Optional[asyncio.Future] = None
+
+    def refresh(self):
+        if self.status == JobStatus.QUEUED and self.process_future is not None and self.process_future.running():
+            self.status = JobStatus.RUNNING
+
+    def to_dict(self) -> Dict[str, Any]:
+        self.refresh()
+        return {
+            "job_id": self.id,
+            "symbol": self.symbol,
+            "status": self.status.value,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "cancel_requested": cancel_requested(self.cancel_path),
+            "error": self.error,
+        }
+
+
+class TrainingJobQueue:
+    """
+    Runs model training in a pool of worker processes so fitting never blocks the event loop.
+    Jobs are deduplicated by key while queued or running. Queued jobs are cancelled outright;
+    running jobs see a cancel marker file and stop before the next fit or before publishing.
+    A pool broken by a dying worker (e.g. killed for memory) fails its jobs and is replaced.
+    """
+
+    def __init__(self, max_workers: int, job_directory: str, retention: float):
+        self.max_workers = max_workers
+        self.job_directory = job_directory
+        self.retention = retention
+        self.logger = logging.getLogger("TrainingJobQueue")
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, TrainingJob] = {}
+        self._active: Dict[Tuple[str, ...], str] = {}
+
+    def submit(self, key: Tuple[str, ...], symbol: str, fn: Callable, *args, **kwargs) -> TrainingJob:
+        """
+        Schedules fn(*args, cancel_path=..., **kwargs) in a worker process, or returns the job
+        already queued or running for key. fn must be a picklable module-level function.
+        """
+        self._prune()
+        job_id = self._active.get(key)
+        if job_id is not None:
+            job = self._jobs[job_id]
+            self.logger.info(f"Joining training job {job.id} for {symbol}")
+            return job
+
+        os.makedirs(self.job_directory, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        job = TrainingJob(job_id, key, symbol, os.path.join(self.job_directory, f"{job_id}.cancel"))
+        job.executor = self._get_executor()
+        try:
+            job.process_future = job.executor.submit(fn, *args, cancel_path=job.cancel_path, **kwargs)
+        except BrokenProcessPool:
+            self._reset_executor(job.executor)
+            job.executor = self._get_executor()
+            job.process_future = job.executor.submit(fn, *args, cancel_path=job.cancel_path, **kwargs)
+        job.future = asyncio.wrap_future(job.process_future)
+        job.future.add_done_callback(lambda done: self._finish(job, done))
+        self._jobs[job_id] = job
+        self._active[key] = job_id
+        self.logger.info(f"Submitted training job {job_id} for {symbol}")
+        return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.refresh()
+        return job
+
+    def cancel(self, job_id: str) -> Optional[TrainingJob]:
+        job = self.get(job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return job
+        if job.process_future.cancel():
+            self.logger.info(f"Cancelled queued training job {job_id}")
+            return job
+        # Already running in a worker; it checks for the marker between steps
+        with open(job.cancel_path, "w"):
+            pass
+        self.logger.info(f"Requested cancellation of running training job {job_id}")
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            job.refresh()
+            counts[job.status.value] = counts.get(job.status.value, 0) + 1
+        return {"workers": self.max_workers, "jobs": counts}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _finish(self, job: TrainingJob, future: asyncio.Future):
+        job.finished_at = time.time()
+        if self._active.get(job.key) == job.id:
+            del self._active[job.key]
+        if future.cancelled():
+            job.status = JobStatus.CANCELLED
+        elif isinstance(future.exception(), TrainingCancelled):
+            job.status = JobStatus.CANCELLED
+        elif future.exception() is not None:
+            if isinstance(future.exception(), BrokenProcessPool):
+                self._reset_executor(job.executor)
+            job.status = JobStatus.FAILED
+            job.error = str(future.exception())
+            self.logger.warning(f"Training job {job.id} for {job.symbol} failed: {job.error}")
+        else:
+            job.status = JobStatus.SUCCEEDED
+            job.result = future.result()
+        if os.path.exists(job.cancel_path):
+            os.remove(job.cancel_path)
+        self.logger.info(f"Training job {job.id} for {job.symbol} {job.status.value}")
+
+    def _reset_executor(self, executor: Optional[ProcessPoolExecutor]):
+        # Jobs of a broken pool all fail; only the first one to notice replaces it
+        if executor is not None and executor is self._executor:
+            self.logger.warning("Training worker pool is broken, starting a new one")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]:
+            del self._jobs[job_id]
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and open sockets is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+
+def tree_jobs() -> int:
+    """Cores each worker may use to fit trees in parallel"""
+    if settings.TRAINING_TREE_JOBS > 0:
+        return settings.TRAINING_TREE_JOBS
+    return max(1, (os.cpu_count() or 1) // settings.TRAINING_WORKERS)
+
+
+training_queue = TrainingJobQueue(
+    settings.TRAINING_WORKERS,
+    os.path.join(settings.MODEL_DIRECTORY, ".jobs"),
+    settings.TRAINING_JOB_RETENTION
+)
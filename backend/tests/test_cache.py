@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+from unittest import mock
+from services import cache
+from services.cache import CacheService, local_cache
+from services.local_cache import LocalCache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class LocalCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used_by_count(self):
+        l1 = LocalCache(max_entries=2, max_bytes=1000)
+        l1.set("a", 1, ttl=60, size=1)
+        l1.set("b", 2, ttl=60, size=1)
+        l1.get("a")
+        l1.set("c", 3, ttl=60, size=1)
+        self.assertEqual((l1.get("a"), l1.get("b"), l1.get("c")), (1, None, 3))
+        self.assertEqual(l1.stats()["evictions"], 1)
+
+    def test_evicts_by_bytes_and_skips_oversized_values(self):
+        l1 = LocalCache(max_entries=10, max_bytes=10)
+        l1.set("a", "a", ttl=60, size=6)
+        l1.set("b", "b", ttl=60, size=6)
+        self.assertEqual((l1.get("a"), l1.get("b")), (None, "b"))
+        l1.set("big", "big", ttl=60, size=11)
+        self.assertIsNone(l1.get("big"))
+        self.assertEqual(l1.stats()["bytes"], 6)
+
+    def test_expired_and_invalidated_entries_miss(self):
+        l1 = LocalCache(max_entries=10, max_bytes=100)
+        with mock.patch("services.local_cache.time.monotonic", return_value=100.0):
+            l1.set("a", 1, ttl=5, size=1)
+            l1.set("b", 2, ttl=60, size=1)
+        with mock.patch("services.local_cache.time.monotonic", return_value=106.0):
+            self.assertIsNone(l1.get("a"))
+            l1.invalidate("b")
+            self.assertIsNone(l1.get("b"))
+        self.assertEqual(l1.stats()["bytes"], 0)
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class CacheInvalidationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = fakeredis.FakeServer()
+        self.patches = [
+            mock.patch.object(cache, "_pool", fakeredis.aioredis.FakeRedis(server=self.server).connection_pool),
+            mock.patch.object(cache, "_pubsub_client", lambda: fakeredis.aioredis.FakeRedis(server=self.server)),
+        ]
+        for patch in self.patches:
+            patch.start()
+        local_cache.clear()
+        self.cache = CacheService()
+
+    async def asyncTearDown(self):
+        await cache.stop_invalidation_listener()
+        for patch in self.patches:
+            patch.stop()
+        local_cache.clear()
+
+    async def test_reads_fill_l1_and_writes_replace_it(self):
+        await self.cache.set("key", {"v": 1}, ttl=60)
+        self.assertEqual(await self.cache.get("key"), {"v": 1})
+        self.assertEqual(local_cache.get("key"), {"v": 1})
+
+        await self.cache.set("key", {"v": 2}, ttl=60)
+        self.assertIsNone(local_cache.get("key"))
+        self.assertEqual(await self.cache.get("key"), {"v": 2})
+
+    async def test_writes_from_other_workers_invalidate_l1(self):
+        cache.start_invalidation_listener()
+        await asyncio.sleep(0.05)
+        await self.cache.set("key", {"v": 1}, ttl=60)
+        self.assertEqual(await self.cache.get("key"), {"v": 1})
+
+        # Another worker publishes under its own instance id after updating Redis
+        other = fakeredis.aioredis.FakeRedis(server=self.server)
+        await other.set("key", self.cache.codec.encode({"v": 2}), ex=60)
+        await other.publish("cache:invalidate", "other-worker|key")
+        for _ in range(50):
+            if local_cache.get("key") is None:
+                break
+            await asyncio.sleep(0.01)
+        self.assertIsNone(local_cache.get("key"))
+        self.assertEqual(await self.cache.get("key"), {"v": 2})
+
+    async def test_own_invalidations_are_ignored(self):
+        cache.start_invalidation_listener()
+        await asyncio.sleep(0.05)
+        await self.cache.set("key", {"v": 1}, ttl=60)
+        await self.cache.get("key")
+        await asyncio.sleep(0.05)
+        self.assertEqual(local_cache.get("key"), {"v": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
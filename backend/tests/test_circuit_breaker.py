@@ -0,0 +1,148 @@
+import asyncio
+import unittest
+from unittest import mock
+import httpx
+import openai
+from services.circuit_breaker import CircuitBreaker, CircuitState
+from services.llm import ChatGPTService, ProviderError, call_with_breaker, is_provider_failure
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    options = dict(failure_rate=0.5, slow_call_seconds=5.0, slow_call_rate=0.8, window_seconds=60.0,
+                   min_calls=4, open_seconds=30.0, half_open_calls=1)
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+def status_error(status: int) -> openai.APIStatusError:
+    return openai.APIStatusError("error", response=httpx.Response(status, request=REQUEST), body=None)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_opens_on_failure_rate_after_min_calls(self):
+        breaker = make_breaker()
+        for _ in range(3):
+            breaker.record_failure(0.1)
+        self.assertEqual(breaker.state, CircuitState.CLOSED)
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.state, CircuitState.OPEN)
+        self.assertFalse(breaker.allow_request())
+        self.assertTrue(breaker.is_rejecting())
+
+    def test_opens_on_slow_call_rate(self):
+        breaker = make_breaker()
+        for _ in range(4):
+            breaker.record_success(6.0)
+        self.assertEqual(breaker.state, CircuitState.OPEN)
+
+    def test_old_calls_leave_the_window(self):
+        breaker = make_breaker()
+        with mock.patch("services.circuit_breaker.time.monotonic", return_value=0.0):
+            for _ in range(3):
+                breaker.record_failure(0.1)
+        with mock.patch("services.circuit_breaker.time.monotonic", return_value=61.0):
+            breaker.record_failure(0.1)
+            self.assertEqual(breaker.state, CircuitState.CLOSED)
+            self.assertEqual(breaker.snapshot()["calls"], 1)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        for succeeded, expected in ((True, CircuitState.CLOSED), (False, CircuitState.OPEN)):
+            with self.subTest(succeeded=succeeded):
+                breaker = make_breaker()
+                with mock.patch("services.circuit_breaker.time.monotonic", return_value=100.0):
+                    breaker._trip()
+                with mock.patch("services.circuit_breaker.time.monotonic", return_value=131.0):
+                    self.assertTrue(breaker.allow_request())
+                    self.assertEqual(breaker.state, CircuitState.HALF_OPEN)
+                    self.assertFalse(breaker.allow_request())
+                    if succeeded:
+                        breaker.record_success(0.1)
+                    else:
+                        breaker.record_failure(0.1)
+                    self.assertEqual(breaker.state, expected)
+
+    def test_released_probe_frees_its_slot(self):
+        breaker = make_breaker(open_seconds=0.0)
+        breaker._trip()
+        self.assertTrue(breaker.allow_request())
+        self.assertTrue(breaker.is_rejecting())
+        breaker.release()
+        self.assertEqual(breaker.state, CircuitState.HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+
+
+class ProviderFailureTest(unittest.TestCase):
+    def test_classification(self):
+        self.assertTrue(is_provider_failure(asyncio.TimeoutError()))
+        self.assertTrue(is_provider_failure(openai.APITimeoutError(request=REQUEST)))
+        self.assertTrue(is_provider_failure(openai.APIConnectionError(request=REQUEST)))
+        self.assertTrue(is_provider_failure(status_error(429)))
+        self.assertTrue(is_provider_failure(status_error(503)))
+        self.assertFalse(is_provider_failure(status_error(400)))
+        self.assertFalse(is_provider_failure(KeyError("prompt")))
+        self.assertFalse(is_provider_failure(TypeError("not serializable")))
+
+
+class CallWithBreakerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_only_provider_failures_count(self):
+        breaker = make_breaker(min_calls=1)
+
+        async def local_error():
+            raise KeyError("prompt")
+
+        with self.assertRaises(KeyError):
+            await call_with_breaker(breaker, local_error)
+        self.assertEqual((breaker.state, breaker.snapshot()["calls"]), (CircuitState.CLOSED, 0))
+
+        async def timeout():
+            raise asyncio.TimeoutError()
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await call_with_breaker(breaker, timeout)
+        self.assertEqual(breaker.state, CircuitState.OPEN)
+
+    async def test_local_error_releases_a_half_open_probe(self):
+        breaker = make_breaker(open_seconds=0.0)
+        breaker._trip()
+
+        async def local_error():
+            raise ValueError("bad template")
+
+        with self.assertRaises(ValueError):
+            await call_with_breaker(breaker, local_error)
+        self.assertEqual((breaker.state, breaker.probes_in_flight), (CircuitState.HALF_OPEN, 0))
+
+    async def test_cancelled_call_releases_a_half_open_probe(self):
+        breaker = make_breaker(open_seconds=0.0)
+        breaker._trip()
+        task = asyncio.create_task(call_with_breaker(breaker, lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(breaker.probes_in_flight, 0)
+
+
+class ChatGPTAnalyzeTest(unittest.IsolatedAsyncioTestCase):
+    async def analyze_with(self, error: Exception):
+        client = mock.Mock()
+        client.chat.completions.create = mock.AsyncMock(side_effect=error)
+        with mock.patch.object(ChatGPTService, "client", new_callable=mock.PropertyMock, return_value=client):
+            return await ChatGPTService().analyze("Explain {symbol}", symbol="AAPL")
+
+    async def test_provider_errors_are_wrapped(self):
+        with self.assertRaises(ProviderError) as raised:
+            await self.analyze_with(status_error(503))
+        self.assertIsInstance(raised.exception.__cause__, openai.APIStatusError)
+
+    async def test_other_errors_propagate_unchanged(self):
+        with self.assertRaises(TypeError):
+            await self.analyze_with(TypeError("unexpected keyword"))
+        with self.assertRaises(openai.APIStatusError):
+            await self.analyze_with(status_error(400))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import unittest
+import zlib
+from services.codec import HEADER, MAGIC, VERSION, SERIALIZERS, COMPRESSIONS, CacheCodec, msgpack, zstandard, lz4_frame
+
+VALUE = {
+    "Meta Data": {"2. Symbol": "AAPL"},
+    "Time Series (5min)": {f"2024-01-02 10:{minute:02d}:00": {"4. close": "185.64"} for minute in range(60)},
+}
+
+
+class CacheCodecTest(unittest.TestCase):
+    def test_small_payloads_are_not_compressed(self):
+        codec = CacheCodec("json", "zlib", threshold=1024)
+        data = codec.encode({"a": 1})
+        magic, version, serializer, compression, size = HEADER.unpack_from(data)
+        self.assertEqual((magic, version, serializer, compression), (MAGIC, VERSION, SERIALIZERS["json"], COMPRESSIONS["none"]))
+        self.assertEqual(size, len(data) - HEADER.size)
+        self.assertEqual(codec.decode(data), {"a": 1})
+
+    def test_header_records_uncompressed_size(self):
+        codec = CacheCodec("json", "zlib", threshold=16)
+        data = codec.encode(VALUE)
+        payload = json.dumps(VALUE, separators=(",", ":")).encode("utf-8")
+        _, _, _, compression, size = HEADER.unpack_from(data)
+        self.assertEqual(compression, COMPRESSIONS["zlib"])
+        self.assertEqual(size, len(payload))
+        self.assertEqual(CacheCodec.payload_size(data), len(payload))
+        self.assertEqual(zlib.decompress(data[HEADER.size:]), payload)
+        self.assertLess(len(data), len(payload))
+
+    def test_round_trip_for_each_available_format(self):
+        serializers = ["json"] + (["msgpack"] if msgpack else [])
+        compressions = ["none", "zlib"] + (["zstd"] if zstandard else []) + (["lz4"] if lz4_frame else [])
+        for serializer in serializers:
+            for compression in compressions:
+                with self.subTest(serializer=serializer, compression=compression):
+                    codec = CacheCodec(serializer, compression, threshold=16)
+                    self.assertEqual(codec.decode(codec.encode(VALUE)), VALUE)
+
+    def test_any_codec_decodes_payloads_written_by_another(self):
+        writer = CacheCodec("json", "zlib", threshold=16)
+        reader = CacheCodec("json", "none")
+        self.assertEqual(reader.decode(writer.encode(VALUE)), VALUE)
+
+    def test_legacy_json_values_still_decode(self):
+        codec = CacheCodec("json", "zlib")
+        legacy = json.dumps(VALUE)
+        self.assertEqual(codec.decode(legacy.encode("utf-8")), VALUE)
+        self.assertEqual(codec.decode(legacy), VALUE)
+        self.assertEqual(CacheCodec.payload_size(legacy.encode("utf-8")), len(legacy))
+
+    def test_unknown_version_is_rejected(self):
+        codec = CacheCodec("json", "none")
+        data = bytearray(codec.encode({"a": 1}))
+        data[2] = VERSION + 1
+        with self.assertRaises(ValueError):
+            codec.decode(bytes(data))
+
+    def test_unknown_formats_are_rejected(self):
+        with self.assertRaises(ValueError):
+            CacheCodec("pickle", "none")
+        with self.assertRaises(ValueError):
+            CacheCodec("json", "brotli")
+
+
+if __name__ == "__main__":
+    unittest.main()
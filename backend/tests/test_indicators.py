@@ -0,0 +1,136 @@
+import unittest
+import numpy as np
+import pandas as pd
+from services.codec import CacheCodec
+from services.indicators import INDICATOR_COLUMNS, IndicatorEngine, IndicatorState, batch_indicators
+
+
+def make_bars(count: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, count))
+    # Flat stretches exercise the repeated-value paths of the rolling kernels
+    close[40:46] = close[40]
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-02 09:30", periods=count, freq="5min"),
+        "open": close,
+        "high": close + rng.uniform(0, 0.3, count),
+        "low": close - rng.uniform(0, 0.3, count),
+        "close": close,
+        "volume": rng.integers(100, 1000, count).astype(np.float64),
+    })
+
+
+class CodecCache:
+    """Stands in for CacheService; values round-trip through the cache codec as they would in Redis"""
+
+    def __init__(self):
+        self.codec = CacheCodec("json", "zlib")
+        self.values = {}
+
+    def build_key(self, *args):
+        return ":".join(str(arg) for arg in args)
+
+    async def get(self, key):
+        return self.codec.decode(self.values[key]) if key in self.values else None
+
+    async def set(self, key, value, ttl=None):
+        self.values[key] = self.codec.encode(value)
+        return True
+
+
+def make_engine(cache=None) -> IndicatorEngine:
+    engine = IndicatorEngine()
+    engine.cache = cache or CodecCache()
+    return engine
+
+
+class IndicatorStateTest(unittest.TestCase):
+    def test_replay_equals_batch(self):
+        bars = make_bars(300)
+        state = IndicatorState()
+        rows = [state.update(c, h, l) for c, h, l in zip(bars["close"], bars["high"], bars["low"])]
+        np.testing.assert_array_equal(np.array(rows), batch_indicators(bars)[INDICATOR_COLUMNS].to_numpy())
+
+    def test_state_round_trips(self):
+        bars = make_bars(120)
+        state = IndicatorState()
+        for c, h, l in zip(bars["close"][:80], bars["high"][:80], bars["low"][:80]):
+            state.update(c, h, l)
+        restored = IndicatorState.from_dict(state.to_dict())
+        for c, h, l in zip(bars["close"][80:], bars["high"][80:], bars["low"][80:]):
+            np.testing.assert_array_equal(restored.update(c, h, l), state.update(c, h, l))
+
+
+class IndicatorEngineTest(unittest.IsolatedAsyncioTestCase):
+    async def test_first_frame_equals_batch(self):
+        bars = make_bars(100)
+        result = await make_engine().compute("AAPL", "TIME_SERIES_INTRADAY", bars)
+        pd.testing.assert_frame_equal(result, batch_indicators(bars)[INDICATOR_COLUMNS])
+
+    async def test_rolling_window_equals_batch_over_the_history(self):
+        history = make_bars(130)
+        engine = make_engine()
+        await engine.compute("AAPL", "TIME_SERIES_INTRADAY", history.iloc[:100].reset_index(drop=True))
+        for end in (101, 110, 130):
+            window = history.iloc[end - 100:end].reset_index(drop=True)
+            result = await engine.compute("AAPL", "TIME_SERIES_INTRADAY", window)
+            expected = batch_indicators(history.iloc[:end])[INDICATOR_COLUMNS].iloc[end - 100:].reset_index(drop=True)
+            pd.testing.assert_frame_equal(result, expected)
+
+    async def test_resuming_from_saved_state_gives_the_same_result(self):
+        history = make_bars(120)
+        cache = CodecCache()
+        first = history.iloc[:100].reset_index(drop=True)
+        second = history.iloc[20:120].reset_index(drop=True)
+
+        continuous = make_engine()
+        await continuous.compute("AAPL", "TIME_SERIES_INTRADAY", first)
+        expected = await continuous.compute("AAPL", "TIME_SERIES_INTRADAY", second)
+
+        # Another worker picks the series up from the shared cache
+        await make_engine(cache).compute("AAPL", "TIME_SERIES_INTRADAY", first)
+        resumed = await make_engine(cache).compute("AAPL", "TIME_SERIES_INTRADAY", second)
+        pd.testing.assert_frame_equal(resumed, expected)
+
+    async def test_unchanged_frame_is_served_from_the_stored_rows(self):
+        bars = make_bars(100)
+        engine = make_engine()
+        first = await engine.compute("AAPL", "TIME_SERIES_INTRADAY", bars)
+        stored = dict(engine.cache.values)
+        second = await engine.compute("AAPL", "TIME_SERIES_INTRADAY", bars)
+        pd.testing.assert_frame_equal(first, second)
+        self.assertEqual(engine.cache.values, stored)
+
+    async def test_revised_last_bar_replays_the_frame(self):
+        history = make_bars(101)
+        engine = make_engine()
+        await engine.compute("AAPL", "TIME_SERIES_INTRADAY", history.iloc[:100])
+        revised = history.copy()
+        revised.loc[99, "close"] += 1.0
+        result = await engine.compute("AAPL", "TIME_SERIES_INTRADAY", revised)
+        pd.testing.assert_frame_equal(result, batch_indicators(revised)[INDICATOR_COLUMNS])
+
+    async def test_gap_before_the_stored_frame_replays_the_frame(self):
+        history = make_bars(150)
+        engine = make_engine()
+        await engine.compute("AAPL", "TIME_SERIES_INTRADAY", history.iloc[50:150].reset_index(drop=True))
+        older = history.iloc[:120].reset_index(drop=True)
+        result = await engine.compute("AAPL", "TIME_SERIES_INTRADAY", older)
+        pd.testing.assert_frame_equal(result, batch_indicators(older)[INDICATOR_COLUMNS])
+        # The older frame does not replace the newer series' state
+        stored = await engine.cache.get("indicators:AAPL:TIME_SERIES_INTRADAY:5min:compact")
+        self.assertEqual(stored["timestamps"][-1], int(history["timestamp"].iloc[149].value))
+
+    async def test_series_are_kept_apart(self):
+        bars = make_bars(100)
+        engine = make_engine()
+        await engine.compute("AAPL", "TIME_SERIES_INTRADAY", bars)
+        await engine.compute("AAPL", "TIME_SERIES_INTRADAY", bars, interval="1min")
+        self.assertEqual(sorted(engine.cache.values), [
+            "indicators:AAPL:TIME_SERIES_INTRADAY:1min:compact",
+            "indicators:AAPL:TIME_SERIES_INTRADAY:5min:compact",
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
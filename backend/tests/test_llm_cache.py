@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+from services import cache
+from services.cache import local_cache
+from services.llm import LLMResponseCache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class LLMResponseCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.pool = mock.patch.object(cache, "_pool", fakeredis.aioredis.FakeRedis().connection_pool)
+        self.pool.start()
+        local_cache.clear()
+        self.cache = LLMResponseCache()
+        self.cache.enabled = True
+
+    async def asyncTearDown(self):
+        self.pool.stop()
+        local_cache.clear()
+
+    def test_only_greedy_calls_are_cached_by_default(self):
+        self.assertTrue(self.cache.should_use(0))
+        self.assertFalse(self.cache.should_use(0.7))
+        self.assertTrue(self.cache.should_use(0.7, cacheable=True))
+        self.cache.enabled = False
+        self.assertFalse(self.cache.should_use(0, cacheable=True))
+
+    async def test_keys_cover_every_generation_param(self):
+        key = self.cache.build_key("openai", "gpt", "system", "prompt", {"temperature": 0})
+        self.assertEqual(key, self.cache.build_key("openai", "gpt", "system", "prompt", {"temperature": 0}))
+        self.assertNotEqual(key, self.cache.build_key("openai", "gpt", "system", "prompt", {"temperature": 0, "max_tokens": 10}))
+        self.assertNotEqual(key, self.cache.build_key("gemini", "gpt", "system", "prompt", {"temperature": 0}))
+
+    async def test_oversized_answers_are_not_cached(self):
+        self.cache.max_entry_chars = 5
+        await self.cache.set("llm:openai:a", "too long")
+        self.assertIsNone(await self.cache.get("llm:openai:a"))
+
+    async def test_oldest_entries_are_evicted_beyond_the_limit(self):
+        self.cache.max_entries = 2
+        for name in ("a", "b", "c"):
+            await self.cache.set(f"llm:openai:{name}", name)
+        self.assertIsNone(await self.cache.get("llm:openai:a"))
+        self.assertEqual(await self.cache.get("llm:openai:b"), "b")
+        self.assertEqual(await self.cache.get("llm:openai:c"), "c")
+        self.assertEqual(await self.cache.cache.redis.zcard(self.cache.index_key), 2)
+        self.assertEqual(self.cache.stats()["evicted"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
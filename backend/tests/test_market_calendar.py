@@ -0,0 +1,79 @@
+import unittest
+from datetime import date, datetime
+from services.market_calendar import (
+    EXCHANGE_TZ, MarketCalendar, MarketHoursTTLPolicy, is_trading_day, nyse_early_closes, nyse_holidays,
+)
+
+
+def at(*args) -> datetime:
+    return datetime(*args, tzinfo=EXCHANGE_TZ)
+
+
+class MarketCalendarTest(unittest.TestCase):
+    def setUp(self):
+        self.calendar = MarketCalendar(settle_minutes=15)
+
+    def test_holidays(self):
+        self.assertEqual(nyse_holidays(2024) - {date(2024, 6, 19)}, {
+            date(2024, 1, 1), date(2024, 1, 15), date(2024, 2, 19), date(2024, 3, 29), date(2024, 5, 27),
+            date(2024, 7, 4), date(2024, 9, 2), date(2024, 11, 28), date(2024, 12, 25),
+        })
+        # Saturday New Year's Day is not observed on the Friday before
+        self.assertTrue(is_trading_day(date(2021, 12, 31)))
+        self.assertFalse(is_trading_day(date(2026, 7, 3)))
+
+    def test_early_closes(self):
+        self.assertEqual(nyse_early_closes(2024), {date(2024, 7, 3), date(2024, 11, 29), date(2024, 12, 24)})
+        # July 3rd is the observed holiday and Christmas Eve falls on a weekend
+        self.assertEqual(nyse_early_closes(2026), {date(2026, 11, 27), date(2026, 12, 24)})
+        self.assertEqual(nyse_early_closes(2022), {date(2022, 11, 25)})
+
+    def test_session_includes_the_settle_window(self):
+        self.assertFalse(self.calendar.is_open(at(2024, 3, 5, 9, 29)))
+        self.assertTrue(self.calendar.is_open(at(2024, 3, 5, 16, 14)))
+        self.assertFalse(self.calendar.is_open(at(2024, 3, 5, 16, 15)))
+        self.assertTrue(self.calendar.is_open(at(2024, 3, 5, 19, 0), extended=True))
+
+    def test_early_close_days_end_at_one(self):
+        self.assertTrue(self.calendar.is_open(at(2024, 11, 29, 13, 10)))
+        self.assertFalse(self.calendar.is_open(at(2024, 11, 29, 13, 15)))
+        self.assertTrue(self.calendar.is_open(at(2024, 11, 29, 17, 10), extended=True))
+        self.assertFalse(self.calendar.is_open(at(2024, 11, 29, 17, 15), extended=True))
+
+    def test_next_open_skips_weekends_and_holidays(self):
+        self.assertEqual(self.calendar.next_open(at(2024, 3, 29, 12, 0)), at(2024, 4, 1, 9, 30))
+        self.assertEqual(self.calendar.next_open(at(2024, 4, 1, 3, 0), extended=True), at(2024, 4, 1, 4, 0))
+
+
+class MarketHoursTTLPolicyTest(unittest.TestCase):
+    def setUp(self):
+        self.policy = MarketHoursTTLPolicy(MarketCalendar(15), intraday_ttl=300, daily_ttl=900, max_ttl=4 * 86400)
+
+    def test_open_market_uses_one_bar(self):
+        key = "alphavantage:AAPL:TIME_SERIES_INTRADAY:interval_1min"
+        self.assertEqual(self.policy.ttl_for(key, at(2024, 3, 5, 11, 0)), 60)
+        self.assertEqual(self.policy.ttl_for("alphavantage:AAPL:TIME_SERIES_INTRADAY:interval_60min", at(2024, 3, 5, 11, 0)), 300)
+        self.assertEqual(self.policy.ttl_for("alphavantage:AAPL:TIME_SERIES_DAILY", at(2024, 3, 5, 11, 0)), 900)
+
+    def test_closed_market_lives_until_the_next_open(self):
+        key = "alphavantage:AAPL:TIME_SERIES_INTRADAY:extended_hours_false:interval_5min"
+        # Friday after the close until Monday's open
+        self.assertEqual(self.policy.ttl_for(key, at(2024, 3, 8, 17, 0)), int((at(2024, 3, 11, 9, 30) - at(2024, 3, 8, 17, 0)).total_seconds()))
+        capped = MarketHoursTTLPolicy(MarketCalendar(15), intraday_ttl=300, daily_ttl=900, max_ttl=3600)
+        self.assertEqual(capped.ttl_for(key, at(2024, 3, 8, 17, 0)), 3600)
+
+    def test_early_close_is_treated_as_closed(self):
+        key = "alphavantage:AAPL:TIME_SERIES_INTRADAY:extended_hours_false:interval_5min"
+        self.assertEqual(self.policy.ttl_for(key, at(2024, 11, 29, 14, 0)), int((at(2024, 12, 2, 9, 30) - at(2024, 11, 29, 14, 0)).total_seconds()))
+
+    def test_past_months_never_expire_early(self):
+        key = "alphavantage:AAPL:TIME_SERIES_INTRADAY:interval_5min:month_2024-01"
+        self.assertEqual(self.policy.ttl_for(key, at(2024, 3, 5, 11, 0)), 4 * 86400)
+
+    def test_other_keys_are_left_to_the_caller(self):
+        self.assertIsNone(self.policy.ttl_for("alphavantage:AAPL:NEWS_SENTIMENT", at(2024, 3, 5, 11, 0)))
+        self.assertIsNone(self.policy.ttl_for("technical_analysis:AAPL:query", at(2024, 3, 5, 11, 0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
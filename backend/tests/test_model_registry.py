@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import numpy as np
+from services.model_registry import METADATA_FILE, ModelRegistry, feature_set_id
+
+
+def metadata(fingerprint: str = "abc", trained_at: float = None) -> dict:
+    return {"trained_at": trained_at or time.time(), "data": {"fingerprint": fingerprint}, "config": {}}
+
+
+class ModelRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.registry = ModelRegistry(self.directory, keep_versions=2)
+        ModelRegistry._loaded.clear()
+
+    def tearDown(self):
+        ModelRegistry._loaded.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def save(self, symbol: str = "AAPL", feature_set: str = "fs", **kwargs):
+        return self.registry.save(symbol, "5min", feature_set, {"weights": np.arange(3.0)}, "classifier", "scaler",
+                                  ["close"], metadata(**kwargs))
+
+    def test_feature_set_id_depends_on_features_and_config(self):
+        self.assertEqual(feature_set_id(["a", "b"], {"n": 1}), feature_set_id(["a", "b"], {"n": 1}))
+        self.assertNotEqual(feature_set_id(["a", "b"], {"n": 1}), feature_set_id(["b", "a"], {"n": 1}))
+        self.assertNotEqual(feature_set_id(["a", "b"], {"n": 1}), feature_set_id(["a", "b"], {"n": 2}))
+
+    def test_versions_round_trip(self):
+        first = self.save()
+        second = self.save()
+        self.assertEqual((first.version, second.version), (1, 2))
+        ModelRegistry._loaded.clear()
+        loaded = self.registry.latest("aapl", "5min", "fs")
+        self.assertEqual((loaded.version, loaded.classifier, loaded.feature_columns), (2, "classifier", ["close"]))
+        np.testing.assert_array_equal(loaded.regressor["weights"], np.arange(3.0))
+
+    def test_find_reuses_same_data_or_recent_models(self):
+        self.save(fingerprint="old", trained_at=time.time() - 3600)
+        self.assertEqual(self.registry.find("AAPL", "5min", "fs", "old", max_age=60).version, 1)
+        self.assertIsNone(self.registry.find("AAPL", "5min", "fs", "new", max_age=60))
+        self.assertEqual(self.registry.find("AAPL", "5min", "fs", "new", max_age=7200).version, 1)
+        self.assertIsNone(self.registry.find("MSFT", "5min", "fs", "old", max_age=60))
+
+    def test_old_versions_are_pruned(self):
+        for _ in range(4):
+            self.save()
+        series = os.path.join(self.directory, "AAPL", "5min", "fs")
+        self.assertEqual(sorted(os.listdir(series)), ["v3", "v4"])
+        self.assertEqual([os.path.basename(path) for path in ModelRegistry._loaded], ["v4"])
+
+    def test_loading_a_version_evicts_older_ones_of_the_series(self):
+        self.save()
+        other = self.save(symbol="MSFT")
+        self.registry.keep_versions = 5
+        self.save()
+        self.assertEqual(
+            sorted(os.path.relpath(path, self.directory) for path in ModelRegistry._loaded),
+            [os.path.join("AAPL", "5min", "fs", "v2"), os.path.relpath(other.path, self.directory)],
+        )
+
+    def test_cache_is_bounded_least_recently_used_first(self):
+        with mock.patch("services.model_registry.settings.MODEL_CACHE_SIZE", 2):
+            a = self.save(symbol="A")
+            self.save(symbol="B")
+            self.registry.load(a.path)
+            self.save(symbol="C")
+        self.assertEqual([os.path.relpath(path, self.directory).split(os.sep)[0] for path in ModelRegistry._loaded], ["A", "C"])
+
+    def test_unreadable_versions_are_skipped(self):
+        self.save()
+        broken = self.save()
+        os.remove(os.path.join(broken.path, METADATA_FILE))
+        ModelRegistry._loaded.clear()
+        self.assertEqual(self.registry.latest("AAPL", "5min", "fs").version, 1)
+        self.assertIsNone(self.registry.load(broken.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+import pandas as pd
+from services.ohlcv import parse_ohlcv
+
+# Newest first, the order AlphaVantage returns
+BARS = [
+    ("2024-01-02 10:10:00", "185.10", "185.40", "184.90", "185.30", "1200"),
+    ("2024-01-02 10:05:00", "184.80", "185.20", "184.70", "185.10", "900"),
+    ("2024-01-02 10:00:00", "184.50", "184.90", "184.40", "184.80", "1500"),
+    ("2024-01-02 09:55:00", "184.20", "184.60", "184.10", "184.50", "700"),
+]
+EXPECTED_CLOSES = {
+    pd.Timestamp("2024-01-02 09:55:00"): 184.50,
+    pd.Timestamp("2024-01-02 10:00:00"): 184.80,
+    pd.Timestamp("2024-01-02 10:05:00"): 185.10,
+    pd.Timestamp("2024-01-02 10:10:00"): 185.30,
+}
+
+
+def as_json(bars) -> dict:
+    return {
+        "Meta Data": {"2. Symbol": "AAPL"},
+        "Time Series (5min)": {
+            timestamp: {"1. open": o, "2. high": h, "3. low": l, "4. close": c, "5. volume": v}
+            for timestamp, o, h, l, c, v in bars
+        },
+    }
+
+
+def as_csv(bars) -> str:
+    rows = ["timestamp,open,high,low,close,volume"] + [",".join(bar) for bar in bars]
+    return "\n".join(rows) + "\n"
+
+
+class ParseOHLCVTest(unittest.TestCase):
+    def assert_pairs(self, frame: pd.DataFrame):
+        self.assertEqual(dict(zip(frame["timestamp"], frame["close"])), EXPECTED_CLOSES)
+        self.assertTrue(frame["timestamp"].is_monotonic_increasing)
+
+    def test_json_and_csv_agree(self):
+        from_json = parse_ohlcv(as_json(BARS))
+        from_csv = parse_ohlcv(as_csv(BARS))
+        self.assertEqual(list(from_json.columns), ["timestamp", "open", "high", "low", "close", "volume"])
+        self.assert_pairs(from_json)
+        pd.testing.assert_frame_equal(from_csv, from_json)
+
+    def test_newest_first_csv(self):
+        self.assert_pairs(parse_ohlcv(as_csv(BARS)))
+        self.assert_pairs(parse_ohlcv(as_csv(BARS).encode("utf-8")))
+
+    def test_unsorted_payloads(self):
+        shuffled = [BARS[2], BARS[0], BARS[3], BARS[1]]
+        from_csv = parse_ohlcv(as_csv(shuffled))
+        self.assert_pairs(from_csv)
+        self.assert_pairs(parse_ohlcv(as_json(shuffled)))
+        row = from_csv[from_csv["timestamp"] == pd.Timestamp("2024-01-02 10:05:00")].iloc[0]
+        self.assertEqual((row["open"], row["volume"]), (184.80, 900.0))
+
+    def test_values_are_float64(self):
+        frame = parse_ohlcv(as_csv(BARS))
+        self.assertEqual(frame["timestamp"].dtype, np.dtype("datetime64[ns]"))
+        self.assertTrue(all(frame[column].dtype == np.float64 for column in frame.columns[1:]))
+
+    def test_json_error_answers_are_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_ohlcv('{"Information": "rate limit"}')
+        with self.assertRaises(ValueError):
+            parse_ohlcv("symbol,close\nAAPL,1\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
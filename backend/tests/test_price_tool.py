@@ -0,0 +1,102 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from services.indicators import INDICATOR_COLUMNS, batch_indicators
+from services.model_registry import ModelRegistry
+from services.price_tool import PricePredictionTool
+
+
+def make_data(count: int, seed: int = 3) -> pd.DataFrame:
+    """Bars with indicators, as PricePredictionTool.add_indicators leaves them"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, count + 50))
+    bars = pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-02 04:00", periods=count + 50, freq="5min"),
+        "open": close,
+        "high": close + rng.uniform(0, 0.3, count + 50),
+        "low": close - rng.uniform(0, 0.3, count + 50),
+        "close": close,
+        "volume": rng.integers(100, 1000, count + 50).astype(np.float64),
+    })
+    bars[INDICATOR_COLUMNS] = batch_indicators(bars).to_numpy()
+    return bars.dropna().reset_index(drop=True).iloc[-count:].reset_index(drop=True)
+
+
+class PricePredictionToolTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        ModelRegistry._loaded.clear()
+
+    def tearDown(self):
+        ModelRegistry._loaded.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_tool(self, data: pd.DataFrame, horizon: int = 5) -> PricePredictionTool:
+        tool = PricePredictionTool(self.directory, horizon, engine="online")
+        tool.symbol = "AAPL"
+        tool.data = data
+        return tool
+
+    async def test_prediction_date_counts_bars_of_the_interval(self):
+        data = make_data(200)
+        tool = self.make_tool(data, horizon=6)
+        tool.update_online()
+        prediction = await tool.predict()
+        self.assertEqual(prediction["horizon_bars"], 6)
+        self.assertEqual(prediction["interval"], "5min")
+        self.assertEqual(prediction["prediction_date"], (data["timestamp"].iloc[-1] + pd.Timedelta(minutes=30)).strftime("%Y-%m-%d %H:%M"))
+
+
+    def test_fresh_update_learns_the_warm_up_split_before_scoring(self):
+        tool = self.make_tool(make_data(105))
+        artifact = tool.update_online()
+        # 100 labeled rows: the first 80 are learned, the last 20 scored and then learned
+        state = artifact.metadata["online"]
+        self.assertEqual((state["samples"], state["evaluated"]), (100, 20))
+        self.assertEqual(state["labeled_through"], str(tool.data["timestamp"].iloc[99]))
+        self.assertIsNotNone(artifact.metadata["metrics"]["regression_rmse"])
+        self.assertEqual(artifact.metadata["config"]["target"], "return")
+
+    def test_updates_learn_only_new_rows(self):
+        data = make_data(130)
+        first = self.make_tool(data.iloc[:105]).update_online()
+        second = self.make_tool(data.iloc[:115]).update_online()
+        self.assertEqual(second.version, first.version + 1)
+        self.assertEqual((second.metadata["online"]["samples"], second.metadata["online"]["evaluated"]), (110, 30))
+        # No newly labeled rows: the latest version is reused rather than republished
+        again = self.make_tool(data.iloc[:115]).update_online()
+        self.assertEqual(again.version, second.version)
+        # The shared artifact was copied, not updated in place
+        self.assertEqual(first.metadata["online"]["samples"], 100)
+
+    def test_tiny_histories(self):
+        with self.assertRaises(ValueError):
+            self.make_tool(make_data(5)).update_online()
+        artifact = self.make_tool(make_data(6)).update_online()
+        self.assertEqual((artifact.metadata["online"]["samples"], artifact.metadata["online"]["evaluated"]), (1, 0))
+        self.assertEqual(artifact.metadata["metrics"], {"regression_rmse": None, "classification_accuracy": None})
+
+    async def test_predicted_price_is_the_current_price_moved_by_the_learned_return(self):
+        tool = self.make_tool(make_data(200))
+        tool.update_online()
+        prediction = await tool.predict()
+        latest = tool.scaler.transform(tool.data.iloc[-1:][tool.feature_columns].values)
+        current = tool.data["close"].iloc[-1]
+        expected = current * (1 + tool.regressor_model.predict(latest)[0])
+        self.assertAlmostEqual(prediction["predicted_price"], expected)
+        self.assertAlmostEqual(prediction["percent_change"], (expected - current) / current * 100)
+
+    async def test_concurrent_requests_publish_one_version(self):
+        data = make_data(105)
+        await asyncio.gather(*[self.make_tool(data).prepare_model() for _ in range(4)])
+        series = os.path.join(self.directory, "AAPL", "5min")
+        (feature_set,) = os.listdir(series)
+        self.assertEqual([name for name in os.listdir(os.path.join(series, feature_set)) if name.startswith("v")], ["v1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
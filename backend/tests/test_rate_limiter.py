@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+from unittest import mock
+from services.rate_limiter import Priority, QuotaScheduler, RateLimitExceeded
+
+
+class QuotaSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_grants_immediately_while_tokens_last(self):
+        scheduler = QuotaScheduler(per_minute=2, max_wait=0.05)
+        await scheduler.acquire()
+        await scheduler.acquire()
+        with self.assertRaises(RateLimitExceeded):
+            await scheduler.acquire()
+        self.assertEqual((scheduler.granted, scheduler.rejected), (2, 1))
+        self.assertEqual(scheduler.stats()["queue_depth"], 0)
+
+    async def test_higher_priority_waiters_are_served_first(self):
+        scheduler = QuotaScheduler(per_minute=600, max_wait=5)
+        scheduler.penalize()
+        order = []
+
+        async def acquire(name, priority):
+            await scheduler.acquire(priority)
+            order.append(name)
+
+        background = asyncio.create_task(acquire("background", Priority.BACKGROUND))
+        interactive = asyncio.create_task(acquire("interactive", Priority.INTERACTIVE))
+        await asyncio.gather(background, interactive)
+        self.assertEqual(order, ["interactive", "background"])
+
+    async def test_escalated_waiter_jumps_the_queue(self):
+        scheduler = QuotaScheduler(per_minute=600, max_wait=5)
+        scheduler.penalize()
+        order = []
+
+        async def acquire(name, priority, key=None):
+            await scheduler.acquire(priority, key=key)
+            order.append(name)
+
+        shared = asyncio.create_task(acquire("shared", Priority.BACKGROUND, key="AAPL"))
+        websocket = asyncio.create_task(acquire("websocket", Priority.WEBSOCKET))
+        await asyncio.sleep(0)
+        scheduler.escalate("AAPL", Priority.INTERACTIVE)
+        depth = scheduler.stats()["queue_depth_by_priority"]
+        self.assertEqual((depth["INTERACTIVE"], depth["WEBSOCKET"], depth["BACKGROUND"]), (1, 1, 0))
+
+        await asyncio.gather(shared, websocket)
+        self.assertEqual(order, ["shared", "websocket"])
+        self.assertEqual(scheduler.granted, 2)
+        self.assertEqual(scheduler._keyed, {})
+
+    async def test_escalate_never_lowers_priority(self):
+        scheduler = QuotaScheduler(per_minute=600, max_wait=5)
+        scheduler.penalize()
+        waiter = asyncio.create_task(scheduler.acquire(Priority.INTERACTIVE, key="AAPL"))
+        await asyncio.sleep(0)
+        scheduler.escalate("AAPL", Priority.BACKGROUND)
+        self.assertEqual(len(scheduler._queue), 1)
+        await waiter
+
+    async def test_token_granted_at_the_timeout_is_not_lost(self):
+        scheduler = QuotaScheduler(per_minute=1, max_wait=0.05)
+        scheduler.penalize()
+
+        async def grant_then_time_out(awaitable, timeout):
+            # The dispatcher resolves the waiter in the same iteration the timeout fires
+            awaitable.cancel()
+            heap_entry = scheduler._queue[0]
+            scheduler._queue.remove(heap_entry)
+            heap_entry[2].set_result(None)
+            raise asyncio.TimeoutError
+
+        with mock.patch("asyncio.wait_for", grant_then_time_out):
+            await scheduler.acquire(Priority.INTERACTIVE)
+        self.assertEqual((scheduler.granted, scheduler.rejected), (1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
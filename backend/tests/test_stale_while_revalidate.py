@@ -0,0 +1,129 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+import pandas as pd
+from agents.technical import TechnicalAgent
+from core.context import start_request_context
+from services import cache
+from services.alpha_vantage import AlphaVantageService
+from services.cache import CacheEntry, CacheService, local_cache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class CacheEntryTest(unittest.TestCase):
+    def test_staleness_follows_the_soft_ttl(self):
+        self.assertFalse(CacheEntry({"a": 1}, time.time() - 10, soft_ttl=60).is_stale)
+        self.assertTrue(CacheEntry({"a": 1}, time.time() - 61, soft_ttl=60).is_stale)
+
+    def test_entries_without_metadata_are_never_stale(self):
+        entry = CacheEntry({"a": 1})
+        self.assertIsNone(entry.age)
+        self.assertFalse(entry.is_stale)
+
+
+class DictCache:
+    def __init__(self):
+        self.values = {}
+
+    def build_key(self, *args):
+        return ":".join(str(arg) for arg in args)
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ttl=None):
+        self.values[key] = value
+        return True
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class StaleWhileRevalidateTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.pool = mock.patch.object(cache, "_pool", fakeredis.aioredis.FakeRedis().connection_pool)
+        self.pool.start()
+        local_cache.clear()
+        self.service = AlphaVantageService()
+
+    async def asyncTearDown(self):
+        self.pool.stop()
+        local_cache.clear()
+
+    async def test_entries_keep_their_soft_ttl_and_outlive_it(self):
+        await self.service.cache.set_entry("alphavantage:AAPL:OVERVIEW", {"a": 1}, soft_ttl=60, stale_ttl=600)
+        entry = await self.service.cache.get_entry("alphavantage:AAPL:OVERVIEW")
+        self.assertEqual((entry.value, entry.soft_ttl, entry.is_stale), ({"a": 1}, 60, False))
+        self.assertEqual(await self.service.cache.get("alphavantage:AAPL:OVERVIEW"), {"a": 1})
+        self.assertGreater(await self.service.cache.redis.ttl("alphavantage:AAPL:OVERVIEW"), 600)
+
+    async def test_stale_entry_is_served_while_one_refresh_runs(self):
+        with mock.patch("services.cache.time.time", return_value=time.time() - 120):
+            await self.service.cache.set_entry("alphavantage:AAPL:OVERVIEW", {"v": "old"}, soft_ttl=60, stale_ttl=600)
+        local_cache.clear()
+
+        release = asyncio.Event()
+        calls = []
+
+        async def upstream(symbol, function, extra_params, cache_key, priority):
+            calls.append(priority)
+            await release.wait()
+            await self.service.cache.set_entry(cache_key, {"v": "new"})
+            return {"v": "new"}
+
+        with mock.patch.object(self.service, "_fetch_upstream", upstream):
+            first = await self.service.fetch_entry("AAPL", "OVERVIEW")
+            second = await self.service.fetch_entry("AAPL", "OVERVIEW")
+            self.assertEqual((first.value, second.value), ({"v": "old"}, {"v": "old"}))
+            self.assertTrue(first.is_stale)
+            self.assertGreaterEqual(first.age, 120)
+            await asyncio.sleep(0)
+            self.assertEqual(len(calls), 1)
+
+            release.set()
+            await asyncio.sleep(0.01)
+            refreshed = await self.service.fetch_entry("AAPL", "OVERVIEW")
+        self.assertEqual(refreshed.value, {"v": "new"})
+        self.assertFalse(refreshed.is_stale)
+
+    async def test_failed_refresh_keeps_serving_stale_data(self):
+        with mock.patch("services.cache.time.time", return_value=time.time() - 120):
+            await self.service.cache.set_entry("alphavantage:AAPL:OVERVIEW", {"v": "old"}, soft_ttl=60, stale_ttl=600)
+
+        async def upstream(*args):
+            raise ValueError("API rate limit exceeded")
+
+        with mock.patch.object(self.service, "_fetch_upstream", upstream):
+            await self.service.fetch_entry("AAPL", "OVERVIEW")
+            await asyncio.sleep(0.01)
+            entry = await self.service.fetch_entry("AAPL", "OVERVIEW")
+        self.assertEqual(entry.value, {"v": "old"})
+
+
+class TechnicalAgentCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def test_cached_analysis_reports_the_current_data_age(self):
+        start_request_context()
+        agent = TechnicalAgent()
+        agent.cache = DictCache()
+        bars = pd.DataFrame({"close": [1.0]})
+        entry = CacheEntry({}, time.time() - 100)
+
+        with mock.patch.object(agent, "_get_frame", mock.AsyncMock(return_value=(entry, bars))), \
+                mock.patch.object(agent, "_prepare_dataframe", mock.AsyncMock(return_value=bars)), \
+                mock.patch.object(agent, "_analyze_data", mock.AsyncMock(return_value="analysis")):
+            fresh = await agent.process("RSI?", {"symbol": "AAPL"})
+            (cached,) = agent.cache.values.values()
+            self.assertNotIn("data_age", cached)
+
+            with mock.patch("agents.technical.time.time", return_value=time.time() + 50):
+                hit = await agent.process("RSI?", {"symbol": "AAPL"})
+        self.assertAlmostEqual(fresh.data_age, 100, delta=1)
+        self.assertAlmostEqual(hit.data_age, 150, delta=1)
+        self.assertEqual(hit.result, fresh.result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from services.local_router import LocalAgentRouter
+from services.symbol_resolver import SymbolResolver
+
+AGENTS = ["TechnicalAgent", "SentimentAgent", "RiskAgent", "PortfolioAgent", "FundamentalAgent"]
+
+
+class SymbolResolverTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.resolver = SymbolResolver()
+        cls.router = LocalAgentRouter(AGENTS, 0.8, cls.resolver)
+
+    def test_company_names_longer_than_a_ticker(self):
+        self.assertEqual(self.resolver.resolve("Give me a technical analysis of Microsoft"), ("MSFT", 0.85))
+        self.assertEqual(self.resolver.resolve("How are Starbucks earnings?")[0], "SBUX")
+
+    def test_name_fragments_inside_words_do_not_match(self):
+        self.assertEqual(self.resolver.resolve("What is the technical outlook?"), (None, 0.0))
+        self.assertNotIn("cal", self.resolver.keywords)
+
+    def test_shared_name_words_do_not_match(self):
+        self.assertEqual(self.resolver.resolve("How is the price of gold trending?"), (None, 0.0))
+        self.assertNotIn("gold", self.resolver.keywords)
+
+    def test_tickers(self):
+        self.assertEqual(self.resolver.resolve("Is $AAPL overbought?"), ("AAPL", 0.99))
+        self.assertEqual(self.resolver.resolve("RSI for NVDA today"), ("NVDA", 0.95))
+
+    def test_local_routing(self):
+        route = self.router.route("Give me a technical analysis of Microsoft")
+        self.assertEqual((route["symbol"], route["selected"]), ("MSFT", ["TechnicalAgent"]))
+        self.assertIsNone(self.router.route("What is the technical outlook?"))
+        self.assertIsNone(self.router.route("How is the price of gold trending?"))
+
+
+if __name__ == "__main__":
+    unittest.main()
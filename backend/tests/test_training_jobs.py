@@ -0,0 +1,98 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from services.training_jobs import JobStatus, TrainingCancelled, TrainingJobQueue, cancel_requested
+
+
+# Module-level so spawned workers can unpickle them
+def add(a, b, cancel_path=None):
+    time.sleep(0.2)
+    return {"sum": a + b}
+
+
+def crash(cancel_path=None):
+    os._exit(1)
+
+
+def wait_for_cancel(cancel_path=None):
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if cancel_requested(cancel_path):
+            raise TrainingCancelled()
+        time.sleep(0.05)
+    return {}
+
+
+class TrainingJobQueueTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queue = TrainingJobQueue(max_workers=1, job_directory=self.directory, retention=3600)
+
+    def tearDown(self):
+        self.queue.shutdown()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    async def wait(self, job, timeout=60):
+        await asyncio.wait([job.future], timeout=timeout)
+        # The done callback that records the outcome runs on the next loop iteration
+        await asyncio.sleep(0)
+        return job
+
+    async def test_jobs_are_deduplicated_while_active(self):
+        first = self.queue.submit(("AAPL", "fs", "data1"), "AAPL", add, 1, 2)
+        second = self.queue.submit(("AAPL", "fs", "data1"), "AAPL", add, 1, 2)
+        other = self.queue.submit(("AAPL", "fs", "data2"), "AAPL", add, 2, 3)
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+        await self.wait(first)
+        await self.wait(other)
+        self.assertEqual((first.status, first.result), (JobStatus.SUCCEEDED, {"sum": 3}))
+        self.assertEqual(other.result, {"sum": 5})
+
+        again = self.queue.submit(("AAPL", "fs", "data1"), "AAPL", add, 1, 2)
+        self.assertIsNot(again, first)
+        await self.wait(again)
+        self.assertEqual(self.queue.stats()["jobs"], {"succeeded": 3})
+
+    async def test_broken_pool_fails_its_job_and_is_replaced(self):
+        broken = await self.wait(self.queue.submit(("AAPL",), "AAPL", crash))
+        self.assertEqual(broken.status, JobStatus.FAILED)
+        self.assertIsNone(self.queue._executor)
+
+        job = await self.wait(self.queue.submit(("AAPL",), "AAPL", add, 1, 2))
+        self.assertEqual((job.status, job.result), (JobStatus.SUCCEEDED, {"sum": 3}))
+        self.assertIsNot(job.executor, broken.executor)
+
+    async def test_submit_retries_once_on_a_pool_that_broke_while_idle(self):
+        executor = self.queue._get_executor()
+        # What ProcessPoolExecutor sets when a worker dies outside of any job
+        executor._broken = "A child process terminated abruptly"
+        job = await self.wait(self.queue.submit(("AAPL",), "AAPL", add, 1, 2))
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertIsNot(job.executor, executor)
+
+    async def test_cancelling_jobs(self):
+        running = self.queue.submit(("AAPL",), "AAPL", wait_for_cancel)
+        queued = self.queue.submit(("MSFT",), "MSFT", add, 1, 2)
+        for _ in range(600):
+            if running.to_dict()["status"] == JobStatus.RUNNING.value:
+                break
+            await asyncio.sleep(0.05)
+
+        self.queue.cancel(queued.id)
+        self.queue.cancel(running.id)
+        self.assertTrue(running.to_dict()["cancel_requested"])
+        await self.wait(running)
+        await self.wait(queued)
+        self.assertEqual((running.status, queued.status), (JobStatus.CANCELLED, JobStatus.CANCELLED))
+        self.assertFalse(os.path.exists(running.cancel_path))
+        # Cancelled jobs no longer block a new submission for their key
+        self.assertIsNot(self.queue.submit(("AAPL",), "AAPL", add, 1, 2), running)
+
+
+if __name__ == "__main__":
+    unittest.main()